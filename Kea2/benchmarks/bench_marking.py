@@ -0,0 +1,86 @@
+"""
+Benchmark the screenshot marking throughput of the bug report generation.
+
+Generates N synthetic screenshots and marks them with the thread pool (the former
+implementation) and with the process pool, reporting images/sec.
+
+Usage:
+    python benchmarks/bench_marking.py -n 500
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+
+from concurrent.futures import wait
+from pathlib import Path
+from time import perf_counter
+
+from PIL import Image
+
+from kea2.report.mixin import init_marking_worker, mark_screenshot
+from kea2.report.utils import process_pool, thread_pool
+
+
+def prepare_screenshots(n: int, template_dir: Path):
+    template_dir.mkdir()
+    for i in range(n):
+        # noisy images so that the png size is close to a real screenshot
+        img = Image.effect_noise((720, 1280), random.randint(10, 80)).convert("RGB")
+        img.save(template_dir / f"screenshot-{i}-bench.png")
+
+
+def make_steps(n: int):
+    steps = []
+    for i in range(n):
+        if i % 10 == 0:
+            step = {"Type": "Script", "Info": {"method": "swipe", "params": [100, 200, 500, 900]}}
+        else:
+            step = {"Type": "Monkey", "Info": {"act": "CLICK", "pos": [100, 200, 300, 260]}}
+        step["Screenshot"] = f"screenshot-{i}-bench.png"
+        steps.append(step)
+    return steps
+
+
+def run_case(name: str, pool, template_dir: Path, tmp: Path, n: int):
+    screenshots_dir = tmp / name.replace(" ", "_")
+    shutil.copytree(template_dir, screenshots_dir)
+    steps = make_steps(n)
+    start = perf_counter()
+    with pool as executor:
+        futures = [executor.submit(mark_screenshot, str(screenshots_dir / s["Screenshot"]), s) for s in steps]
+        wait(futures)
+    cost = perf_counter() - start
+    marked = sum(1 for f in futures if f.result())
+    print(f"{name:<24} {cost:>9.2f}s {n / cost:>12.1f}{'' if marked == n else f'  (marked {marked}/{n})'}", flush=True)
+
+    # marking again is a no-op
+    start = perf_counter()
+    with process_pool(initializer=init_marking_worker) as executor:
+        futures = [executor.submit(mark_screenshot, str(screenshots_dir / s["Screenshot"]), s) for s in steps]
+        wait(futures)
+    cost = perf_counter() - start
+    print(f"{'  (already marked)':<24} {cost:>9.2f}s {n / cost:>12.1f}", flush=True)
+    shutil.rmtree(screenshots_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the screenshot marking")
+    parser.add_argument("-n", dest="n", type=int, default=500, help="number of screenshots")
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        template_dir = tmp / "template"
+        prepare_screenshots(args.n, template_dir)
+        print(f"{os.cpu_count()} cores, {args.n} screenshots", flush=True)
+        print(f"{'executor':<24} {'wall time':>10} {'images/sec':>12}", flush=True)
+        run_case("thread pool (128)", thread_pool(max_workers=128), template_dir, tmp, args.n)
+        run_case("process pool", process_pool(initializer=init_marking_worker), template_dir, tmp, args.n)
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark `kea2 merge` over many result directories.
+
+Generates N synthetic result directories with a long coverage.log and a crash-dump.log,
+then times the coverage read (the former line by line parse against the single pass of
+read_coverage_log, which also gets the coverage changes) and the whole merge with one worker and with one worker per core.
+
+Usage:
+    python benchmarks/bench_merge.py -n 200 --coverage-lines 5000
+"""
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+
+from pathlib import Path
+from time import perf_counter
+
+from kea2.report.coverage_trend import read_coverage_log
+from kea2.report.report_merger import TestReportMerger
+from kea2.report.utils import available_cpus
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "tests"))
+from test_reportMerger import ACTIVITIES, make_result_dir  # noqa: E402
+
+
+def legacy_last_coverage(coverage_file: Path):
+    """The former implementation, parsing every line to keep the last one"""
+    last_coverage = None
+    with open(coverage_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                last_coverage = json.loads(line)
+    return last_coverage
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the merge of result directories")
+    parser.add_argument("-n", dest="n", type=int, default=200, help="number of result directories")
+    parser.add_argument("--coverage-lines", type=int, default=5000, help="lines of every coverage.log")
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        result_dirs = []
+        for i in range(args.n):
+            result_dir = make_result_dir(tmp, str(i), tested=len(ACTIVITIES), fail=i % 2, crashes=i % 3)
+            line = (result_dir / f"output_{i}" / "coverage.log").read_text().splitlines()[-1] + "\n"
+            with open(result_dir / f"output_{i}" / "coverage.log", "w") as fp:
+                fp.write(line * args.coverage_lines)
+            result_dirs.append(result_dir)
+        print(f"{available_cpus()} cores, {args.n} directories, {args.coverage_lines} coverage lines each", flush=True)
+
+        coverage_files = [d / f"output_{i}" / "coverage.log" for i, d in enumerate(result_dirs)]
+        start = perf_counter()
+        legacy = [legacy_last_coverage(f) for f in coverage_files]
+        print(f"{'coverage (line by line)':<26} {perf_counter() - start:>9.2f}s", flush=True)
+        start = perf_counter()
+        last = [read_coverage_log(f)[1] for f in coverage_files]
+        print(f"{'coverage (single pass)':<26} {perf_counter() - start:>9.2f}s", flush=True)
+        assert last == legacy, "results differ"
+
+        for name, workers in (("merge (1 worker)", 1), ("merge (process pool)", None)):
+            start = perf_counter()
+            report = TestReportMerger(workers=workers).merge_reports(result_dirs, tmp / "merged")
+            print(f"{name:<26} {perf_counter() - start:>9.2f}s", flush=True)
+            assert report is not None, "merge failed"
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
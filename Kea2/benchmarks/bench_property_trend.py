@@ -0,0 +1,83 @@
+"""
+Benchmark the property execution trend of the bug report.
+
+Records N property executions spread over the steps like the steps.log parser does,
+then aligns the cumulative counter with M coverage samples. The former implementation
+(a scan of the counter for every sample) is timed on a subset of the samples and extrapolated.
+
+Usage:
+    python benchmarks/bench_property_trend.py --execs 100000 --samples 10000
+"""
+import argparse
+import random
+
+from time import perf_counter
+
+from kea2.report.bug_report_generator import BugReportGenerator
+
+
+def record_executions(execs: int, properties: int, steps: int):
+    """The executed properties counter, recorded as in BugReportGenerator._collect_test_data"""
+    executed_properties = set()
+    executed_properties_by_step = dict()
+    for step in sorted(random.randrange(steps) for _ in range(execs)):
+        property_name = f"bench.Props.test_{random.randrange(properties)}"
+        if property_name not in executed_properties:
+            executed_properties.add(property_name)
+            executed_properties_by_step[step] = len(executed_properties)
+    return executed_properties_by_step
+
+
+def legacy_trend(coverage_step_points, executed_properties_by_step):
+    """The former implementation, scanning the whole counter for every coverage sample"""
+    trend = []
+    for step_count in coverage_step_points:
+        executed_count = 0
+        latest_step = 0
+        for exec_step in executed_properties_by_step.keys():
+            if exec_step <= step_count and exec_step >= latest_step:
+                latest_step = exec_step
+                executed_count = executed_properties_by_step[exec_step]
+        trend.append({"stepsCount": step_count, "executedPropertiesCount": executed_count})
+    return trend
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the property execution trend")
+    parser.add_argument("--execs", type=int, default=100000, help="number of property executions")
+    parser.add_argument("--properties", type=int, default=100000, help="number of distinct properties")
+    parser.add_argument("--samples", type=int, default=10000, help="number of coverage samples")
+    parser.add_argument("--legacy-samples", type=int, default=100,
+                        help="coverage samples timed with the former implementation")
+    args = parser.parse_args()
+
+    random.seed(0)
+    steps = args.samples * 25
+    start = perf_counter()
+    executed_properties_by_step = record_executions(args.execs, args.properties, steps)
+    print(f"recorded {args.execs} executions ({len(executed_properties_by_step)} counter entries) "
+          f"in {perf_counter() - start:.2f}s", flush=True)
+
+    cov_trend = [{"stepsCount": (i + 1) * 25, "coverage": 0, "testedActivitiesCount": 0} for i in range(args.samples)]
+    generator = BugReportGenerator.__new__(BugReportGenerator)
+    generator._cov_trend = cov_trend
+
+    start = perf_counter()
+    trend = generator._generate_property_execution_trend(executed_properties_by_step)
+    cost = perf_counter() - start
+    print(f"{'bisect':<10} {cost * 1000:>10.1f} ms for {args.samples} samples", flush=True)
+
+    points = [c["stepsCount"] for c in random.sample(cov_trend, min(args.legacy_samples, len(cov_trend)))]
+    start = perf_counter()
+    legacy = legacy_trend(points, executed_properties_by_step)
+    legacy_cost = (perf_counter() - start) / len(points) * args.samples
+    print(f"{'legacy':<10} {legacy_cost * 1000:>10.1f} ms for {args.samples} samples "
+          f"(extrapolated from {len(points)})", flush=True)
+    print(f"speedup: {legacy_cost / cost:.0f}x", flush=True)
+
+    expected = {t["stepsCount"]: t["executedPropertiesCount"] for t in trend}
+    assert all(expected[t["stepsCount"]] == t["executedPropertiesCount"] for t in legacy), "results differ"
+
+
+if __name__ == "__main__":
+    main()
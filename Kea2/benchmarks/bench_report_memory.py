@@ -0,0 +1,128 @@
+"""
+Check that the bug report generation runs with flat memory as steps.log grows.
+
+Generates synthetic result dirs of increasing size (steps.log, coverage.log, screenshots)
+and generates the bug report of each one in a fresh process, reporting its peak RSS.
+The screenshots are hard links to a few small pngs so that large runs can be simulated quickly.
+
+Usage:
+    python benchmarks/bench_report_memory.py --steps 20000 80000 320000
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from pathlib import Path
+from time import perf_counter
+
+from PIL import Image
+
+
+STAMP = "bench"
+PROP = "bench.Props.test_prop"
+ACTIVITIES = [f"com.example.bench.Activity{i}" for i in range(200)]
+COVERAGE_PERIOD = 25
+# Stay below the hard link limit of the file systems
+LINKS_PER_FILE = 10000
+# The peak RSS of the largest run may exceed the smallest one by this ratio
+RSS_TOLERANCE = 1.2
+
+
+def make_result_dir(root: Path, steps: int) -> Path:
+    result_dir = root / f"res_{steps}"
+    output_dir = result_dir / f"output_{STAMP}"
+    screenshots_dir = output_dir / "screenshots"
+    screenshots_dir.mkdir(parents=True)
+
+    with open(result_dir / "bug_report_config.json", "w") as fp:
+        json.dump({"packageNames": ["com.example.bench"], "log_stamp": STAMP, "take_screenshots": True,
+                   "test_time": "2025-01-01 00:00:00"}, fp)
+    with open(result_dir / f"result_{STAMP}.json", "w") as fp:
+        json.dump({PROP: {"precond_satisfied": steps // 100, "executed": steps // 100, "fail": 0, "error": 0}}, fp)
+    (result_dir / f"property_exec_info_{STAMP}.json").touch()
+
+    img = Image.new("RGB", (36, 64), (255, 255, 255))
+
+    with open(output_dir / "steps.log", "w") as steps_log, open(output_dir / "coverage.log", "w") as cov_log:
+        for i in range(1, steps + 1):
+            name = f"screenshot-{i}-{STAMP}.png"
+            if i % LINKS_PER_FILE == 1:
+                template = screenshots_dir / name
+                img.save(template)
+            else:
+                os.link(template, screenshots_dir / name)
+            # BACK events are not marked: the benchmark measures parsing and rendering
+            step = {"Type": "Monkey", "MonkeyStepsCount": i,
+                    "Time": f"2025-01-01 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}.000",
+                    "Info": json.dumps({"act": "BACK"}), "Screenshot": name}
+            steps_log.write(json.dumps(step) + "\n")
+            if i % 100 == 0:
+                for state in ("start", "pass"):
+                    info = {"Type": "ScriptInfo", "MonkeyStepsCount": i, "Time": step["Time"],
+                            "Info": json.dumps({"propName": PROP, "state": state}), "Screenshot": name}
+                    steps_log.write(json.dumps(info) + "\n")
+            if i % COVERAGE_PERIOD == 0:
+                tested = ACTIVITIES[:min(len(ACTIVITIES), i // 1000 + 1)]
+                cov_log.write(json.dumps({
+                    "stepsCount": i, "coverage": len(tested) / len(ACTIVITIES) * 100,
+                    "totalActivitiesCount": len(ACTIVITIES), "testedActivitiesCount": len(tested),
+                    "totalActivities": ACTIVITIES, "testedActivities": tested,
+                    "activityCountHistory": {a: i for a in tested},
+                }) + "\n")
+    return result_dir
+
+
+def generate(result_dir: str):
+    """Run in the child process: generate the report and print the peak RSS in KiB"""
+    from kea2.report.bug_report_generator import BugReportGenerator
+
+    start = perf_counter()
+    BugReportGenerator(result_dir).generate_report()
+    cost = perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak //= 1024
+    print(json.dumps({"peak_kib": peak, "cost": cost}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the memory of the bug report generation")
+    parser.add_argument("--steps", type=int, nargs="+", default=[20000, 80000, 320000])
+    parser.add_argument("--generate", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.generate:
+        generate(args.generate)
+        return
+
+    tmp = Path(tempfile.mkdtemp())
+    peaks = []
+    try:
+        print(f"{'steps':>10} {'steps.log MiB':>14} {'peak RSS MiB':>13} {'time':>9}", flush=True)
+        for steps in sorted(args.steps):
+            result_dir = make_result_dir(tmp, steps)
+            log_size = (result_dir / f"output_{STAMP}" / "steps.log").stat().st_size
+            out = subprocess.run(
+                [sys.executable, __file__, "--generate", str(result_dir)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            res = json.loads(out.strip().splitlines()[-1])
+            peaks.append(res["peak_kib"])
+            print(f"{steps:>10} {log_size / 2**20:>14.1f} {res['peak_kib'] / 1024:>13.1f} {res['cost']:>8.2f}s", flush=True)
+            shutil.rmtree(result_dir)
+    finally:
+        shutil.rmtree(tmp)
+
+    growth = peaks[-1] / peaks[0]
+    print(f"Peak RSS growth: {growth:.2f}x", flush=True)
+    if growth > RSS_TOLERANCE:
+        sys.exit(f"The peak RSS grows with the log size (> {RSS_TOLERANCE}x).")
+
+
+if __name__ == "__main__":
+    main()
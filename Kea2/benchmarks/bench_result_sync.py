@@ -0,0 +1,104 @@
+"""
+Benchmark the device-to-host result sync transports.
+
+Pushes N synthetic screenshots to the device, then pulls them back with
+`pull_dir` (--sync-mode full), the adb sync protocol per file (--sync-mode incremental)
+and the tar stream (--sync-mode archive, with and without gzip).
+
+Usage:
+    python benchmarks/bench_result_sync.py -s emulator-5554 -n 2000
+"""
+import argparse
+import random
+import shutil
+import tarfile
+import tempfile
+
+from pathlib import Path
+from time import perf_counter
+from types import SimpleNamespace
+
+from PIL import Image
+
+from kea2.adbUtils import ADBDevice
+from kea2.resultSyncer import ResultSyncer
+
+
+DEVICE_ROOT = "/sdcard/kea2_bench"
+TEMPLATE_DIR = f"{DEVICE_ROOT}/template"
+DEVICE_OUTPUT_DIR = f"{DEVICE_ROOT}/output_bench"
+
+
+def prepare_screenshots(dev: ADBDevice, n: int, tmp: Path):
+    local_dir = tmp / "screenshots"
+    local_dir.mkdir()
+    for i in range(n):
+        # noisy images so that the png size is close to a real screenshot
+        img = Image.effect_noise((360, 640), random.randint(10, 80)).convert("RGB")
+        img.save(local_dir / f"screenshot-{i}-bench.png")
+    archive = tmp / "screenshots.tar"
+    with tarfile.open(archive, "w") as tar:
+        tar.add(local_dir, arcname="screenshots")
+    dev.shell(["rm", "-rf", DEVICE_ROOT])
+    dev.shell(["mkdir", "-p", TEMPLATE_DIR])
+    dev.sync.push(archive, f"{DEVICE_ROOT}/screenshots.tar")
+    dev.shell(["tar", "-xf", f"{DEVICE_ROOT}/screenshots.tar", "-C", TEMPLATE_DIR])
+
+
+def reset_device_output(dev: ADBDevice):
+    dev.shell(["rm", "-rf", DEVICE_OUTPUT_DIR])
+    dev.shell(["cp", "-r", TEMPLATE_DIR, DEVICE_OUTPUT_DIR])
+
+
+def run_case(name: str, sync_mode: str, sync_compress: bool, n: int, args, tmp: Path):
+    dev = ADBDevice()
+    reset_device_output(dev)
+    options = SimpleNamespace(
+        output_dir=tmp / name,
+        sync_mode=sync_mode,
+        sync_compress=sync_compress,
+        serial=args.serial,
+        transport_id=args.transport_id,
+        profile_period=25,
+        sync_policy="period",
+        sync_threshold_mb=50,
+        sync_threshold_files=500,
+        sync_min_free_mb=500,
+    )
+    syncer = ResultSyncer(DEVICE_OUTPUT_DIR, options)
+    start = perf_counter()
+    stats = syncer._sync_device_data()
+    cost = perf_counter() - start
+    pulled = len(list((syncer.output_dir / "screenshots").glob("*.png")))
+    print(
+        f"{name:<20} {cost:>9.2f}s {pulled / cost:>12.1f} {stats.bytes / cost / 2**20:>10.2f}"
+        f"{'' if pulled == n else f'  (pulled {pulled}/{n})'}",
+        flush=True
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the result sync transports")
+    parser.add_argument("-s", "--serial", dest="serial", default=None)
+    parser.add_argument("-t", "--transport-id", dest="transport_id", default=None)
+    parser.add_argument("-n", dest="n", type=int, default=1000, help="number of screenshots")
+    args = parser.parse_args()
+
+    ADBDevice.setDevice(args.serial, args.transport_id)
+    dev = ADBDevice()
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        print(f"Pushing {args.n} screenshots to {TEMPLATE_DIR}", flush=True)
+        prepare_screenshots(dev, args.n, tmp)
+        print(f"{'transport':<20} {'wall time':>10} {'files/sec':>12} {'MiB/sec':>10}", flush=True)
+        run_case("pull_dir", "full", False, args.n, args, tmp)
+        run_case("sync per file", "incremental", False, args.n, args, tmp)
+        run_case("tar stream", "archive", False, args.n, args, tmp)
+        run_case("tar.gz stream", "archive", True, args.n, args, tmp)
+    finally:
+        dev.shell(["rm", "-rf", DEVICE_ROOT])
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -54,19 +54,120 @@ def cmd_load_configs(args):
     pass
 
 
-def cmd_report(args):
+def _generate_report(report_dir: Path, rebuild=False, webp=False, sharded=False, format="html", workers=None):
+    """Generate the report of one result directory. Runs in a worker process of cmd_report."""
     from .report.bug_report_generator import BugReportGenerator
-    report_dirs = args.path
-    
-    for report_dir in report_dirs:
+    from time import perf_counter
+
+    start = perf_counter()
+    try:
+        logger.debug(f"Generating test report from directory: {report_dir}")
+        generator = BugReportGenerator(report_dir, rebuild=rebuild, webp=webp, sharded=sharded, workers=workers)
+        if format == "json":
+            output = generator.generate_summary()
+        else:
+            output = generator.generate_report()
+        error = None if output else "report generation failed, see the log above"
+    except Exception as e:
+        # One broken result directory doesn't stop the others
+        output, error = None, f"{type(e).__name__}: {e}"
+    return output, error, perf_counter() - start
+
+
+def cmd_report(args):
+    from concurrent.futures import as_completed
+    from time import perf_counter
+    from .report.utils import available_cpus, process_pool
+
+    report_dirs = []
+    for report_dir in dict.fromkeys(args.path):
         report_dir = Path(report_dir).resolve()
 
         if not report_dir.exists():
             logger.error(f"Report directory does not exist: {str(report_dir)}, Skipped.")
             continue
-        
-        logger.debug(f"Generating test report from directory: {report_dir}")
-        BugReportGenerator(report_dir).generate_report()
+        report_dirs.append(report_dir)
+    if not report_dirs:
+        return
+
+    cpus = available_cpus()
+    jobs = max(1, min(args.jobs or cpus, len(report_dirs)))
+    options = dict(rebuild=args.rebuild, webp=args.webp, sharded=args.sharded, format=args.format,
+                   # the cores are shared by the reports generated at the same time
+                   workers=max(1, cpus // jobs))
+
+    start = perf_counter()
+    failures = []
+
+    def _done(report_dir, output, error, cost):
+        if error:
+            failures.append((report_dir, error))
+        if len(report_dirs) > 1:
+            print(f"[{len(done)}/{len(report_dirs)}] {'❌' if error else '✅'} {report_dir} ({cost:.1f}s)"
+                  f"{f': {error}' if error else ''}", flush=True)
+
+    done = []
+    if jobs == 1:
+        for report_dir in report_dirs:
+            done.append(report_dir)
+            _done(report_dir, *_generate_report(report_dir, **options))
+    else:
+        logger.info(f"Generating {len(report_dirs)} reports, {jobs} at a time.")
+        with process_pool(max_workers=jobs) as executor:
+            futures = {executor.submit(_generate_report, report_dir, **options): report_dir for report_dir in report_dirs}
+            for future in as_completed(futures):
+                done.append(futures[future])
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # e.g. the worker process was killed
+                    result = (None, f"{type(e).__name__}: {e}", 0.0)
+                _done(futures[future], *result)
+
+    if len(report_dirs) > 1:
+        print(f"Generated {len(report_dirs) - len(failures)}/{len(report_dirs)} reports "
+              f"in {perf_counter() - start:.1f}s", flush=True)
+    for report_dir, error in failures:
+        logger.error(f"Failed to generate the report of {report_dir}: {error}")
+
+
+def cmd_steps(args):
+    """Print the steps of a test result in a range or around a property violation, read through the step index"""
+    from .report.bug_report_generator import BugReportGenerator
+    from .report.step_index import StepIndex
+
+    result_dir = Path(args.path).resolve()
+    if not result_dir.exists():
+        logger.error(f"Result directory does not exist: {str(result_dir)}")
+        return
+    if (args.range is None) == (args.around_violation is None):
+        logger.error("Specify one of --range and --around-violation.")
+        return
+
+    data_path = BugReportGenerator(result_dir).data_path
+    if not data_path.steps_log.exists():
+        logger.error(f"{data_path.steps_log} not exists")
+        return
+
+    with StepIndex(data_path.steps_index) as step_index:
+        # Index the steps logged since the last report or query
+        added = step_index.update(data_path.steps_log)
+        logger.debug(f"Indexed {added} new steps of {data_path.steps_log}")
+
+        if args.range is not None:
+            start, end = args.range
+        else:
+            violations = step_index.violations(data_path.steps_log)
+            if not 1 <= args.around_violation <= len(violations):
+                logger.error(f"Violation {args.around_violation} not found, {len(violations)} violations in this run.")
+                return
+            violation = violations[args.around_violation - 1]
+            print(f"# Violation {violation.index}: {violation.property_name} {violation.state}, "
+                  f"steps {violation.start} ~ {violation.end}", flush=True)
+            start, end = violation.start - args.context, violation.end + args.context
+
+        for record, line in step_index.read_steps(data_path.steps_log, start, end):
+            print(f"{record.index}\t{line.decode('utf-8', errors='replace').rstrip()}", flush=True)
 
 
 def cmd_merge(args):
@@ -75,7 +176,7 @@ def cmd_merge(args):
 
     try:
         # Validate input paths
-        if not args.paths or len(args.paths) < 2:
+        if args.into is None and (not args.paths or len(args.paths) < 2):
             logger.error("At least 2 test report paths are required for merging. Use -p to specify paths.")
             return
 
@@ -87,13 +188,16 @@ def cmd_merge(args):
             if not path_obj.is_dir():
                 raise NotADirectoryError(f"{path_obj}")
 
-        logger.debug(f"Merging {len(args.paths)} test report directories...")
-
         # Initialize merger
         merger = TestReportMerger()
 
         # Merge test reports
-        merged_report = merger.merge_reports(args.paths, args.output)
+        if args.into is not None:
+            logger.debug(f"Merging {len(args.paths)} test report directories into {args.into}...")
+            merged_report = merger.merge_into(args.into, args.paths)
+        else:
+            logger.debug(f"Merging {len(args.paths)} test report directories...")
+            merged_report = merger.merge_reports(args.paths, args.output)
 
         if merged_report is not None:
             print(f"✅ Test reports merged successfully!", flush=True)
@@ -106,6 +210,79 @@ def cmd_merge(args):
         logger.error(f"Error during merge operation: {e}")      
 
 
+def cmd_bench(args):
+    """Run a property suite against a simulated device, and report the throughput and latencies of kea2"""
+    import shutil
+    import tempfile
+    import unittest
+    from .multiDevice import load_suite
+    from .simulator import load_screens, run_bench, save_bench, synthetic_screens
+    from .utils import setCustomProjectRoot
+
+    try:
+        if args.hierarchies:
+            screens = load_screens(Path(args.hierarchies), args.package)
+        else:
+            screens = synthetic_screens(args.package, args.screens)
+    except ValueError as e:
+        logger.error(e)
+        return
+
+    project = None
+    if getProjectRoot() is None:
+        # outside of a kea2 project, the default configs of `kea2 init`
+        project = Path(tempfile.mkdtemp(prefix="kea2-bench-"))
+        shutil.copytree(Path(__file__).parent / "assets" / "fastbot_configs", project / "configs")
+        setCustomProjectRoot(project)
+    try:
+        suite = load_suite(["kea2 bench"] + args.properties) if args.properties else unittest.TestSuite()
+        result = run_bench(
+            suite, Path(args.output), screens, steps=args.steps, package=args.package,
+            step_latency=args.step_latency / 1000, dump_latency=args.dump_latency / 1000,
+            profile_period=args.profile_period, throttle=args.throttle, report_format=args.report_format,
+            sync_mode=args.sync_mode, take_screenshots=args.take_screenshots, record=args.record,
+        )
+    finally:
+        if project is not None:
+            setCustomProjectRoot(None)
+            shutil.rmtree(project, ignore_errors=True)
+
+    result.print_summary()
+    if args.json:
+        save_bench(result, Path(args.json))
+        print(f"[INFO] Benchmark saved to {args.json}", flush=True)
+
+
+def cmd_replay(args):
+    """Replay a session archive of `kea2 run --record` offline, checking that the same properties are satisfied"""
+    import json
+    from .multiDevice import load_suite
+    from .sessionRecord import replay_session
+
+    if getProjectRoot() is None:
+        logger.error("kea2 project not initialized. Use `kea2 init`.")
+        return
+    archive = Path(args.archive)
+    if not archive.exists():
+        logger.error(f"Session archive does not exist: {archive}")
+        return
+    if not args.properties:
+        logger.error("Specify the unittest args loading the property suite of the session.")
+        return
+
+    report = replay_session(archive, load_suite(["kea2 replay"] + args.properties))
+    report.print_summary()
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fp:
+            json.dump(report.to_dict(), fp, indent=4)
+    slower = [phase for phase, delta in report.deltas.items()
+              if args.max_slowdown is not None and delta is not None and delta > args.max_slowdown]
+    if slower:
+        logger.error(f"{', '.join(slower)} slower than the recorded session by more than {args.max_slowdown}%")
+    if report.mismatches or slower:
+        sys.exit(1)
+
+
 def cmd_run(args):
     base_dir = getProjectRoot()
     if base_dir is None:
@@ -136,6 +313,83 @@ _commands = [
                 nargs="+",
                 required=True,
                 help="Root directory path of the test results to generate report from"
+            ),
+            dict(
+                name=["rebuild"],
+                args=["--rebuild"],
+                action="store_true",
+                required=False,
+                help="Ignore the report checkpoint and parse all the logs again"
+            ),
+            dict(
+                name=["webp"],
+                args=["--webp"],
+                action="store_true",
+                required=False,
+                help="Generate full-size webp versions of the screenshots and link them in the report"
+            ),
+            dict(
+                name=["sharded"],
+                args=["--sharded"],
+                action="store_true",
+                required=False,
+                help="Generate a lightweight report page loading the screenshots, coverage, crashes and errors in chunks"
+            ),
+            dict(
+                name=["format"],
+                args=["--format"],
+                type=str,
+                default="html",
+                choices=["html", "json"],
+                required=False,
+                help="`json` only writes the numbers of the report to report_summary.json, skipping the screenshots and the HTML"
+            ),
+            dict(
+                name=["jobs"],
+                args=["-j", "--jobs"],
+                type=int,
+                default=None,
+                required=False,
+                help="Number of result directories processed at the same time (default: one per core)"
+            )
+        ]
+    ),
+    dict(
+        action=cmd_steps,
+        command="steps",
+        help="print the steps of a test result in a range or around a property violation",
+        flags=[
+            dict(
+                name=["path"],
+                args=["-p", "--path"],
+                type=str,
+                required=True,
+                help="Root directory path of the test result (res_* directory)"
+            ),
+            dict(
+                name=["range"],
+                args=["--range"],
+                type=int,
+                nargs=2,
+                metavar=("START", "END"),
+                required=False,
+                help="Print the steps START to END (step indexes of the bug report, inclusive)"
+            ),
+            dict(
+                name=["around_violation"],
+                args=["--around-violation"],
+                type=int,
+                metavar="INDEX",
+                required=False,
+                help="Print the steps of the property violation INDEX of the bug report"
+            ),
+            dict(
+                name=["context"],
+                args=["--context"],
+                type=int,
+                default=5,
+                required=False,
+                help="Steps printed before and after the violation"
             )
         ]
     ),
@@ -158,6 +412,173 @@ _commands = [
                 type=str,
                 required=False,
                 help="Output directory for merged report (optional)"
+            ),
+            dict(
+                name=["into"],
+                args=["--into"],
+                type=str,
+                required=False,
+                help="Fold the test report directories into this existing merged report directory, "
+                     "without reading the directories merged before"
+            )
+        ]
+    ),
+    dict(
+        action=cmd_bench,
+        command="bench",
+        help="run a property suite against a simulated device and report the steps/sec, latencies and memory of kea2",
+        flags=[
+            dict(
+                name=["steps"],
+                args=["--steps"],
+                type=int,
+                default=200,
+                required=False,
+                help="Number of monkey steps"
+            ),
+            dict(
+                name=["package"],
+                args=["-p", "--package"],
+                type=str,
+                default="com.kea2.bench",
+                required=False,
+                help="Package name of the simulated app under test"
+            ),
+            dict(
+                name=["hierarchies"],
+                args=["--hierarchies"],
+                type=str,
+                required=False,
+                help="Directory of recorded hierarchies (*.xml, named after their activity) replayed by the simulated device. "
+                     "Synthetic screens by default"
+            ),
+            dict(
+                name=["screens"],
+                args=["--screens"],
+                type=int,
+                default=5,
+                required=False,
+                help="Number of synthetic screens (without --hierarchies)"
+            ),
+            dict(
+                name=["step_latency"],
+                args=["--step-latency"],
+                type=float,
+                default=0,
+                required=False,
+                help="Milliseconds a monkey step takes on the simulated device"
+            ),
+            dict(
+                name=["dump_latency"],
+                args=["--dump-latency"],
+                type=float,
+                default=0,
+                required=False,
+                help="Milliseconds a hierarchy dump takes on the simulated device"
+            ),
+            dict(
+                name=["throttle"],
+                args=["--throttle"],
+                type=int,
+                default=0,
+                required=False,
+                help="The --throttle of kea2 run (ms)"
+            ),
+            dict(
+                name=["profile_period"],
+                args=["--profile-period"],
+                type=int,
+                default=25,
+                required=False,
+                help="The --profile-period of kea2 run (steps)"
+            ),
+            dict(
+                name=["sync_mode"],
+                args=["--sync-mode"],
+                type=str,
+                default="full",
+                choices=["full", "incremental", "archive"],
+                required=False,
+                help="The --sync-mode of kea2 run"
+            ),
+            dict(
+                name=["take_screenshots"],
+                args=["--take-screenshots"],
+                action="store_true",
+                required=False,
+                help="The simulated device takes a screenshot every step"
+            ),
+            dict(
+                name=["record"],
+                args=["--record"],
+                action="store_true",
+                required=False,
+                help="The --record of kea2 run: save the session archive of the simulated run"
+            ),
+            dict(
+                name=["report_format"],
+                args=["--report-format"],
+                type=str,
+                default="json",
+                choices=["html", "json"],
+                required=False,
+                help="The --report-format of kea2 run"
+            ),
+            dict(
+                name=["output"],
+                args=["-o", "--output"],
+                type=str,
+                default="output",
+                required=False,
+                help="Output directory of the test result"
+            ),
+            dict(
+                name=["json"],
+                args=["--json"],
+                type=str,
+                required=False,
+                help="Save the benchmark to this json file"
+            ),
+            dict(
+                name=["properties"],
+                args=["properties"],
+                nargs=argparse.REMAINDER,
+                help="unittest args loading the property suite (e.g. `discover -p quicktest.py`), after the options. "
+                     "No property by default"
+            )
+        ]
+    ),
+    dict(
+        action=cmd_replay,
+        command="replay",
+        help="replay a session archive of `kea2 run --record` offline, checking the properties satisfied and the timings",
+        flags=[
+            dict(
+                name=["archive"],
+                args=["-a", "--archive"],
+                type=str,
+                required=True,
+                help="The session archive (session_*.jsonl.gz in a res_* directory)"
+            ),
+            dict(
+                name=["max_slowdown"],
+                args=["--max-slowdown"],
+                type=float,
+                required=False,
+                help="Fail when a phase replayed is slower than recorded by more than this percentage"
+            ),
+            dict(
+                name=["json"],
+                args=["--json"],
+                type=str,
+                required=False,
+                help="Save the replay report to this json file"
+            ),
+            dict(
+                name=["properties"],
+                args=["properties"],
+                nargs=argparse.REMAINDER,
+                help="unittest args loading the property suite of the session (e.g. `discover -p quicktest.py`), after the options"
             )
         ]
     )
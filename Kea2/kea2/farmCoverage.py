@@ -0,0 +1,124 @@
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from .report.utils import read_lines_reversed
+from .utils import getLogger
+
+
+logger = getLogger(__name__)
+
+
+@dataclass
+class DeviceCoverage:
+    coverage_file: Path
+    steps: int = 0
+    tested: Set[str] = field(default_factory=set)
+    total: Set[str] = field(default_factory=set)
+    # the visits of the activities, from activityCountHistory
+    visits: Dict[str, int] = field(default_factory=dict)
+    # the steps and the number of tested activities at the last hints
+    steps_at_hint: int = -1
+    tested_at_hint: int = 0
+    _size: int = field(default=-1, repr=False)
+
+
+class CoverageAggregator:
+    """
+    The union of the activities visited by the devices of a farm run, read from the coverage.log
+    synced from every device (only its last complete line, when the file grew).
+
+    A device that ran since the previous hints without testing a new activity is stalled: it is given an
+    activity that no device has tested yet, to start from it. The stalled devices are given
+    different activities, and an activity isn't hinted again before all the unexplored ones were.
+    """
+
+    def __init__(self, coverage_files: Dict[str, Path]):
+        self.devices: Dict[str, DeviceCoverage] = {
+            device: DeviceCoverage(Path(path)) for device, path in coverage_files.items()
+        }
+        self._hinted: Set[str] = set()
+
+    def update(self) -> bool:
+        """Read the coverage.log files that grew. True when the union coverage changed."""
+        tested_count = len(self.tested)
+        total_count = len(self.total)
+        for device in self.devices.values():
+            try:
+                size = os.path.getsize(device.coverage_file)
+            except OSError:
+                continue
+            if size == device._size:
+                continue
+            device._size = size
+            coverage = self._read_last_coverage(device.coverage_file)
+            if coverage is None:
+                continue
+            device.steps = coverage.get("stepsCount", device.steps)
+            device.tested.update(coverage.get("testedActivities", []))
+            device.total.update(coverage.get("totalActivities", []))
+            device.visits = coverage.get("activityCountHistory", device.visits)
+        return len(self.tested) != tested_count or len(self.total) != total_count
+
+    @staticmethod
+    def _read_last_coverage(coverage_file: Path) -> Optional[Dict]:
+        for line in read_lines_reversed(coverage_file):
+            if not line.strip():
+                continue
+            try:
+                return json.loads(line)
+            except json.JSONDecodeError:
+                # being written
+                continue
+        return None
+
+    @property
+    def tested(self) -> Set[str]:
+        return set().union(*(device.tested for device in self.devices.values()))
+
+    @property
+    def total(self) -> Set[str]:
+        return set().union(*(device.total for device in self.devices.values()))
+
+    def unexplored(self) -> List[str]:
+        """The activities known by a device and tested by none, the least visited first"""
+        tested = self.tested
+        visits: Dict[str, int] = dict()
+        for device in self.devices.values():
+            for activity, count in device.visits.items():
+                visits[activity] = visits.get(activity, 0) + count
+        return sorted(self.total - tested, key=lambda activity: (visits.get(activity, 0), activity))
+
+    def hints(self, devices: Iterable[str]) -> Dict[str, str]:
+        """The unexplored activity to start from, for every stalled device among `devices`"""
+        stalled = []
+        for name in devices:
+            device = self.devices.get(name)
+            if device is None:
+                continue
+            if 0 <= device.steps_at_hint < device.steps and len(device.tested) <= device.tested_at_hint:
+                stalled.append(name)
+            device.steps_at_hint, device.tested_at_hint = device.steps, len(device.tested)
+        candidates = [activity for activity in self.unexplored() if activity not in self._hinted]
+        if len(candidates) < len(stalled):
+            # every unexplored activity was hinted, start over
+            self._hinted.clear()
+            candidates = self.unexplored()
+        hints = dict(zip(stalled, candidates))
+        self._hinted.update(hints.values())
+        return hints
+
+    def summary(self) -> Dict:
+        tested, total = self.tested, self.total
+        return {
+            "tested_activities_count": len(tested),
+            "total_activities_count": len(total),
+            "coverage": round(len(tested) / len(total) * 100, 2) if total else 0.0,
+            "unexplored": self.unexplored(),
+            "devices": {
+                name: {"steps": device.steps, "tested_activities_count": len(device.tested)}
+                for name, device in self.devices.items()
+            },
+        }
@@ -0,0 +1,292 @@
+import json
+import multiprocessing
+import unittest
+from dataclasses import asdict, is_dataclass
+from multiprocessing.connection import Connection
+from pathlib import Path
+from time import monotonic
+from typing import Dict, List, Optional, Sequence, Set
+
+from .farmCoverage import CoverageAggregator
+from .utils import getLogger
+
+
+logger = getLogger(__name__)
+
+FARM_SCHEDULE_FILE = "farm_schedule.json"
+
+# device -> property -> PropStatistic (as a dict)
+FarmStats = Dict[str, Dict[str, Dict[str, int]]]
+
+
+def property_names(suite: unittest.TestSuite) -> List[str]:
+    """The full names of the properties of a suite, as in result_*.json"""
+    from .keaUtils import PRECONDITIONS_MARKER, getFullPropName
+
+    def iter_tests(suite):
+        for test in suite:
+            if isinstance(test, unittest.TestSuite):
+                yield from iter_tests(test)
+            else:
+                yield test
+
+    names = []
+    for test in iter_tests(suite):
+        method = getattr(test, getattr(test, "_testMethodName", ""), None)
+        if method is not None and hasattr(method, PRECONDITIONS_MARKER):
+            names.append(getFullPropName(test))
+    return list(dict.fromkeys(names))
+
+
+def partition_properties(properties: Sequence[str], devices: Sequence[str], stats: Optional[FarmStats] = None) -> Dict[str, List[str]]:
+    """
+    Assign the properties to the devices. Every property is executed on at least one device.
+
+    Without statistics, the properties are spread evenly. With the precond_satisfied counts of the
+    devices, a property is replicated on more devices the more rarely it is satisfied: the most
+    satisfied property runs on one device, a property never satisfied runs on all of them.
+    A property goes to the devices where its precondition was satisfied first, then to the least loaded ones.
+    """
+    assignment: Dict[str, List[str]] = {device: [] for device in devices}
+    if not devices:
+        return assignment
+    stats = stats or {}
+    satisfied = {
+        prop: {device: prop_stats.get(prop, {}).get("precond_satisfied", 0) for device, prop_stats in stats.items()}
+        for prop in properties
+    }
+    totals = {prop: sum(satisfied[prop].values()) for prop in properties}
+    most = max(totals.values(), default=0)
+    load = dict.fromkeys(devices, 0.0)
+    # the frequently satisfied (heavy) properties first, then the rare ones fill the least loaded devices
+    for prop in sorted(properties, key=lambda prop: (-totals[prop], prop)):
+        rarity = 1 - totals[prop] / most if most else 0.0
+        replicas = 1 + int(round((len(devices) - 1) * rarity))
+        ranked = sorted(devices, key=lambda device: (satisfied[prop].get(device, 0) == 0, load[device], device))
+        weight = (totals[prop] if most else 1) / replicas
+        for device in ranked[:replicas]:
+            assignment[device].append(prop)
+            load[device] += weight
+    for device in devices:
+        assignment[device].sort()
+    return assignment
+
+
+class FarmCoordinator:
+    """
+    The farm scheduler of `kea2 run --devices ... --farm`, in the process driving the devices.
+
+    The properties are partitioned across the devices, so that the devices don't all execute the
+    same properties. Every device runner reports its PropStatistic over a pipe (FarmClient), and the
+    partition is recomputed every rebalance period from the reports (see partition_properties).
+
+    Every device has a time budget. When a device dies, what remains of its budget is shared
+    by the devices still running, and its properties are assigned to them.
+
+    With a CoverageAggregator (`--share-coverage`), the stalled devices are also sent an activity
+    no device has tested yet every rebalance period, see farmCoverage.
+    """
+
+    def __init__(self, properties: Sequence[str], devices: Sequence[str], budget: float, rebalance_period: float = 60,
+                 coverage: Optional[CoverageAggregator] = None):
+        """
+        Args:
+            budget: the running time of every device, in seconds
+            rebalance_period: the seconds between two rebalances (and coverage hints)
+            coverage: the coverage of the devices, to send them hints
+        """
+        self.properties = list(properties)
+        self.devices = list(devices)
+        self.alive: List[str] = list(devices)
+        self.budgets: Dict[str, float] = dict.fromkeys(devices, float(budget))
+        # the running time reported by the devices
+        self.elapsed: Dict[str, float] = dict.fromkeys(devices, 0.0)
+        self.steps: Dict[str, int] = dict.fromkeys(devices, 0)
+        self.stats: FarmStats = dict()
+        self.rebalance_period = rebalance_period
+        self.rebalances = 0
+        self.coverage = coverage
+        self.hints: Dict[str, List[str]] = {device: [] for device in devices}
+        self.assignment = partition_properties(self.properties, self.alive)
+        self._conns: Dict[str, Connection] = dict()
+        self._last_rebalance = monotonic()
+
+    def connect(self, device: str) -> Connection:
+        """The end of the pipe of a device runner. Its first assignment is waiting in the pipe."""
+        conn, device_conn = multiprocessing.Pipe()
+        self._conns[device] = conn
+        self._send(device)
+        return device_conn
+
+    def _send(self, device: str, message: Optional[Dict] = None):
+        """Send a message to a device runner, its assignment by default"""
+        conn = self._conns.get(device)
+        if conn is None:
+            return
+        if message is None:
+            message = {"properties": self.assignment.get(device, []), "budget": self.budgets[device]}
+        try:
+            conn.send(message)
+        except (BrokenPipeError, OSError):
+            logger.debug(f"{device} is gone, message not sent.")
+
+    def _receive(self):
+        for device, conn in list(self._conns.items()):
+            try:
+                while conn.poll():
+                    report = conn.recv()
+                    self.steps[device] = report.get("steps", self.steps[device])
+                    self.elapsed[device] = report.get("elapsed", self.elapsed[device])
+                    self.stats[device] = report.get("stats", {})
+            except (EOFError, OSError):
+                # the runner exited, device_exited() tells whether it died
+                self._conns.pop(device).close()
+
+    def poll(self):
+        """Read the reports of the devices, and rebalance when the period is over"""
+        self._receive()
+        if monotonic() - self._last_rebalance >= self.rebalance_period:
+            self.rebalance()
+            self.send_hints()
+
+    def send_hints(self):
+        """Send the stalled devices an activity the farm hasn't tested yet"""
+        if self.coverage is None:
+            return
+        if self.coverage.update():
+            summary = self.coverage.summary()
+            logger.info(f"Farm coverage: {summary['tested_activities_count']}/{summary['total_activities_count']} activities "
+                        f"({summary['coverage']}%)")
+        for device, activity in self.coverage.hints(self.alive).items():
+            logger.info(f"{device} is stalled, hinting {activity}")
+            self.hints[device].append(activity)
+            self._send(device, {"hint": activity})
+
+    def rebalance(self, send: bool = False):
+        """Partition the properties again. The devices are sent the new partition (and budgets when `send`)"""
+        self._last_rebalance = monotonic()
+        if not self.alive:
+            return
+        assignment = partition_properties(self.properties, self.alive, self.stats)
+        self.rebalances += 1
+        if assignment != self.assignment:
+            self.assignment = assignment
+            logger.info("Rebalanced the properties: " + ", ".join(f"{d}: {len(p)}" for d, p in assignment.items()))
+        elif not send:
+            return
+        for device in self.alive:
+            self._send(device)
+
+    def device_exited(self, device: str, died: bool):
+        """
+        A device runner exited, its properties go to the devices still running. When it died
+        (before the end of its budget), the rest of its budget is shared by them as well.
+        """
+        self._receive()
+        if device not in self.alive:
+            return
+        self.alive.remove(device)
+        self.assignment.pop(device, None)
+        conn = self._conns.pop(device, None)
+        if conn is not None:
+            conn.close()
+        if not self.alive:
+            return
+        if died:
+            remaining = max(0.0, self.budgets[device] - self.elapsed[device])
+            self.budgets[device] = self.elapsed[device]
+            for other in self.alive:
+                self.budgets[other] += remaining / len(self.alive)
+            logger.warning(f"{device} died after {self.elapsed[device]:.0f}s. "
+                           f"Its {remaining:.0f}s left go to {', '.join(self.alive)}.")
+        # the properties of the device go to the others
+        self.rebalance(send=died)
+
+    def summary(self) -> Dict:
+        return {
+            "properties": self.properties,
+            "rebalances": self.rebalances,
+            "devices": {
+                device: {
+                    "alive": device in self.alive,
+                    "budget_seconds": round(self.budgets[device], 1),
+                    "elapsed_seconds": round(self.elapsed[device], 1),
+                    "steps": self.steps[device],
+                    "properties": self.assignment.get(device, []),
+                    "stats": self.stats.get(device, {}),
+                    "hints": self.hints[device],
+                }
+                for device in self.devices
+            },
+            "coverage": self.coverage.summary() if self.coverage else None,
+        }
+
+    def save(self, output_dir: Path) -> Path:
+        path = Path(output_dir) / FARM_SCHEDULE_FILE
+        with open(path, "w", encoding="utf-8") as fp:
+            json.dump(self.summary(), fp, indent=4)
+        return path
+
+
+class FarmClient:
+    """
+    The device side of the farm scheduler, used by KeaTestRunner: the properties assigned to the
+    device and its time budget, updated by the coordinator, and the PropStatistic reports.
+    """
+
+    def __init__(self, conn: Connection, report_period: int = 25):
+        """
+        Args:
+            report_period: the number of monkey events between two reports
+        """
+        self.conn = conn
+        self.report_period = max(1, report_period)
+        self.properties: Set[str] = set()
+        self.budget: Optional[float] = None
+        # an activity no device has tested yet, to start from
+        self.hint: Optional[str] = None
+        self._last_report = 0
+        self._connected = True
+        # the first assignment was sent before the runner started
+        self._receive(block=True)
+
+    def _receive(self, block: bool = False):
+        if not self._connected:
+            return
+        try:
+            while block or self.conn.poll():
+                message = self.conn.recv()
+                if "properties" in message:
+                    self.properties = set(message["properties"])
+                    self.budget = message["budget"]
+                self.hint = message.get("hint", self.hint)
+                block = False
+        except (EOFError, OSError):
+            logger.warning("Lost the farm coordinator. Keeping the last assignment.")
+            self._connected = False
+
+    def pop_hint(self) -> Optional[str]:
+        hint, self.hint = self.hint, None
+        return hint
+
+    def assigned(self, prop_name: str) -> bool:
+        return prop_name in self.properties
+
+    def should_stop(self, elapsed: float) -> bool:
+        return self.budget is not None and elapsed >= self.budget
+
+    def update(self, steps: int, elapsed: float, stats: Dict):
+        """Report the statistics every report period, and take the new assignment if any"""
+        if self._connected and steps - self._last_report >= self.report_period:
+            self._last_report = steps
+            report = {
+                "steps": steps,
+                "elapsed": elapsed,
+                "stats": {name: asdict(stat) if is_dataclass(stat) else dict(stat) for name, stat in stats.items()},
+            }
+            try:
+                self.conn.send(report)
+            except (BrokenPipeError, OSError):
+                logger.warning("Lost the farm coordinator. Keeping the last assignment.")
+                self._connected = False
+        self._receive()
@@ -20,13 +20,16 @@ import uiautomator2 as u2
 
 from .absDriver import AbstractDriver
 from .report.bug_report_generator import BugReportGenerator
-from .resultSyncer import ResultSyncer
-from .logWatcher import LogWatcher
+from .resultSyncer import ResultSyncer, SyncProgress
+from .logWatcher import LogEvent, LogEventType, LogWatcher
 from .utils import TimeStamp, catchException, getProjectRoot, getLogger, loadFuncsFromFile, timer
 from .u2Driver import StaticU2UiObject, StaticXpathObject, U2Driver
 from .fastbotManager import FastbotManager
 from .adbUtils import ADBDevice
 from .mixin import BetterConsoleLogExtensionMixin
+from .farmScheduler import FarmClient
+from .sessionRecord import SessionRecorder, session_file
+from .stepTimer import StepTimer, perf_file
 
 
 hybrid_mode = ContextVar("hybrid_mode", default=False)
@@ -147,6 +150,21 @@ class Options:
     post_failure_screenshots: int = 0
     # The root of output dir on device
     device_output_root: str = "/sdcard"
+    # How to sync the results from device. "full" pulls the whole output dir, "incremental" only pulls the new data,
+    # "archive" is "incremental" but streams the new screenshots as tar archives
+    sync_mode: Literal["full", "incremental", "archive"] = "full"
+    # gzip the tar stream on device (only for sync_mode "archive")
+    sync_compress: bool = False
+    # When to sync. "period" syncs every profile_period steps, "adaptive" syncs according to the device data growth
+    sync_policy: Literal["period", "adaptive"] = "period"
+    # (adaptive sync policy) sync when the device output grows by this many MB
+    sync_threshold_mb: int = 50
+    # (adaptive sync policy) sync when this many screenshots are waiting on device
+    sync_threshold_files: int = 500
+    # (adaptive sync policy) sync when the free space of device output root drops below this many MB
+    sync_min_free_mb: int = 500
+    # The report generated at the end of the run. "html" is bug_report.html, "json" only the numbers (report_summary.json)
+    report_format: Literal["html", "json"] = "html"
     # the debug mode
     debug: bool = False
     # Activity WhiteList File
@@ -161,6 +179,8 @@ class Options:
     unittest_args: List[str] = None
     # Extra args (directly passed to fastbot)
     extra_args: List[str] = None
+    # record the hierarchies, block lists, properties and timings of the steps into session_<stamp>.jsonl.gz
+    record: bool = False
 
     def __setattr__(self, name, value):
         if value is None:
@@ -220,6 +240,20 @@ class Options:
         if self.throttle < 0:
             raise ValueError("--throttle should be greater than or equal to 0")
 
+        if self.sync_mode not in ("full", "incremental", "archive"):
+            raise ValueError(f"--sync-mode should be one of full, incremental, archive. Got {self.sync_mode}")
+        if self.sync_compress and self.sync_mode != "archive":
+            raise ValueError("--sync-compress is only available in --sync-mode archive.")
+
+        if self.sync_policy not in ("period", "adaptive"):
+            raise ValueError(f"--sync-policy should be one of period, adaptive. Got {self.sync_policy}")
+        for name in ("sync_threshold_mb", "sync_threshold_files", "sync_min_free_mb"):
+            if getattr(self, name) < 0:
+                raise ValueError(f"--{name.replace('_', '-')} should be greater than or equal to 0")
+
+        if self.report_format not in ("html", "json"):
+            raise ValueError(f"--report-format should be one of html, json. Got {self.report_format}")
+
         if self.agent == 'u2' and self.driverName == None:
             raise ValueError("--driver-name should be specified when customizing script in --agent u2")
 
@@ -404,6 +438,9 @@ class KeaTestRunner(TextTestRunner, KeaOptionSetter):
     resultclass: JsonResult
     allProperties: PropertyStore
     _block_funcs: Dict[Literal["widgets", "trees"], List[Callable]] = None
+    stepsCount: int = 0
+    # set by `kea2 run --devices ... --farm`: the properties of the device and its time budget
+    farmClient: "FarmClient" = None
 
     def _setOuputDir(self):
         output_dir = self.options.output_dir
@@ -454,7 +491,10 @@ class KeaTestRunner(TextTestRunner, KeaOptionSetter):
             fb = FastbotManager(self.options, LOGFILE)
             fb.start()
 
-            log_watcher = LogWatcher(LOGFILE)
+            log_watcher = LogWatcher(LOGFILE, subscribers={
+                LogEventType.CRASH: [self._on_app_failure],
+                LogEventType.ANR: [self._on_app_failure],
+            })
             
             if self.options.agent == "u2":
                 # initialize the result.json file
@@ -467,6 +507,9 @@ class KeaTestRunner(TextTestRunner, KeaOptionSetter):
 
                 resultSyncer = ResultSyncer(fb.device_output_dir, self.options)
                 resultSyncer.run()
+                recorder = self._makeRecorder() if self.options.record else None
+                stepTimer = StepTimer(path=perf_file(self.options.output_dir, STAMP))
+                stepTimer.activate()
                 start_time = perf_counter()
                 fb_is_running = True
                 self.stepsCount = 0
@@ -487,15 +530,26 @@ class KeaTestRunner(TextTestRunner, KeaOptionSetter):
                         fb.sendInfo("kill_apps")
                         continue
 
+                    if self.farmClient and self.farmClient.hint:
+                        self._startHintedActivity(self.farmClient.pop_hint())
+
+                    stepTimer.start_step(self.stepsCount)
                     try:
                         if fb.executed_prop:
                             fb.executed_prop = False
-                            xml_raw = fb.dumpHierarchy()
+                            source, stepInfo = "dumpHierarchy", None
+                            with stepTimer.phase("rpc"):
+                                xml_raw = fb.dumpHierarchy()
                         else:
                             self.stepsCount += 1
                             logger.info(f"Sending monkeyEvent {self._monkey_event_count}")
-                            xml_raw = fb.stepMonkey(self._monkeyStepInfo)
-                        propsSatisfiedPrecond = self.getValidProperties(xml_raw, result)
+                            source = "stepMonkey"
+                            with stepTimer.phase("block"):
+                                stepInfo = self._monkeyStepInfo
+                            with stepTimer.phase("rpc"):
+                                xml_raw = fb.stepMonkey(stepInfo)
+                        with stepTimer.phase("preconds"):
+                            propsSatisfiedPrecond = self.getValidProperties(xml_raw, result)
                     except u2.HTTPError:
                         logger.info("Connection refused by remote.")
                         if fb.get_return_code() == 0:
@@ -504,8 +558,14 @@ class KeaTestRunner(TextTestRunner, KeaOptionSetter):
                             break
                         raise RuntimeError("Fastbot Aborted.")
 
-                    if self.options.profile_period and self.stepsCount % self.options.profile_period == 0:
-                        resultSyncer.sync_event.set()
+                    if recorder:
+                        block = {"widgets": stepInfo["block_widgets"], "trees": stepInfo["block_trees"]} if stepInfo else None
+                        recorder.begin(self.stepsCount, source, xml_raw, block,
+                                       [getFullPropName(t) for t in propsSatisfiedPrecond.values()], stepTimer.timings)
+                    with stepTimer.phase("sync"):
+                        resultSyncer.trigger(self.stepsCount)
+                    if self.farmClient:
+                        self.farmClient.update(self.stepsCount, perf_counter() - start_time, result.res)
 
                     # Go to the next round if no precond satisfied
                     if len(propsSatisfiedPrecond) == 0:
@@ -524,29 +584,52 @@ class KeaTestRunner(TextTestRunner, KeaOptionSetter):
                         print("Not executed any property due to probability.", flush=True)
                         continue
 
+                    if self.farmClient:
+                        propsNameFilteredByP = [
+                            propName for propName in propsNameFilteredByP
+                            if self.farmClient.assigned(getFullPropName(propsSatisfiedPrecond[propName]))
+                        ]
+                        if len(propsNameFilteredByP) == 0:
+                            print("Not executed any property: assigned to other devices.", flush=True)
+                            continue
+
                     execPropName = random.choice(propsNameFilteredByP)
                     test = propsSatisfiedPrecond[execPropName]
+                    if recorder:
+                        recorder.select(getFullPropName(test))
                     # Dependency Injection. driver when doing scripts
                     self.scriptDriver = U2Driver.getScriptDriver(mode="proxy")
                     
                     setattr(test, self.options.driverName, self.scriptDriver)
 
-                    result.addExcuted(test, self.stepsCount)
-                    fb.logScript(result.lastExecutedInfo)
-                    try:
-                        test(result)
-                    finally:
-                        result.printError(test)
-
-                    result.updateExectedInfo()
-                    fb.logScript(result.lastExecutedInfo)
+                    # The property shares the adb transport with the syncer. Hold the syncs until it finishes.
+                    with resultSyncer.hold(), stepTimer.phase("property"):
+                        result.addExcuted(test, self.stepsCount)
+                        with stepTimer.phase("logScript"):
+                            fb.logScript(result.lastExecutedInfo)
+                        try:
+                            test(result)
+                        finally:
+                            result.printError(test)
+
+                        result.updateExectedInfo()
+                        with stepTimer.phase("logScript"):
+                            fb.logScript(result.lastExecutedInfo)
                     fb.executed_prop = True
-                    result.flushResult()
+                    with stepTimer.phase("flush"):
+                        result.flushResult()
 
+                stepTimer.finish(self.stepsCount)
+                logger.info(f"Step timings saved to {stepTimer.save(stepTimer.path)}")
+                if recorder:
+                    recorder.close()
                 if fb_is_running:
                     fb.stopMonkey()
                 result.flushResult()
-                resultSyncer.close()
+                # Pipelined close-out: the final sync and the device cleanup run in background,
+                # overlapping with the fastbot shutdown and the bug report generation.
+                teardown_start = perf_counter()
+                sync_progress = resultSyncer.close_async()
                 
             fb.join()
             print(f"Finish sending monkey events.", flush=True)
@@ -555,12 +638,41 @@ class KeaTestRunner(TextTestRunner, KeaOptionSetter):
         result.logSummary()
 
         if self.options.agent == "u2":
-            self._generate_bug_report()
+            self._generate_bug_report(sync_progress)
+            resultSyncer.join()
+            logger.info(f"Teardown cost {perf_counter() - teardown_start:.4f} seconds.")
 
         self.tearDown()
         return result
     
+    def _makeRecorder(self) -> SessionRecorder:
+        header = {
+            "stamp": STAMP,
+            "packageNames": self.options.packageNames,
+            "driverName": self.options.driverName,
+            "properties": [getFullPropName(t) for t in self.allProperties.values()],
+        }
+        recorder = SessionRecorder(session_file(self.options.output_dir, STAMP), header)
+        logger.info(f"Recording the session to {recorder.path}")
+        return recorder
+
+    def _on_app_failure(self, event: LogEvent):
+        kind = "Crash" if event.type == LogEventType.CRASH else "ANR"
+        logger.warning(f"{kind} detected in {event.package} (pid {event.pid}) at step {self.stepsCount}.")
+
+    def _startHintedActivity(self, activity: str):
+        """Start an activity that no device of the farm has tested yet (--share-coverage)"""
+        package = next((p for p in self.options.packageNames if activity.startswith(f"{p}.")), self.options.packageNames[0])
+        logger.info(f"Exploration stalled. Starting {activity}, not tested by the farm yet.")
+        try:
+            self.scriptDriver.app_start(package, activity)
+        except Exception as e:
+            # e.g. the activity isn't exported
+            logger.warning(f"Failed to start {activity}: {e}")
+
     def shouldStop(self, start_time):
+        if self.farmClient:
+            return self.farmClient.should_stop(perf_counter() - start_time)
         if self.options.running_mins is None:
             return False
         return (perf_counter() - start_time) >= self.options.running_mins * 60
@@ -785,9 +897,14 @@ class KeaTestRunner(TextTestRunner, KeaOptionSetter):
 
     @timer(r"Generating bug report cost %cost_time seconds.")
     @catchException("Error when generating bug report")
-    def _generate_bug_report(self):
-        logger.info("Generating bug report")
-        BugReportGenerator(self.options.output_dir).generate_report()
+    def _generate_bug_report(self, sync_progress: "SyncProgress" = None):
+        generator = BugReportGenerator(self.options.output_dir)
+        if self.options.report_format == "json":
+            logger.info("Generating report summary")
+            generator.generate_summary(sync_progress=sync_progress)
+        else:
+            logger.info("Generating bug report")
+            generator.generate_report(sync_progress=sync_progress)
 
     def tearDown(self):
         """tearDown method. Cleanup the env.
@@ -16,6 +16,42 @@ def _set_runner_parser(subparsers: "argparse._SubParsersAction[argparse.Argument
         help="The serial of your device. Can be found with `adb devices`",
     )
 
+    parser.add_argument(
+        "--devices",
+        dest="devices",
+        required=False,
+        default=None,
+        type=str,
+        help="Run on several devices at once: `all` for every connected device, or a comma separated list of serials (e.g., `emulator-5554,emulator-5556`). Every device runs in its own process with its own output dir (`<output-dir>/<serial>`), and the reports are merged at the end.",
+    )
+
+    parser.add_argument(
+        "--farm",
+        dest="farm",
+        required=False,
+        action="store_true",
+        default=False,
+        help="(--devices) Partition the properties across the devices instead of running all of them on every device. The partition is rebalanced from the property statistics of the devices every --rebalance-period seconds, so that rarely satisfied properties run on more devices. When a device dies, the rest of its running time goes to the others.",
+    )
+
+    parser.add_argument(
+        "--rebalance-period",
+        dest="rebalance_period",
+        type=int,
+        required=False,
+        default=60,
+        help="(--farm) The period (in seconds) to rebalance the properties across the devices.",
+    )
+
+    parser.add_argument(
+        "--share-coverage",
+        dest="share_coverage",
+        required=False,
+        action="store_true",
+        default=False,
+        help="(--farm) Collect the activities tested by all the devices. Every --rebalance-period seconds, a device whose coverage didn't grow starts from an activity that no device has tested yet.",
+    )
+
     parser.add_argument(
         "-t",
         "--transport-id",
@@ -142,6 +178,81 @@ def _set_runner_parser(subparsers: "argparse._SubParsersAction[argparse.Argument
         help="The root of device output dir. Kea2 will temporarily save the screenshots and result log into `<device-output-root>/output_*********/`. Make sure the root dir can be access.",
     )
 
+    parser.add_argument(
+        "--sync-mode",
+        dest="sync_mode",
+        type=str,
+        required=False,
+        default="full",
+        choices=["full", "incremental", "archive"],
+        help="How to sync the results from the device. `full` pulls the whole device output dir every profile period. `incremental` only pulls the new screenshots and the new bytes of the logs. `archive` works like `incremental` but streams the new screenshots as a single tar archive.",
+    )
+
+    parser.add_argument(
+        "--sync-compress",
+        dest="sync_compress",
+        required=False,
+        action="store_true",
+        default=False,
+        help="Compress the tar stream with gzip on the device (only available in `--sync-mode archive`).",
+    )
+
+    parser.add_argument(
+        "--sync-policy",
+        dest="sync_policy",
+        type=str,
+        required=False,
+        default="period",
+        choices=["period", "adaptive"],
+        help="When to sync the results from the device. `period` syncs every profile period. `adaptive` probes the device output every profile period and only syncs when enough data is waiting (see --sync-threshold-mb, --sync-threshold-files, --sync-min-free-mb). Syncs are postponed while a property is running.",
+    )
+
+    parser.add_argument(
+        "--sync-threshold-mb",
+        dest="sync_threshold_mb",
+        type=int,
+        required=False,
+        default=50,
+        help="(--sync-policy adaptive) Sync when the device output grows by this many MB.",
+    )
+
+    parser.add_argument(
+        "--sync-threshold-files",
+        dest="sync_threshold_files",
+        type=int,
+        required=False,
+        default=500,
+        help="(--sync-policy adaptive) Sync when this many screenshots are waiting on the device.",
+    )
+
+    parser.add_argument(
+        "--sync-min-free-mb",
+        dest="sync_min_free_mb",
+        type=int,
+        required=False,
+        default=500,
+        help="(--sync-policy adaptive) Sync when the free space of --device-output-root drops below this many MB.",
+    )
+
+    parser.add_argument(
+        "--report-format",
+        dest="report_format",
+        type=str,
+        required=False,
+        default="html",
+        choices=["html", "json"],
+        help="The report generated at the end of the run. `html` generates bug_report.html. `json` only writes the numbers of the report to report_summary.json, skipping the screenshots and the HTML.",
+    )
+
+    parser.add_argument(
+        "--record",
+        dest="record",
+        required=False,
+        action="store_true",
+        default=False,
+        help="Record the hierarchies, block lists, satisfied and selected properties and the timings of every step into session_<stamp>.jsonl.gz in the result dir, to be replayed by `kea2 replay` (only available in `--agent u2`).",
+    )
+
     parser.add_argument(
         "--act-whitelist-file",
         dest="act_whitelist_file",
@@ -187,6 +298,14 @@ def extra_args_info_logger(args):
 
 def driver_info_logger(args):
     print("[INFO] Driver Settings:", flush=True)
+    if args.devices:
+        print("  devices:", args.devices, flush=True)
+    if args.farm:
+        print("  farm:", args.farm, "rebalance_period:", args.rebalance_period, flush=True)
+    if args.share_coverage:
+        print("  share_coverage:", args.share_coverage, flush=True)
+    if args.record:
+        print("  record:", args.record, flush=True)
     if args.serial:
         print("  serial:", args.serial, flush=True)
     if args.transport_id:
@@ -211,6 +330,14 @@ def driver_info_logger(args):
         print("  max_step:", args.max_step, flush=True)
     if args.restart_app_period > 0:
         print("  restart_app_period:", args.restart_app_period, flush=True)
+    if args.sync_mode != "full":
+        print("  sync_mode:", args.sync_mode, flush=True)
+    if args.sync_compress:
+        print("  sync_compress:", args.sync_compress, flush=True)
+    if args.sync_policy != "period":
+        print("  sync_policy:", args.sync_policy, flush=True)
+    if args.report_format != "html":
+        print("  report_format:", args.report_format, flush=True)
 
 
 def parse_args(argv: List):
@@ -224,6 +351,17 @@ def parse_args(argv: List):
 
 def _sanitize_args(args):
     args.mode = None
+    if args.devices and (args.serial or args.transport_id):
+        raise ValueError("--devices can't be used with --serial or --transport-id")
+    if args.farm and not args.devices:
+        raise ValueError("--farm should be used with --devices")
+    if args.share_coverage and not args.farm:
+        raise ValueError("--share-coverage should be used with --farm")
+    if args.record and args.agent != "u2":
+        raise ValueError("--record is only available in --agent u2")
+    for name in ("sync_threshold_mb", "sync_threshold_files", "sync_min_free_mb"):
+        if getattr(args, name) < 0:
+            raise ValueError(f"--{name.replace('_', '-')} should be greater than or equal to 0")
     args.propertytest_args = None
     if args.agent == "u2" and not args.driver_name:
         if args.extra == []:
@@ -251,18 +389,14 @@ def _sanitize_args(args):
     args.unittest_args = extra_args["unittest"]
     args.propertytest_args = extra_args["propertytest"]
     args.extra = extra_args["extra"]
+    if args.farm and (args.agent != "u2" or args.unittest_args):
+        raise ValueError("--farm is only available for property-based testing (propertytest) in --agent u2")
 
 
-def run(args=None):
-    if args is None:
-        args = parse_args(sys.argv[1:])
-    _sanitize_args(args)
-    driver_info_logger(args)
-    extra_args_info_logger(args)
-
-    from kea2 import KeaTestRunner, Options, HybridTestRunner
+def _build_options(args):
+    from kea2 import Options
     from kea2.u2Driver import U2Driver
-    options = Options(
+    return Options(
         agent=args.agent,
         driverName=args.driver_name,
         Driver=U2Driver,
@@ -279,21 +413,53 @@ def run(args=None):
         pre_failure_screenshots=args.pre_failure_screenshots,
         post_failure_screenshots=args.post_failure_screenshots,
         device_output_root=args.device_output_root,
+        sync_mode=args.sync_mode,
+        sync_compress=args.sync_compress,
+        sync_policy=args.sync_policy,
+        sync_threshold_mb=args.sync_threshold_mb,
+        sync_threshold_files=args.sync_threshold_files,
+        sync_min_free_mb=args.sync_min_free_mb,
+        report_format=args.report_format,
         act_whitelist_file=args.act_whitelist_file,
         act_blacklist_file=args.act_blacklist_file,
         restart_app_period=args.restart_app_period,
         propertytest_args=args.propertytest_args,
         unittest_args=args.unittest_args,
         extra_args=args.extra,
+        record=args.record,
     )
-    
-    is_hybrid_test = True if options.unittest_args else False
+
+
+def _select_runner(args, options=None):
+    """The test runner and the unittest argv of the run. The options are set on the runner when given."""
+    from kea2 import KeaTestRunner, HybridTestRunner
+
+    is_hybrid_test = True if args.unittest_args else False
     if is_hybrid_test:
-        HybridTestRunner.setOptions(options)
+        if options:
+            HybridTestRunner.setOptions(options)
         testRunner = HybridTestRunner
-        argv = ["python3 -m unittest"] + options.unittest_args
-    if not is_hybrid_test or options.agent == "u2":
-        KeaTestRunner.setOptions(options)
+        argv = ["python3 -m unittest"] + args.unittest_args
+    if not is_hybrid_test or args.agent == "u2":
+        if options:
+            KeaTestRunner.setOptions(options)
         testRunner = KeaTestRunner
-        argv = ["python3 -m unittest"] + options.propertytest_args
+        argv = ["python3 -m unittest"] + args.propertytest_args
+    return testRunner, argv
+
+
+def run(args=None):
+    if args is None:
+        args = parse_args(sys.argv[1:])
+    _sanitize_args(args)
+    driver_info_logger(args)
+    extra_args_info_logger(args)
+
+    if args.devices:
+        from kea2.multiDevice import run_devices
+        run_devices(args, _select_runner(args)[1])
+        return
+
+    options = _build_options(args)
+    testRunner, argv = _select_runner(args, options)
     unittest.main(module=None, argv=argv, testRunner=testRunner)
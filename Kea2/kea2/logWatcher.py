@@ -1,16 +1,52 @@
 import re
 import os
+import codecs
+import ctypes
+import ctypes.util
+import select
+import sys
 import threading
 import time
 
-from typing import IO
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
 from .utils import getLogger
 
 
 logger = getLogger(__name__)
 
-PATTERN_EXCEPTION = re.compile(r"\[Fastbot\].+Internal\serror\n([\s\S]*)")
-PATTERN_STATISTIC = re.compile(r".+Monkey\sis\sover!\n([\s\S]+)")
+PATTERN_EXCEPTION = re.compile(r"\[Fastbot\].+Internal\serror$")
+PATTERN_STATISTIC = re.compile(r".+Monkey\sis\sover!$")
+PATTERN_CRASH = re.compile(r"^// CRASH: (\S+) \(pid (\d+)\)")
+PATTERN_ANR = re.compile(r"^// NOT RESPONDING: (\S+) \(pid (\d+)\)")
+PATTERN_STEP = re.compile(r"^:Sending ")
+PATTERN_COUNTER = re.compile(r"^\s*([A-Za-z][\w ]*?)\s*[:=]\s*(\d+)\s*$")
+
+READ_SIZE = 64 * 1024
+MIN_POLL_INTERVAL = 0.05
+MAX_POLL_INTERVAL = 2
+CLOSE_LATENCY = 0.5
+
+
+class LogEventType:
+    CRASH = "crash"
+    ANR = "anr"
+    INTERNAL_ERROR = "internal_error"
+    STEP = "step"
+    STATISTIC = "statistic"
+    ANY = "*"
+
+
+@dataclass
+class LogEvent:
+    type: str
+    line_no: int  # line number of the first line of the event in the fastbot log
+    message: str = ""  # the header line
+    body: str = ""  # the following lines of a multi-line event
+    package: Optional[str] = None  # crash and anr only
+    pid: Optional[int] = None  # crash and anr only
+    counters: Dict[str, int] = field(default_factory=dict)  # step and statistic only
 
 
 def thread_excepthook(args):
@@ -18,75 +54,238 @@ def thread_excepthook(args):
     os._exit(1)
 
 
+class LogParser:
+    """
+    Line-oriented parser of the fastbot log.
+
+    `feed` accepts arbitrary chunks. Incomplete lines and unfinished multi-line blocks
+    are kept across chunks, so every line is parsed exactly once.
+    """
+
+    def __init__(self, emit: Callable[[LogEvent], None]):
+        self.emit = emit
+        self.line_no = 0
+        self.steps = 0
+        self._partial = ""
+        # the multi-line block being collected
+        self._block: Optional[LogEvent] = None
+        self._block_lines: List[str] = []
+
+    def feed(self, chunk: str):
+        if not chunk:
+            return
+        lines = (self._partial + chunk).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self.line_no += 1
+            self._parse_line(line.rstrip("\r"))
+        # an internal error kills fastbot: report it as soon as we have the stack
+        if self._block and self._block.type == LogEventType.INTERNAL_ERROR and self._block_lines:
+            self._end_block()
+
+    def flush(self):
+        """Parse the trailing partial line and close the pending block. Called when the log ends."""
+        if self._partial:
+            self.line_no += 1
+            line, self._partial = self._partial, ""
+            self._parse_line(line.rstrip("\r"))
+        self._end_block()
+
+    def _parse_line(self, line: str):
+        if self._block:
+            if self._in_block(line):
+                self._block_lines.append(line)
+                return
+            self._end_block()
+
+        if PATTERN_STEP.match(line):
+            self.steps += 1
+            self.emit(LogEvent(LogEventType.STEP, self.line_no, line, counters={"steps": self.steps}))
+        elif m := PATTERN_CRASH.match(line):
+            self._start_block(LogEvent(LogEventType.CRASH, self.line_no, line, package=m.group(1), pid=int(m.group(2))))
+        elif m := PATTERN_ANR.match(line):
+            self._start_block(LogEvent(LogEventType.ANR, self.line_no, line, package=m.group(1), pid=int(m.group(2))))
+        elif PATTERN_EXCEPTION.match(line):
+            self._start_block(LogEvent(LogEventType.INTERNAL_ERROR, self.line_no, line))
+        elif PATTERN_STATISTIC.match(line):
+            self._start_block(LogEvent(LogEventType.STATISTIC, self.line_no, line))
+
+    def _in_block(self, line: str) -> bool:
+        block_type = self._block.type
+        if block_type == LogEventType.CRASH:
+            # the crash dump of monkey: every line is commented with "//"
+            return line.startswith("//") and not PATTERN_ANR.match(line)
+        if block_type == LogEventType.ANR:
+            # the anr dump ends with an empty line
+            return bool(line.strip()) and not PATTERN_CRASH.match(line)
+        # internal errors and statistics last until the end of the log
+        return True
+
+    def _start_block(self, event: LogEvent):
+        self._block = event
+        self._block_lines = []
+
+    def _end_block(self):
+        if self._block is None:
+            return
+        event, self._block = self._block, None
+        event.body = "\n".join(self._block_lines).strip()
+        self._block_lines = []
+        if event.type == LogEventType.STATISTIC:
+            for line in event.body.splitlines():
+                if m := PATTERN_COUNTER.match(line):
+                    event.counters[m.group(1)] = int(m.group(2))
+        if event.body or event.type in (LogEventType.CRASH, LogEventType.ANR):
+            self.emit(event)
+
+
+class _Inotify:
+    """Minimal inotify binding to wake up the watcher on writes. Linux only."""
+
+    IN_MODIFY = 0x00000002
+    IN_CLOEXEC = 0o2000000
+    IN_NONBLOCK = 0o4000
+
+    def __init__(self, path: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(self.IN_CLOEXEC | self.IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), self.IN_MODIFY) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+
+    def wait(self, timeout: float):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if readable:
+            # drain the events. We only care that the file was modified.
+            try:
+                while os.read(self.fd, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self):
+        os.close(self.fd)
+
+
 class LogWatcher:
+    """
+    Follow the fastbot log and publish structured events on a callback bus.
 
-    def watcher(self, poll_interval=3):
-        self.last_pos = 0
+    Internal errors of fastbot abort the run, and the statistics are printed when fastbot exits.
+    Other components subscribe to the events they need with `subscribe`.
+    """
 
-        with open(self.log_file, "r", encoding="utf-8") as fp:
+    def watcher(self):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        interval = MIN_POLL_INTERVAL
+        with open(self.log_file, "rb") as fp:
             while not self.end_flag:
-                self.read_log(fp)
-                time.sleep(poll_interval)
-            
+                if self.read_log(fp, decoder):
+                    interval = MIN_POLL_INTERVAL
+                elif self._inotify is None:
+                    # adaptive polling: back off while the log is idle
+                    interval = min(interval * 2, MAX_POLL_INTERVAL)
+                self._wait(interval)
+
             time.sleep(0.2)
-            self.read_log(fp)
-        
-    def read_log(self, f: IO):
-        f.seek(self.last_pos)
-        buffer = f.read()
-        self.last_pos = f.tell()
-
-        self.parse_log(buffer)
-
-    def parse_log(self, content):
-        exception_match = PATTERN_EXCEPTION.search(content)
-        if exception_match:
-            exception_body = exception_match.group(1).strip()
-            if exception_body:
-                raise RuntimeError(
-                    "[Error] Fatal Execption while running fastbot:\n" + 
-                    exception_body + 
-                    f"\nSee {self.log_file} for details."
-                )
-        
-        statistic_match = PATTERN_STATISTIC.search(content)
-        if statistic_match and not self.statistic_printed:
-            statistic_body = statistic_match.group(1).strip()
-            if statistic_body:
-                self.statistic_printed = True
-                print(
-                    "[INFO] Fastbot exit:\n" + 
-                    statistic_body
-                , flush=True)
-
-    def __init__(self, log_file):
+            self.read_log(fp, decoder)
+            self.parser.feed(decoder.decode(b"", final=True))
+            self.parser.flush()
+
+    def read_log(self, fp, decoder) -> bool:
+        """Parse the bytes appended since the last read. Return whether there were any."""
+        read = False
+        while chunk := fp.read(READ_SIZE):
+            read = True
+            self.parser.feed(decoder.decode(chunk))
+        return read
+
+    def _wait(self, timeout):
+        if self._inotify:
+            # wake up on writes, the timeout only bounds the latency of close()
+            self._inotify.wait(CLOSE_LATENCY)
+        else:
+            time.sleep(timeout)
+
+    def subscribe(self, event_type: str, callback: Callable[[LogEvent], None]):
+        """Call `callback` in the watcher thread for every event of `event_type` (LogEventType.ANY for all)."""
+        with self._lock:
+            self._subscribers[event_type].append(callback)
+
+    def publish(self, event: LogEvent):
+        """
+        Call the subscribers of the event. A failing subscriber is logged and doesn't stop the others:
+        only a fastbot internal error aborts the run (see thread_excepthook).
+        """
+        with self._lock:
+            callbacks = self._subscribers[event.type] + self._subscribers[LogEventType.ANY]
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception:
+                logger.exception(f"Error in the subscriber {getattr(callback, '__qualname__', callback)} "
+                                 f"of the {event.type} event at line {event.line_no}")
+        if event.type == LogEventType.INTERNAL_ERROR:
+            self._on_internal_error(event)
+
+    def _on_internal_error(self, event: LogEvent):
+        raise RuntimeError(
+            "[Error] Fatal Execption while running fastbot:\n" +
+            event.body +
+            f"\nSee {self.log_file} for details."
+        )
+
+    def _on_statistic(self, event: LogEvent):
+        self.statistic_printed = True
+        print(
+            "[INFO] Fastbot exit:\n" +
+            event.body
+        , flush=True)
+
+    def __init__(self, log_file, subscribers: Optional[Dict[str, List[Callable[[LogEvent], None]]]] = None):
+        """
+        Args:
+            log_file: the fastbot log
+            subscribers: event type -> callbacks, subscribed before the log is read, not to miss its first events
+        """
         logger.info(f"Watching log: {log_file}")
         self.log_file = log_file
         self.end_flag = False
         self.statistic_printed = False
 
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, List[Callable[[LogEvent], None]]] = defaultdict(list)
+        self.subscribe(LogEventType.STATISTIC, self._on_statistic)
+        for event_type, callbacks in (subscribers or dict()).items():
+            for callback in callbacks:
+                self.subscribe(event_type, callback)
+        self.parser = LogParser(self.publish)
+
+        self._inotify = None
+        if sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify(log_file)
+            except (OSError, AttributeError, TypeError) as e:
+                logger.debug(f"inotify unavailable, polling {log_file}: {e}")
+
         threading.excepthook = thread_excepthook
         self.t = threading.Thread(target=self.watcher, daemon=True)
         self.t.start()
-    
+
     def close(self):
         logger.info("Close: LogWatcher")
         self.end_flag = True
         if self.t:
             self.t.join()
-        
+        if self._inotify:
+            self._inotify.close()
+
         if not self.statistic_printed:
-            self._parse_whole_log()
-    
-    def _parse_whole_log(self):
-        logger.warning(
-            "LogWatcher closed without reading the statistics, parsing the whole log now."
-        )
-        with open(self.log_file, "r", encoding="utf-8") as fp:
-            content = fp.read()
-            self.parse_log(content)
+            logger.warning("LogWatcher closed without reading the statistics of fastbot.")
 
 
 if __name__ == "__main__":
     # LogWatcher()
-    pass
\ No newline at end of file
+    pass
@@ -0,0 +1,318 @@
+import multiprocessing
+import os
+import re
+import sys
+import unittest
+from copy import copy
+from dataclasses import dataclass, field
+from pathlib import Path
+from time import monotonic, sleep
+from typing import Dict, List, Optional
+
+from .utils import TimeStamp, getLogger
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from .farmScheduler import FarmCoordinator
+
+
+logger = getLogger(__name__)
+
+CONSOLE_LOG = "console.log"
+# How often (in seconds) the console logs of the devices are tailed
+POLL_INTERVAL = 0.5
+
+
+@dataclass
+class DeviceRun:
+    serial: str
+    # the per-device output dir (`<output_dir>/<serial>`) and the log stamp of the device
+    output_dir: Path
+    log_stamp: str
+    state: str = "pending"  # pending, running, passed, failed, error
+    exitcode: Optional[int] = None
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    # the offset of the console log printed so far
+    _printed: int = field(default=0, repr=False)
+
+    @property
+    def result_dir(self) -> Path:
+        """The res_* directory written by the runner of the device"""
+        return self.output_dir.absolute() / f"res_{self.log_stamp}"
+
+    @property
+    def coverage_file(self) -> Path:
+        """The coverage.log synced from the device"""
+        return self.result_dir / f"output_{self.log_stamp}" / "coverage.log"
+
+    @property
+    def console_log(self) -> Path:
+        return self.output_dir / CONSOLE_LOG
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or monotonic()) - self.started
+
+
+def safe_serial(serial: str) -> str:
+    """The serial as a file name and log stamp (`192.168.1.2:5555` -> `192.168.1.2_5555`)"""
+    return re.sub(r'[^\w.-]', "_", serial)
+
+
+def resolve_devices(spec: str) -> List[str]:
+    """
+    The serials of `--devices`: `all` for every connected device, or a comma separated list of serials.
+    """
+    from .adbUtils import get_devices
+    connected = get_devices()
+    if spec.strip().lower() == "all":
+        if not connected:
+            raise ValueError("--devices all: no device connected. Check `adb devices`.")
+        return connected
+    serials = list(dict.fromkeys(s.strip() for s in spec.split(",") if s.strip()))
+    if not serials:
+        raise ValueError("--devices should be `all` or a comma separated list of serials.")
+    missing = [serial for serial in serials if serial not in connected]
+    if missing:
+        raise ValueError(f"--devices: {', '.join(missing)} not connected. Connected devices: {', '.join(connected) or 'none'}")
+    return serials
+
+
+class _LoadOnlyProgram(unittest.TestProgram):
+    """Parse the unittest argv and load the tests like unittest.main, without running them"""
+
+    def runTests(self):
+        pass
+
+
+def load_suite(argv: List[str]) -> unittest.TestSuite:
+    return _LoadOnlyProgram(module=None, argv=argv, exit=False).test
+
+
+def _redirect_output(console_log: Path):
+    """Send the output of the process (and of its subprocesses) to its console log"""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    fd = os.open(console_log, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    os.dup2(fd, 1)
+    os.dup2(fd, 2)
+    os.close(fd)
+    # sys.stdout and sys.stderr may not write to the fds (e.g. replaced by an IDE)
+    for name, fileno in (("stdout", 1), ("stderr", 2)):
+        try:
+            if getattr(sys, name).fileno() == fileno:
+                continue
+        except (AttributeError, OSError, ValueError):
+            pass
+        setattr(sys, name, open(fileno, "w", buffering=1, encoding="utf-8", errors="replace", closefd=False))
+
+
+def _run_device(device_args, console_log: Path, suite: Optional[unittest.TestSuite], farm_conn=None):
+    """The process of a device: an isolated test runner with its own options and output dir"""
+    _redirect_output(console_log)
+    exitcode = 2
+    try:
+        from .kea_launcher import _build_options, _select_runner
+        options = _build_options(device_args)
+        testRunner, argv = _select_runner(device_args, options)
+        if farm_conn is not None:
+            from .farmScheduler import FarmClient
+            testRunner.farmClient = FarmClient(farm_conn, options.profile_period)
+        if suite is None:
+            # spawned, not forked: the suite is loaded again
+            suite = load_suite(argv)
+        result = testRunner().run(suite)
+        exitcode = 0 if result.wasSuccessful() else 1
+    except BaseException:
+        logger.exception(f"Kea2 stopped on {device_args.serial}")
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    os._exit(exitcode)
+
+
+class MultiDeviceRunner:
+    """
+    Run kea2 on several devices at once, one process per device.
+
+    Every device has its own output dir (`<output_dir>/<serial>/res_<stamp>_<serial>`) and console log.
+    The console logs are printed with a `[serial]` prefix, and the result dirs are merged with
+    TestReportMerger when all the devices are done.
+
+    The property suite is loaded once before the processes are forked, so a broken property script
+    fails before any device is touched.
+
+    With a FarmCoordinator (`--farm`), the devices execute the properties assigned to them instead
+    of the whole suite, see farmScheduler.
+    """
+
+    def __init__(self, args, serials: List[str], target=_run_device, coordinator: "FarmCoordinator" = None):
+        self.args = args
+        self.stamp = args.log_stamp or TimeStamp().getTimeStamp()
+        self.output_dir = Path(args.output_dir)
+        self.devices: Dict[str, DeviceRun] = {
+            serial: DeviceRun(serial, self.output_dir / safe_serial(serial), f"{self.stamp}_{safe_serial(serial)}")
+            for serial in serials
+        }
+        self.target = target
+        self.coordinator = coordinator
+        self._processes: Dict[str, multiprocessing.Process] = dict()
+
+    def device_args(self, device: DeviceRun):
+        """The args of `kea2 run` on a single device"""
+        device_args = copy(self.args)
+        device_args.devices = None
+        device_args.serial = device.serial
+        device_args.transport_id = None
+        device_args.output_dir = str(device.output_dir)
+        device_args.log_stamp = device.log_stamp
+        if self.coordinator:
+            # Fastbot runs as long as a device may get when the others die, the coordinator stops it earlier
+            device_args.running_minutes = self.args.running_minutes * len(self.devices)
+        return device_args
+
+    def _context(self):
+        # fork shares the loaded suite with the processes
+        if "fork" in multiprocessing.get_all_start_methods():
+            return multiprocessing.get_context("fork")
+        return multiprocessing.get_context("spawn")
+
+    def start(self, suite: Optional[unittest.TestSuite] = None):
+        context = self._context()
+        if context.get_start_method() != "fork":
+            suite = None
+        for device in self.devices.values():
+            device.output_dir.mkdir(parents=True, exist_ok=True)
+            device.console_log.write_bytes(b"")
+            farm_conn = self.coordinator.connect(device.serial) if self.coordinator else None
+            process = context.Process(
+                target=self.target, name=f"kea2-{device.serial}",
+                args=(self.device_args(device), device.console_log, suite, farm_conn),
+            )
+            process.start()
+            if farm_conn is not None:
+                farm_conn.close()
+            device.state, device.started = "running", monotonic()
+            self._processes[device.serial] = process
+        print(f"[INFO] Running on {len(self.devices)} devices: {', '.join(self.devices)}", flush=True)
+
+    def _print_console(self, device: DeviceRun, final: bool = False):
+        """Print the new complete lines of the console log of a device (all of them when final)"""
+        try:
+            with open(device.console_log, "rb") as f:
+                f.seek(device._printed)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        if not final:
+            data = data[:data.rfind(b"\n") + 1]
+        if not data:
+            return
+        device._printed += len(data)
+        prefix = f"[{device.serial}] "
+        lines = data.decode("utf-8", errors="replace").splitlines()
+        print("\n".join(prefix + line for line in lines), flush=True)
+
+    def _poll(self) -> bool:
+        """Print the new output and update the states. True when a device finished."""
+        changed = False
+        if self.coordinator:
+            self.coordinator.poll()
+        for serial, process in self._processes.items():
+            device = self.devices[serial]
+            if device.state != "running":
+                continue
+            self._print_console(device)
+            if process.is_alive():
+                continue
+            process.join()
+            self._print_console(device, final=True)
+            device.finished, device.exitcode = monotonic(), process.exitcode
+            device.state = {0: "passed", 1: "failed"}.get(process.exitcode, "error")
+            if self.coordinator:
+                self.coordinator.device_exited(serial, died=device.state == "error")
+            changed = True
+        return changed
+
+    def _running(self) -> bool:
+        return any(device.state == "running" for device in self.devices.values())
+
+    def wait(self):
+        interrupted = False
+        while self._running():
+            try:
+                # the final status is printed by run()
+                if self._poll() and self._running():
+                    self.print_status()
+                sleep(POLL_INTERVAL)
+            except KeyboardInterrupt:
+                # The processes got the interrupt as well, and stop their runs and write their reports
+                if interrupted:
+                    logger.warning("Terminating the devices.")
+                    for process in self._processes.values():
+                        process.terminate()
+                else:
+                    logger.warning("Interrupted. Waiting for the devices to write their reports (Ctrl+C again to terminate).")
+                interrupted = True
+
+    def print_status(self):
+        rows = [("DEVICE", "STATE", "EXIT", "ELAPSED", "PROPERTIES", "RESULT DIR")]
+        for device in self.devices.values():
+            properties = "all"
+            if self.coordinator:
+                properties = str(len(self.coordinator.assignment.get(device.serial, [])))
+            rows.append((
+                device.serial, device.state,
+                "" if device.exitcode is None else str(device.exitcode),
+                f"{device.elapsed:.0f}s",
+                properties,
+                str(device.result_dir) if device.result_dir.exists() else "-",
+            ))
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]) - 1)]
+        print("[INFO] Devices:", flush=True)
+        for row in rows:
+            print("  " + "  ".join(cell.ljust(width) for cell, width in zip(row, widths)) + "  " + row[-1], flush=True)
+
+    def merge(self) -> Optional[Path]:
+        """Merge the reports of the devices"""
+        result_dirs = [device.result_dir for device in self.devices.values()
+                       if (device.result_dir / "bug_report_config.json").exists()]
+        if len(result_dirs) < 2:
+            logger.info("Less than two device reports, skipping merge.")
+            return None
+        from .report.report_merger import TestReportMerger
+        merged_report = TestReportMerger().merge_reports(result_dirs, self.output_dir)
+        if merged_report is not None:
+            print(f"📊 Merged report of {len(result_dirs)} devices: {merged_report}", flush=True)
+        return merged_report
+
+    def run(self, suite: Optional[unittest.TestSuite] = None) -> bool:
+        """Run all the devices, merge their reports. True if every device passed."""
+        self.start(suite)
+        self.wait()
+        self.print_status()
+        if self.coordinator:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            logger.info(f"Farm schedule: {self.coordinator.save(self.output_dir)}")
+        self.merge()
+        return all(device.state == "passed" for device in self.devices.values())
+
+
+def run_devices(args, argv: List[str]):
+    """`kea2 run --devices`"""
+    serials = resolve_devices(args.devices)
+    suite = load_suite(argv)
+    runner = MultiDeviceRunner(args, serials)
+    if args.farm:
+        from .farmCoverage import CoverageAggregator
+        from .farmScheduler import FarmCoordinator, property_names
+        coverage = None
+        if args.share_coverage:
+            coverage = CoverageAggregator({serial: device.coverage_file for serial, device in runner.devices.items()})
+        runner.coordinator = FarmCoordinator(property_names(suite), serials, args.running_minutes * 60,
+                                             args.rebalance_period, coverage)
+    if not runner.run(suite):
+        sys.exit(1)
@@ -1,18 +1,33 @@
+import copy
+from contextlib import nullcontext
 import json
+from bisect import bisect_right
 from datetime import datetime
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Tuple, TypedDict, List, Deque, NewType, Union, Optional
-from collections import deque
-from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Tuple, TypedDict, List, NewType, Union, Optional
+from collections import OrderedDict
 
 from jinja2 import Environment, FileSystemLoader, select_autoescape, PackageLoader
 from ..utils import getLogger, catchException
-from .mixin import CrashAnrMixin, PathParserMixin, ScreenshotsMixin
-from .utils import thread_pool
+from .checkpoint import ReportCheckpoint, StepsState
+from .crash_fingerprint import FingerprintIndex
+from .mixin import CrashAnrMixin, MarkingQueue, PathParserMixin, ScreenshotsMixin, init_marking_worker
+from .shards import CHUNK_SIZES, ShardWriter
+from .step_index import StepIndex
+from .utils import SpillList, process_pool
+
+if TYPE_CHECKING:
+    from ..resultSyncer import SyncProgress
 
 logger = getLogger(__name__)
 
+# The fields of coverage.log plotted in the coverage trend. The full record is only kept for the last line.
+COV_TREND_FIELDS = ("stepsCount", "coverage", "testedActivitiesCount")
+# Screenshots remembered for deduplication. A screenshot is only shared by adjacent steps
+# (e.g. the ScriptInfo of a property and its script step), so a small window is enough.
+RECENT_SCREENSHOTS_WINDOW = 256
+
 
 class StepData(TypedDict):
     # The type of the action (Monkey / Script / Script Info)
@@ -53,13 +68,13 @@ class ReportData(TypedDict):
     property_violations: List[Dict]
     property_stats: List
     property_error_details: Dict[str, List[Dict]]  # Support multiple errors per property
-    screenshot_info: Dict
     coverage_trend: List
     property_execution_trend: List  # Track executed properties count over steps
     activity_count_history: Dict[str, int]  # Activity traversal count from final coverage data
     crash_events: List[Dict]  # Crash events from crash-dump.log
     anr_events: List[Dict]  # ANR events from crash-dump.log
     kill_apps_events: List[Dict]  # kill_apps info events from steps.log
+    step_timing: Optional[Dict]  # The time of the phases of the steps, from perf_<stamp>.json
 
 
 class PropertyExecResult(TypedDict):
@@ -121,11 +136,34 @@ class BugReportGenerator(CrashAnrMixin, PathParserMixin, ScreenshotsMixin):
     Generate HTML format bug reports
     """
 
-    _cov_trend: Deque[CovData] = None
+    _cov_trend: List[Dict] = None
     _test_result: TestResult = None
+    _checkpoint: ReportCheckpoint = None
+    sync_progress: Optional["SyncProgress"] = None
+    # Only collect the numbers of the report (generate_summary): the screenshots are left alone
+    summary_only: bool = False
+
+    @property
+    def checkpoint(self) -> ReportCheckpoint:
+        """The parsed state of the logs, resumed from the last report generation unless `rebuild`"""
+        if self._checkpoint is not None:
+            return self._checkpoint
+
+        log_stamp = self.config.get("log_stamp", "")
+        checkpoint = ReportCheckpoint(log_stamp=log_stamp)
+        if not self.rebuild:
+            checkpoint = ReportCheckpoint.load(self.result_dir, log_stamp)
+            if not checkpoint.check(
+                self.data_path.steps_log, self.data_path.coverage_log,
+                self.data_path.property_exec_info, self.data_path.crash_dump_log
+            ):
+                checkpoint = ReportCheckpoint(log_stamp=log_stamp)
+        self._checkpoint = checkpoint
+        return self._checkpoint
     
     @property
-    def cov_trend(self):
+    def cov_trend(self) -> List[Dict]:
+        """The coverage trend, with only the COV_TREND_FIELDS of each coverage.log line"""
         if self._cov_trend is not None:
             return self._cov_trend
 
@@ -133,18 +171,31 @@ class BugReportGenerator(CrashAnrMixin, PathParserMixin, ScreenshotsMixin):
         if not self.data_path.coverage_log.exists():
             logger.error(f"{self.data_path.coverage_log} not exists")
 
-        cov_trend = list()
+        checkpoint = self.checkpoint
 
-        with open(self.data_path.coverage_log, "r", encoding="utf-8") as f:
+        with open(self.data_path.coverage_log, "rb") as f:
+            f.seek(checkpoint.coverage_offset)
             for line in f:
+                if not line.endswith(b"\n"):
+                    # The last line is being written
+                    break
+                checkpoint.coverage_offset += len(line)
                 if not line.strip():
                     continue
 
-                coverage_data = json.loads(line)
-                cov_trend.append(coverage_data)
-        self._cov_trend = cov_trend
+                coverage_data: CovData = json.loads(line)
+                checkpoint.cov_trend.append({k: coverage_data.get(k) for k in COV_TREND_FIELDS})
+                checkpoint.final_cov = coverage_data
+        self._cov_trend = checkpoint.cov_trend
         return self._cov_trend
 
+    @property
+    def final_cov(self) -> Optional[CovData]:
+        """The last line of coverage.log"""
+        if self._cov_trend is None:
+            self.cov_trend
+        return self.checkpoint.final_cov
+
     @property
     def test_result(self) -> TestResult:
         if self._test_result is not None:
@@ -164,16 +215,24 @@ class BugReportGenerator(CrashAnrMixin, PathParserMixin, ScreenshotsMixin):
                 self._config = json.load(fp)
         return self._config
 
-    def __init__(self, result_dir=None):
+    def __init__(self, result_dir=None, rebuild=False, webp=False, sharded=False, workers=None):
         """
         Initialize the bug report generator
 
         Args:
             result_dir: Directory path containing test results
+            rebuild: Ignore the report checkpoint and parse all the logs again
+            webp: Generate full-size webp versions of the screenshots and link them in the report
+            sharded: Generate a lightweight report page loading its data in chunks from report_data/
+            workers: Number of processes marking the screenshots (one per core by default)
         """
         if result_dir is None:
             raise RuntimeError("Result directory must be provided to generate report.")
         self.result_dir = Path(result_dir)
+        self.rebuild = rebuild
+        self.webp = webp
+        self.sharded = sharded
+        self.workers = workers
         
     def __set_up_jinja_env(self):
         """Set up Jinja2 environment for HTML template rendering"""
@@ -197,37 +256,131 @@ class BugReportGenerator(CrashAnrMixin, PathParserMixin, ScreenshotsMixin):
             )
     
     @catchException("Error generating bug report")
-    def generate_report(self) -> Optional[str]:
+    def generate_report(self, sync_progress: Optional["SyncProgress"] = None) -> Optional[str]:
         """
         Generate bug report and save to result directory
 
         Args:
-            result_dir_path: Directory path containing test results (optional)
-                           If not provided, uses the path from initialization
+            sync_progress: Progress of the final sync when the report is generated while the
+                           screenshots are still being pulled from device (optional)
         """
         # Check if paths are properly set up
         self.__set_up_jinja_env()
         
-        self.screenshots = deque()
-        with thread_pool(max_workers=128) as executor:
+        self.sync_progress = sync_progress
+        if sync_progress:
+            logger.debug("Waiting for the logs to be synced")
+            sync_progress.logs_synced.wait()
+            if self.config.get("take_screenshots"):
+                self.data_path.screenshots_dir.mkdir(parents=True, exist_ok=True)
+
+        # The screenshots timeline is spilled to disk to keep the memory flat on long runs.
+        # It is kept in the checkpoint dir and resumed with the steps.log parsing state.
+        ReportCheckpoint.checkpoint_dir(self.result_dir).mkdir(exist_ok=True)
+        steps_state = self.checkpoint.steps
+        self.screenshots = SpillList(
+            path=ReportCheckpoint.timeline_path(self.result_dir),
+            size=steps_state.timeline_size, length=steps_state.timeline_len
+        )
+
+        # Marking the screenshots and generating their thumbnails is CPU-bound: run it in worker processes
+        with process_pool(max_workers=self.workers, initializer=init_marking_worker) as executor:
             logger.debug("Starting bug report generation")
+            self._marking_queue = MarkingQueue(executor, self.data_path.screenshots_dir, sync_progress, webp=self.webp)
 
             # Collect test data
-            test_data: ReportData = self._collect_test_data(executor)
+            test_data: ReportData = self._collect_test_data()
+            self._marking_queue.join()
 
-            # Generate HTML report
-            html_content = self._generate_html_report(test_data)
-
-            # Save report
+            # Generate HTML report and stream it to the report file
             report_path = self.result_dir / "bug_report.html"
-            with open(report_path, "w", encoding="utf-8") as f:
-                f.write(html_content)
+            self._generate_html_report(test_data, report_path)
+            self.screenshots.close()
 
             logger.info(f"Bug report saved to: {report_path}")
             return str(report_path)
 
+    @catchException("Error generating report summary")
+    def generate_summary(self, sync_progress: Optional["SyncProgress"] = None) -> Optional[str]:
+        """
+        Generate the machine-readable summary of the report (report_summary.json in the result directory).
+
+        The same data as the HTML report is collected, but no screenshot is marked or looked up and no
+        template is rendered. The report checkpoint is resumed but not updated, because the screenshots
+        timeline is not collected.
+
+        Args:
+            sync_progress: Progress of the final sync when the summary is generated during it (optional)
+        """
+        self.summary_only = True
+        self.sync_progress = sync_progress
+        if sync_progress:
+            logger.debug("Waiting for the logs to be synced")
+            sync_progress.logs_synced.wait()
+
+        self.screenshots = SpillList()
+        try:
+            test_data: ReportData = self._collect_test_data()
+        finally:
+            self.screenshots.close()
+        if test_data is None:
+            return None
+
+        summary_path = self.result_dir / "report_summary.json"
+        with open(summary_path, "w", encoding="utf-8") as fp:
+            json.dump(self._summarize(test_data), fp, indent=2, ensure_ascii=False)
+        logger.info(f"Report summary saved to: {summary_path}")
+        return str(summary_path)
+
+    def _summarize(self, data: ReportData) -> Dict:
+        """The numbers of the report, without the coverage trend, screenshots and tracebacks"""
+        return {
+            "log_stamp": data["timestamp"],
+            "test_time": data["test_time"],
+            "bugs_found": data["bugs_found"],
+            "executed_events": data["executed_events"],
+            "total_testing_time": data["total_testing_time"],
+            "coverage": data["coverage"],
+            "total_activities_count": data.get("total_activities_count", 0),
+            "tested_activities_count": data.get("tested_activities_count", 0),
+            "all_properties_count": data["all_properties_count"],
+            "executed_properties_count": data["executed_properties_count"],
+            "property_stats_summary": data["property_stats_summary"],
+            "property_stats": data["property_stats"],
+            "property_violations": [
+                {k: v[k] for k in ("index", "property_name", "interaction_pages", "state")}
+                for v in data["property_violations"]
+            ],
+            "property_errors": {
+                property_name: [
+                    {k: e[k] for k in ("state", "short_description", "occurrence_count", "startStepsCountList")}
+                    for e in errors
+                ]
+                for property_name, errors in data["property_error_details"].items()
+            },
+            "crash_count": len(data["crash_events"]),
+            "anr_count": len(data["anr_events"]),
+            "crash_events": [
+                {k: e.get(k) for k in ("time", "exception_type", "process", "steps_count", "fingerprint")} for e in data["crash_events"]
+            ],
+            "anr_events": [
+                {k: e.get(k) for k in ("time", "reason", "process", "steps_count", "fingerprint")} for e in data["anr_events"]
+            ],
+            "crash_groups": [
+                {k: group[k] for k in ("fingerprint", "kind", "title", "count", "first_time", "last_time")}
+                for group in self.checkpoint.crash_fingerprints.values()
+            ],
+            "step_timing": {
+                "steps_per_sec": data["step_timing"]["steps_per_sec"],
+                "phases": {
+                    phase: {k: v for k, v in stats.items() if k != "buckets"}
+                    for phase, stats in data["step_timing"]["phases"].items()
+                },
+            } if data.get("step_timing") else None,
+        }
+
     @catchException("Error when collecting test data")
-    def _collect_test_data(self, executor: "ThreadPoolExecutor"=None) -> ReportData:
+    def _collect_test_data(self) -> ReportData:
         """
         Collect test data, including results, coverage, etc.
         """
@@ -245,108 +398,130 @@ class BugReportGenerator(CrashAnrMixin, PathParserMixin, ScreenshotsMixin):
             "property_violations": [],
             "property_stats": [],
             "property_error_details": {},
-            "screenshot_info": {},
             "coverage_trend": [],
             "property_execution_trend": [],
             "activity_count_history": {},
             "crash_events": [],
             "anr_events": [],
             "kill_apps_events": [],
+            "step_timing": None,
         }
 
         # Parse steps.log file to get test step numbers and screenshot mappings
-        property_violations = {}  # Store multiple violation records for each property
-        executed_properties_by_step = {}  # Track executed properties at each step: {step_count: set()}
-        executed_properties = set()  # Track unique executed properties
-
         if not self.data_path.steps_log.exists():
             logger.error(f"{self.data_path.steps_log} not exists")
             return
 
-        current_property = None
-        current_test = {}
-        step_index = 0
-        monkey_events_count = 0  # Track monkey events separately
+        # Resume parsing from the checkpoint
+        state = self.checkpoint.steps
+        # The state before the first step whose screenshot is not on host yet.
+        # Saved instead of the final state, so that the step is parsed again next time.
+        snapshot: Optional[StepsState] = None
+
+        # The random-access index of steps.log (kea2 steps) is kept in step with the parsing state.
+        # The summary writes nothing to the result directory, it leaves the index alone.
+        steps_index = None if self.summary_only else StepIndex(self.data_path.steps_index)
+        with open(self.data_path.steps_log, "rb") as f, (nullcontext() if steps_index is None else steps_index):
+            if steps_index is not None:
+                steps_index.truncate(state.step_index)
+                steps_index.update(self.data_path.steps_log, end=state.offset)
+            f.seek(state.offset)
 
-        with open(self.data_path.steps_log, "r", encoding="utf-8") as f:
-            # Track current test state
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # The last line is being written
+                    break
 
-            for step_index, line in enumerate(f, start=1):
                 step_data = self._parse_step_data(line)
+                screenshot = step_data.get("Screenshot", "") if step_data else ""
+                screenshot_pending = self._screenshot_pending(screenshot)
+                if screenshot_pending and snapshot is None:
+                    snapshot = copy.deepcopy(state)
+                    snapshot.timeline_size, snapshot.timeline_len = self.screenshots.tell()
+
+                if steps_index is not None:
+                    steps_index.append(state.offset, len(line), step_data)
+                state.offset += len(line)
+                state.step_index += 1
+                step_index = state.step_index
 
                 if not step_data:
                     continue
 
                 step_type = step_data.get("Type", "")
-                screenshot = step_data.get("Screenshot", "")
                 info = step_data.get("Info", {})
 
                 # Count Monkey events separately
                 if step_type == "Monkey" or step_type == "Fuzz":
-                    monkey_events_count += 1
+                    state.monkey_events_count += 1
 
                 # Record restart-app marker events (no screenshot expected)
                 if step_type == "Monkey" and info == "kill_apps":
                     monkey_steps_count = step_data.get("MonkeyStepsCount", "N/A")
                     caption = f"Monkey Step {monkey_steps_count}: restart app"
 
-                    data["kill_apps_events"].append({
+                    state.kill_apps_events.append({
                         "step_index": step_index,
                         "monkey_steps_count": monkey_steps_count,
                     })
 
                     # Show this info event in the Test Screenshots timeline
-                    self.screenshots.append({
-                        "id": step_index,
-                        "path": "",
-                        "caption": f"{step_index}. {caption}",
-                        "kind": "info",
-                        "info": "kill_apps",
-                    })
+                    if not self.summary_only:
+                        self.screenshots.append({
+                            "id": step_index,
+                            "path": "",
+                            "caption": f"{step_index}. {caption}",
+                            "kind": "info",
+                            "info": "kill_apps",
+                        })
 
-                # If screenshots are enabled, mark the screenshot
-                if self.take_screenshots and step_data["Screenshot"]:
-                    executor.submit(self._mark_screenshot, step_data)
+                # If screenshots are enabled, mark the screenshot (the ones already marked are skipped)
+                if self.take_screenshots and screenshot and not self.summary_only:
+                    self._marking_queue.submit(step_data)
 
                 # Collect detailed information for each screenshot
-                if screenshot and screenshot not in data["screenshot_info"]:
-                    self._add_screenshot_info(step_data, step_index, data)
+                if screenshot and screenshot not in state.recent_screenshots and not self.summary_only:
+                    self._add_screenshot_info(step_data, step_index)
+                    state.recent_screenshots[screenshot] = None
+                    if len(state.recent_screenshots) > RECENT_SCREENSHOTS_WINDOW:
+                        state.recent_screenshots.popitem(last=False)
 
                 # Process ScriptInfo for property violations and execution tracking
                 if step_type == "ScriptInfo":
                     property_name = info.get("propName", "")
-                    state = info.get("state", "")
+                    prop_state = info.get("state", "")
                     
                     # Track executed properties (properties that have been started)
-                    if property_name and state == "start":
-                        executed_properties.add(property_name)
-                        # Record the monkey steps count for this property execution
-                        executed_properties_by_step[monkey_events_count] = executed_properties.copy()
+                    if property_name and prop_state == "start" and property_name not in state.executed_properties:
+                        state.executed_properties.add(property_name)
+                        # Record the monkey steps count when a new property is executed
+                        state.executed_properties_by_step[state.monkey_events_count] = len(state.executed_properties)
                     
-                    current_property, current_test = self._process_script_info(
-                        property_name, state, step_index, screenshot,
-                        current_property, current_test, property_violations
+                    state.current_property, state.current_test = self._process_script_info(
+                        property_name, prop_state, step_index, screenshot,
+                        state.current_property, state.current_test, state.property_violations
                     )
 
                 # Store first and last step for time calculation
-                if step_index == 1:
-                    first_step_time = step_data["Time"]
-                last_step_time = step_data["Time"]
+                if state.first_step_time is None:
+                    state.first_step_time = step_data["Time"]
+                state.last_step_time = step_data["Time"]
 
-            # Set the monkey events count correctly
-            data["executed_events"] = monkey_events_count
+        # Set the monkey events count correctly
+        data["executed_events"] = state.monkey_events_count
+        data["kill_apps_events"] = state.kill_apps_events
 
-            # Calculate test time
-            if first_step_time and last_step_time:
-                def _get_datetime(raw_datetime) -> datetime:
-                    return datetime.strptime(raw_datetime, r"%Y-%m-%d %H:%M:%S.%f")
+        # Calculate test time
+        if state.first_step_time and state.last_step_time:
+            def _get_datetime(raw_datetime) -> datetime:
+                return datetime.strptime(raw_datetime, r"%Y-%m-%d %H:%M:%S.%f")
 
-                test_time = _get_datetime(last_step_time) - _get_datetime(first_step_time)
-                
-                total_seconds = int(test_time.total_seconds())
-                hours, remainder = divmod(total_seconds, 3600)
-                minutes, seconds = divmod(remainder, 60)
-                data["total_testing_time"] = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+            test_time = _get_datetime(state.last_step_time) - _get_datetime(state.first_step_time)
+            
+            total_seconds = int(test_time.total_seconds())
+            hours, remainder = divmod(total_seconds, 3600)
+            minutes, seconds = divmod(remainder, 60)
+            data["total_testing_time"] = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
 
         # Enrich property statistics with derived metrics and calculate bug count
         enriched_property_stats = {}
@@ -379,8 +554,8 @@ class BugReportGenerator(CrashAnrMixin, PathParserMixin, ScreenshotsMixin):
         # Process coverage data
         data["coverage_trend"] = self.cov_trend
 
-        if self.cov_trend:
-            final_trend = self.cov_trend[-1]
+        if self.final_cov:
+            final_trend = self.final_cov
             data["coverage"] = final_trend["coverage"]
             data["total_activities"] = final_trend["totalActivities"]
             data["tested_activities"] = final_trend["testedActivities"]
@@ -389,27 +564,46 @@ class BugReportGenerator(CrashAnrMixin, PathParserMixin, ScreenshotsMixin):
             data["activity_count_history"] = final_trend["activityCountHistory"]
 
         # Generate property execution trend aligned with coverage trend
-        data["property_execution_trend"] = self._generate_property_execution_trend(executed_properties_by_step)
+        data["property_execution_trend"] = self._generate_property_execution_trend(state.executed_properties_by_step)
 
         # Generate Property Violations list
-        self._generate_property_violations_list(property_violations, data)
+        self._generate_property_violations_list(state.property_violations, data)
 
         # Load error details for properties with fail/error state
         data["property_error_details"] = self._load_property_error_details()
 
+        # The screenshots needed from here on must all be on host
+        if self.sync_progress and not self.summary_only:
+            self.sync_progress.done.wait()
+            self._drop_missing_screenshots()
+
         # Load crash and ANR events from crash-dump.log
         crash_events, anr_events = self._load_crash_dump_data()
 
         # Add screenshot ID information to crash and ANR events
-        self._add_screenshot_ids_to_events(crash_events)
-        self._add_screenshot_ids_to_events(anr_events)
+        self._add_screenshot_ids_to_events(crash_events, anr_events)
 
         data["crash_events"] = crash_events
         data["anr_events"] = anr_events
 
+        data["step_timing"] = self._load_step_timing()
+
+        # Persist the parsed state for the next report generation
+        if not self.summary_only:
+            state.timeline_size, state.timeline_len = self.screenshots.tell()
+            if snapshot is not None:
+                self.checkpoint.steps = snapshot
+            self.checkpoint.save(self.result_dir)
+
         return data
 
-    def _parse_step_data(self, raw_step_info: str) -> StepData:
+    def _screenshot_pending(self, screenshot: str) -> bool:
+        """Whether the screenshot is taken but not synced to host yet (the report is generated during the run)"""
+        if not screenshot or not self.take_screenshots or self.sync_progress or self.summary_only:
+            return False
+        return not (self.data_path.screenshots_dir / screenshot).exists()
+
+    def _parse_step_data(self, raw_step_info: Union[str, bytes]) -> StepData:
         step_data: StepData = json.loads(raw_step_info)
         if step_data.get("Type") in {"Monkey", "Script", "ScriptInfo"}:
             info = step_data.get("Info")
@@ -421,10 +615,10 @@ class BugReportGenerator(CrashAnrMixin, PathParserMixin, ScreenshotsMixin):
 
 
 
-    @catchException("Error rendering template")
-    def _generate_html_report(self, data: ReportData):
+    def _generate_html_report(self, data: ReportData, report_path: Path):
         """
-        Generate HTML format bug report
+        Generate HTML format bug report. The template is rendered section by section into report_path.
+        A rendering error is raised, and the report partially written is removed.
         """
         # Format timestamp for display
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -470,7 +664,12 @@ class BugReportGenerator(CrashAnrMixin, PathParserMixin, ScreenshotsMixin):
             'triggered_anr_count': len(data["anr_events"]),
             'property_stats_summary': data["property_stats_summary"],
             'kill_apps_events': data.get("kill_apps_events", []),
+            'step_timing': data.get("step_timing"),
+            'step_timing_data': json.dumps(data["step_timing"]["timeline"]) if data.get("step_timing") else "[]",
+            'sharded': self.sharded,
         }
+        if self.sharded:
+            template_data.update(self._write_shards(data))
 
         # Check if template exists, if not create it
         template_path = Path(__file__).parent / "templates" / "bug_report_template.html"
@@ -479,9 +678,46 @@ class BugReportGenerator(CrashAnrMixin, PathParserMixin, ScreenshotsMixin):
 
         # Use Jinja2 to render template
         template = self.jinja_env.get_template("bug_report_template.html")
-        html_content = template.render(**template_data)
+        try:
+            with open(report_path, "w", encoding="utf-8") as f:
+                template.stream(**template_data).dump(f)
+        except Exception:
+            logger.error("Error rendering template")
+            report_path.unlink(missing_ok=True)
+            raise
+
+    def _write_shards(self, data: ReportData) -> Dict:
+        """
+        Write the large sections of the report in the data chunks of the sharded report.
 
-        return html_content
+        Returns:
+            Dict: the template data replacing the inlined sections
+        """
+        shards = ShardWriter(self.result_dir)
+        shards.write("screenshots", self.screenshots, key="id")
+        shards.write("coverage", data["coverage_trend"])
+        shards.write("crashes", data["crash_events"])
+        shards.write("anrs", data["anr_events"])
+
+        # The errors are chunked in the order of the property stats table
+        error_chunks = dict()
+        errors = []
+        for property_name in data["property_stats"]:
+            error_list = data["property_error_details"].get(property_name)
+            if error_list:
+                error_chunks[property_name] = {"chunk": len(errors) // CHUNK_SIZES["errors"], "count": len(error_list)}
+                errors.append({"property": property_name, "errors": error_list})
+        shards.write("errors", errors)
+
+        return {
+            'shards': shards.to_template(),
+            'error_chunks': error_chunks,
+            'screenshots': None,
+            'coverage_data': "[]",
+            'crash_events': [],
+            'anr_events': [],
+            'property_error_details': {},
+        }
 
     def _process_script_info(self, property_name: str, state: str, step_index: int, screenshot: str,
                              current_property: str, current_test: Dict, property_violations: Dict) -> Tuple:
@@ -556,6 +792,17 @@ class BugReportGenerator(CrashAnrMixin, PathParserMixin, ScreenshotsMixin):
                     })
                     index += 1
 
+    def _load_step_timing(self) -> Optional[Dict]:
+        """Load the time of the phases of the steps from perf_<stamp>.json (written by kea2 run with the u2 agent)"""
+        if not self.data_path.perf_json.exists():
+            return None
+        try:
+            with open(self.data_path.perf_json, "r", encoding="utf-8") as fp:
+                return json.load(fp)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Error reading step timing file {self.data_path.perf_json}: {e}")
+            return None
+
     def _load_property_error_details(self) -> Dict[str, List[Dict]]:
         """
         Load property execution error details from property_exec_info file
@@ -576,37 +823,40 @@ class BugReportGenerator(CrashAnrMixin, PathParserMixin, ScreenshotsMixin):
             return {}
 
     def _parse_property_exec_infos(self) -> List[PropertyExecInfo]:
-        """Parse property execution info from file"""
-        exec_infos = []
+        """Parse property execution info from file (the lines after the checkpoint, the others are in it)"""
+        checkpoint = self.checkpoint
         
-        with open(self.data_path.property_exec_info, "r", encoding="utf-8") as f:
-            for line_number, line in enumerate(f, 1):
-                line = line.strip()
+        with open(self.data_path.property_exec_info, "rb") as f:
+            f.seek(checkpoint.exec_info_offset)
+            for raw_line in f:
+                if not raw_line.endswith(b"\n"):
+                    # The last line is being written
+                    break
+                checkpoint.exec_info_offset += len(raw_line)
+                line = raw_line.decode("utf-8").strip()
                 if not line:
                     continue
                     
                 try:
                     exec_info_data = json.loads(line)
-                    prop_name = exec_info_data.get("propName", "")
-                    state = exec_info_data.get("state", "")
-                    tb = exec_info_data.get("tb", "")
-                    start_steps_count = exec_info_data.get("startStepsCount", 0)
-                    
-                    exec_info = PropertyExecInfo(
-                        prop_name=prop_name,
-                        state=state,
-                        traceback=tb,
-                        start_steps_count=start_steps_count
-                    )
-                    
-                    if exec_info.is_error_state() and prop_name and tb:
-                        exec_infos.append(exec_info)
+                    if exec_info_data.get("state", "") in ["fail", "error"] and exec_info_data.get("propName") and exec_info_data.get("tb"):
+                        checkpoint.exec_infos.append({
+                            k: exec_info_data.get(k) for k in ("propName", "state", "tb", "startStepsCount")
+                        })
                         
                 except json.JSONDecodeError as e:
-                    logger.warning(f"Failed to parse property exec info line {line_number}: {line[:100]}... Error: {e}")
+                    logger.warning(f"Failed to parse property exec info line: {line[:100]}... Error: {e}")
                     continue
                     
-        return exec_infos
+        return [
+            PropertyExecInfo(
+                prop_name=exec_info_data["propName"],
+                state=exec_info_data["state"],
+                traceback=exec_info_data["tb"],
+                start_steps_count=exec_info_data["startStepsCount"] or 0
+            )
+            for exec_info_data in checkpoint.exec_infos
+        ]
 
     def _group_errors_by_property(self, exec_infos: List[PropertyExecInfo]) -> Dict[str, List[Dict]]:
         """Group errors by property name and deduplicate"""
@@ -645,41 +895,33 @@ class BugReportGenerator(CrashAnrMixin, PathParserMixin, ScreenshotsMixin):
         
         return result
 
-    def _generate_property_execution_trend(self, executed_properties_by_step: Dict[int, set]) -> List[Dict]:
+    def _generate_property_execution_trend(self, executed_properties_by_step: Dict[int, int]) -> List[Dict]:
         """
         Generate property execution trend aligned with coverage trend
         
         Args:
-            executed_properties_by_step: Dictionary containing executed properties at each step
+            executed_properties_by_step: The cumulative count of executed properties, recorded at the steps it grew
             
         Returns:
             List[Dict]: Property execution trend data aligned with coverage trend
         """
-        property_execution_trend = []
-        
+        # The counter only grows, so the count at a step is the one recorded at the latest step not after it
+        exec_steps = sorted(executed_properties_by_step)
+        exec_counts = [executed_properties_by_step[step] for step in exec_steps]
+
         # Get step points from coverage trend to ensure alignment
-        coverage_step_points = []
-        if self.cov_trend:
-            coverage_step_points = [cov_data["stepsCount"] for cov_data in self.cov_trend]
+        coverage_step_points = [cov_data["stepsCount"] for cov_data in self.cov_trend]
         
         # If no coverage data, use property execution data points
-        if not coverage_step_points and executed_properties_by_step:
-            coverage_step_points = sorted(executed_properties_by_step.keys())
+        if not coverage_step_points:
+            coverage_step_points = exec_steps
         
-        # Generate property execution data for each coverage step point
+        property_execution_trend = []
         for step_count in coverage_step_points:
-            # Find the latest executed properties count up to this step
-            executed_count = 0
-            latest_step = 0
-            
-            for exec_step in executed_properties_by_step.keys():
-                if exec_step <= step_count and exec_step >= latest_step:
-                    latest_step = exec_step
-                    executed_count = len(executed_properties_by_step[exec_step])
-            
+            i = bisect_right(exec_steps, step_count)
             property_execution_trend.append({
                 "stepsCount": step_count,
-                "executedPropertiesCount": executed_count
+                "executedPropertiesCount": exec_counts[i - 1] if i else 0
             })
         
         return property_execution_trend
@@ -731,22 +973,42 @@ class BugReportGenerator(CrashAnrMixin, PathParserMixin, ScreenshotsMixin):
         Returns:
             tuple: (crash_events, anr_events) - Lists of crash and ANR event dictionaries
         """
-        crash_events = []
-        anr_events = []
+        checkpoint = self.checkpoint
+        crash_events = checkpoint.crash_events
+        anr_events = checkpoint.anr_events
+        package_names = self.config.get("packageNames") or []
+        crash_index = FingerprintIndex(checkpoint.crash_fingerprints,
+                                       package_names[0] if isinstance(package_names, list) and package_names else None)
 
         if not self.data_path.crash_dump_log.exists():
             logger.info(f"No crash was found in this run.")
             return crash_events, anr_events
 
         try:
-            with open(self.data_path.crash_dump_log, "r", encoding="utf-8") as f:
-                content = f.read()
+            # Only the blocks after the checkpoint are parsed
+            with open(self.data_path.crash_dump_log, "rb") as f:
+                f.seek(checkpoint.crash_dump_offset)
+                content = f.read().decode("utf-8", errors="surrogateescape")
+
+            self._crash_content_end = 0
 
             # Parse crash events with screenshot mapping
-            crash_events = self._parse_crash_events_with_screenshots(content)
+            new_crash_events = self._parse_crash_events_with_screenshots(content)
 
             # Parse ANR events with screenshot mapping
-            anr_events = self._parse_anr_events_with_screenshots(content)
+            new_anr_events = self._parse_anr_events_with_screenshots(content)
+
+            # Group the new events with the same fingerprint as the ones before
+            for kind, events in (("crash", new_crash_events), ("anr", new_anr_events)):
+                for event in events:
+                    crash_index.add(kind, event, self.result_dir.name)
+            crash_events.extend(new_crash_events)
+            anr_events.extend(new_anr_events)
+            for event in crash_events + anr_events:
+                event["occurrences"] = crash_index.count(event["fingerprint"])
+
+            # Resume after the last complete block next time
+            checkpoint.crash_dump_offset += len(content[:self._crash_content_end].encode("utf-8", errors="surrogateescape"))
 
             logger.debug(f"Found {len(crash_events)} crash events and {len(anr_events)} ANR events")
 
@@ -756,38 +1018,19 @@ class BugReportGenerator(CrashAnrMixin, PathParserMixin, ScreenshotsMixin):
             logger.error(f"Error reading crash dump file: {e}")
             return crash_events, anr_events
 
-    def _find_screenshot_id_by_filename(self, screenshot_filename: str) -> str:
-        """
-        Find screenshot ID by filename in the screenshots list
-
-        Args:
-            screenshot_filename: Name of the screenshot file
-
-        Returns:
-            str: Screenshot ID if found, empty string otherwise
-        """
-        if not screenshot_filename:
-            return ""
-
-        for screenshot in self.screenshots:
-            # Extract filename from path
-            screenshot_path = screenshot.get('path', '')
-            if screenshot_path.endswith(screenshot_filename):
-                return str(screenshot.get('id', ''))
-
-        return ""
-
-    def _add_screenshot_ids_to_events(self, events: List[Dict]):
+    def _add_screenshot_ids_to_events(self, *event_lists: List[Dict]):
         """
         Add screenshot ID information to crash/ANR events
 
         Args:
-            events: List of crash or ANR event dictionaries
+            event_lists: Lists of crash or ANR event dictionaries
         """
+        events = [event for event_list in event_lists for event in event_list]
+        # The events without a crash screen in crash-dump.log take the screenshot of their steps count
+        filenames = {event["crash_screen"] for event in events if event.get("crash_screen")}
+        steps_counts = {event["steps_count"] for event in events if not event.get("crash_screen") and event.get("steps_count")}
+        ids, by_steps_count = self._index_screenshots(filenames, steps_counts)
+
         for event in events:
-            crash_screen = event.get('crash_screen')
-            if crash_screen:
-                screenshot_id = self._find_screenshot_id_by_filename(crash_screen)
-                event['screenshot_id'] = screenshot_id
-            else:
-                event['screenshot_id'] = ""
+            crash_screen = event.get("crash_screen") or by_steps_count.get(event.get("steps_count"))
+            event["screenshot_id"] = ids.get(crash_screen, "") if crash_screen else ""
@@ -0,0 +1,121 @@
+import json
+import os
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field, fields
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from ..utils import getLogger
+
+
+logger = getLogger(__name__)
+
+CHECKPOINT_DIR = ".report_checkpoint"
+CHECKPOINT_VERSION = 2
+
+
+@dataclass
+class StepsState:
+    """The state of the steps.log parser, enough to resume parsing at `offset`"""
+    offset: int = 0  # byte offset of the first unparsed line
+    step_index: int = 0
+    monkey_events_count: int = 0
+    current_property: Optional[str] = None
+    current_test: Dict = field(default_factory=dict)
+    property_violations: Dict[str, List[Dict]] = field(default_factory=dict)
+    executed_properties: Set[str] = field(default_factory=set)
+    executed_properties_by_step: Dict[int, int] = field(default_factory=dict)
+    kill_apps_events: List[Dict] = field(default_factory=list)
+    first_step_time: Optional[str] = None
+    last_step_time: Optional[str] = None
+    recent_screenshots: "OrderedDict[str, None]" = field(default_factory=OrderedDict)
+    # The screenshots timeline file is truncated to this size when resuming
+    timeline_size: int = 0
+    timeline_len: int = 0
+
+    def to_dict(self) -> Dict:
+        d = asdict(self)
+        d["executed_properties"] = sorted(self.executed_properties)
+        d["recent_screenshots"] = list(self.recent_screenshots)
+        return d
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "StepsState":
+        state = cls(**{f.name: d[f.name] for f in fields(cls) if f.name in d})
+        state.executed_properties = set(state.executed_properties)
+        state.executed_properties_by_step = {int(k): v for k, v in state.executed_properties_by_step.items()}
+        state.recent_screenshots = OrderedDict.fromkeys(state.recent_screenshots)
+        return state
+
+
+@dataclass
+class ReportCheckpoint:
+    """
+    The parsed state of a result dir, persisted in `<result_dir>/.report_checkpoint`.
+
+    Regenerating the report resumes every log from its byte offset, so only the new data is processed.
+    """
+    log_stamp: str = ""
+    steps: StepsState = field(default_factory=StepsState)
+    coverage_offset: int = 0
+    cov_trend: List[Dict] = field(default_factory=list)
+    final_cov: Optional[Dict] = None
+    exec_info_offset: int = 0
+    exec_infos: List[Dict] = field(default_factory=list)  # the fail/error lines of property_exec_info
+    crash_dump_offset: int = 0
+    crash_events: List[Dict] = field(default_factory=list)
+    anr_events: List[Dict] = field(default_factory=list)
+    # The crash and ANR groups of the run, see crash_fingerprint.FingerprintIndex
+    crash_fingerprints: Dict[str, Dict] = field(default_factory=dict)
+
+    @staticmethod
+    def checkpoint_dir(result_dir: Path) -> Path:
+        return Path(result_dir) / CHECKPOINT_DIR
+
+    @staticmethod
+    def timeline_path(result_dir: Path) -> Path:
+        return ReportCheckpoint.checkpoint_dir(result_dir) / "screenshots.jsonl"
+
+    @classmethod
+    def load(cls, result_dir: Path, log_stamp: str) -> "ReportCheckpoint":
+        """Load the checkpoint of result_dir. Return an empty checkpoint if there's no valid one."""
+        state_file = cls.checkpoint_dir(result_dir) / "state.json"
+        if not state_file.exists():
+            return cls(log_stamp=log_stamp)
+        try:
+            with open(state_file, "r", encoding="utf-8") as fp:
+                d = json.load(fp)
+            if d.pop("version", None) != CHECKPOINT_VERSION or d.get("log_stamp") != log_stamp:
+                raise ValueError("checkpoint of another version or run")
+            d["steps"] = StepsState.from_dict(d["steps"])
+            return cls(**d)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring the report checkpoint in {result_dir}: {e}")
+            return cls(log_stamp=log_stamp)
+
+    def check(self, steps_log: Path, coverage_log: Path, property_exec_info: Path, crash_dump_log: Path) -> bool:
+        """Whether the logs still extend the checkpointed ones (i.e. none was truncated or replaced)"""
+        for path, offset in (
+            (steps_log, self.steps.offset),
+            (coverage_log, self.coverage_offset),
+            (property_exec_info, self.exec_info_offset),
+            (crash_dump_log, self.crash_dump_offset),
+        ):
+            size = path.stat().st_size if path.exists() else 0
+            if size < offset:
+                logger.warning(f"{path} is smaller than the checkpointed offset, parsing it again.")
+                return False
+        return True
+
+    def save(self, result_dir: Path):
+        checkpoint_dir = self.checkpoint_dir(result_dir)
+        checkpoint_dir.mkdir(exist_ok=True)
+        d = asdict(self)
+        d["steps"] = self.steps.to_dict()
+        d["version"] = CHECKPOINT_VERSION
+        state_file = checkpoint_dir / "state.json"
+        part = state_file.with_name(state_file.name + ".part")
+        with open(part, "w", encoding="utf-8") as fp:
+            json.dump(d, fp)
+        os.replace(part, state_file)
+        logger.debug(f"Report checkpoint saved to {state_file}")
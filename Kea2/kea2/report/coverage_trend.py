@@ -0,0 +1,147 @@
+import heapq
+import json
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from ..utils import getLogger
+
+
+logger = getLogger(__name__)
+
+TESTED_COUNT_PATTERN = re.compile(rb'"testedActivitiesCount":\s*(\d+)')
+TOTAL_COUNT_PATTERN = re.compile(rb'"totalActivitiesCount":\s*(\d+)')
+
+
+class CoverageChange(NamedTuple):
+    stepsCount: int
+    # the activities tested (or known) for the first time at this step
+    tested: List[str]
+    total: List[str]
+
+
+class ActivityIds:
+    """Map the activity names to bit indexes, so that sets of activities are ints"""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = dict()
+        self.names: List[str] = list()
+
+    def bits(self, activities: Iterable[str]) -> int:
+        bits = 0
+        for activity in activities:
+            if activity not in self.ids:
+                self.ids[activity] = len(self.names)
+                self.names.append(activity)
+            bits |= 1 << self.ids[activity]
+        return bits
+
+    def activities(self, bits: int) -> List[str]:
+        activities = []
+        while bits:
+            low = bits & -bits
+            activities.append(self.names[low.bit_length() - 1])
+            bits ^= low
+        return activities
+
+
+def read_coverage_changes(coverage_file: Path) -> List[CoverageChange]:
+    """The steps of a coverage.log where new activities were tested or known (see read_coverage_log)"""
+    return read_coverage_log(coverage_file)[0]
+
+
+def read_coverage_log(coverage_file: Path) -> Tuple[List[CoverageChange], Optional[Dict]]:
+    """
+    The steps of a coverage.log where new activities were tested or known, and its last line (the final
+    coverage of the run), read forward in one pass.
+
+    The activity lists of a line are only parsed when its activity counts changed since the previous line,
+    so a long log costs a regex per line. The changes are at most one per activity.
+    """
+    ids = ActivityIds()
+    tested_bits = total_bits = 0
+    changes = []
+    last_counts = None
+    last_line = None
+    last_coverage = None
+    with open(coverage_file, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                # The last line is being written
+                break
+            if not line.strip():
+                continue
+            last_line = line
+            tested_count = TESTED_COUNT_PATTERN.search(line)
+            total_count = TOTAL_COUNT_PATTERN.search(line)
+            counts = (tested_count and tested_count.group(1), total_count and total_count.group(1))
+            if None not in counts and counts == last_counts:
+                continue
+            last_counts = counts
+            try:
+                coverage = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping an invalid line of {coverage_file}")
+                continue
+            last_line, last_coverage = None, coverage
+            tested = ids.bits(coverage.get("testedActivities", []))
+            total = ids.bits(coverage.get("totalActivities", []))
+            new_tested, new_total = tested & ~tested_bits, total & ~total_bits
+            if new_tested or new_total:
+                tested_bits |= tested
+                total_bits |= total
+                changes.append(CoverageChange(coverage.get("stepsCount", 0), ids.activities(new_tested), ids.activities(new_total)))
+    if last_line is not None:
+        # the last line was skipped by the counts check
+        try:
+            last_coverage = json.loads(last_line)
+        except json.JSONDecodeError:
+            logger.warning(f"Skipping an invalid line at the end of {coverage_file}")
+    return changes, last_coverage
+
+
+def merge_coverage_changes(runs: Sequence[Iterable[Sequence]]) -> Iterator[CoverageChange]:
+    """
+    k-way merge of the coverage changes of several runs onto their common step axis.
+
+    The union of the activities tested by all runs up to step N is kept as a bitset, and a change is
+    yielded when it grows. The runs are consumed lazily, holding one change per run.
+    A merged trend is itself a run: merging it with new runs extends it.
+    """
+    ids = ActivityIds()
+    tested_bits = total_bits = 0
+    merged = heapq.merge(*runs, key=lambda change: change[0])
+    pending = None
+    for steps_count, tested, total in merged:
+        if pending is not None and pending[0] != steps_count:
+            yield CoverageChange(pending[0], ids.activities(pending[1]), ids.activities(pending[2]))
+            pending = None
+        new_tested = ids.bits(tested) & ~tested_bits
+        new_total = ids.bits(total) & ~total_bits
+        if not new_tested and not new_total:
+            continue
+        tested_bits |= new_tested
+        total_bits |= new_total
+        # the changes of several runs at the same step are one change
+        if pending is None:
+            pending = [steps_count, 0, 0]
+        pending[1] |= new_tested
+        pending[2] |= new_total
+    if pending is not None:
+        yield CoverageChange(pending[0], ids.activities(pending[1]), ids.activities(pending[2]))
+
+
+def coverage_trend(changes: Iterable[Sequence]) -> List[Dict]:
+    """The points of the merged coverage trend chart"""
+    trend = []
+    tested_count = total_count = 0
+    for steps_count, tested, total in changes:
+        tested_count += len(tested)
+        total_count += len(total)
+        trend.append({
+            "stepsCount": steps_count,
+            "coverage": round(tested_count / total_count * 100, 2) if total_count else 0.0,
+            "testedActivitiesCount": tested_count,
+            "totalActivitiesCount": total_count,
+        })
+    return trend
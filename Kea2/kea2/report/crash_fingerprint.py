@@ -0,0 +1,134 @@
+import hashlib
+import re
+from typing import Dict, List, Optional, Sequence, Tuple, TypedDict
+
+from ..utils import getLogger
+
+
+logger = getLogger(__name__)
+
+# The frames hashed in a fingerprint
+TOP_FRAMES = 5
+
+# at com.example.Foo$1.lambda$onClick$0(Foo.java:42)
+JAVA_FRAME_PATTERN = re.compile(r'^\s*at\s+([\w$.<>\[\]/-]+)\s*(?:\([^)]*\))?')
+# #00 pc 0000000000089b1c  /apex/com.android.runtime/lib64/bionic/libc.so (abort+164) (BuildId: ...)
+NATIVE_FRAME_PATTERN = re.compile(r'^\s*#\d+\s+pc\s+[0-9a-fA-F]+\s+(\S+)(?:\s+\(([^)+\s]+)[^)]*\))?')
+# lambda$onClick$0 -> lambda$onClick, $$Lambda$Foo$abc123 / $ExternalSyntheticLambda0 -> $$Lambda
+LAMBDA_PATTERN = re.compile(r'(\$+(?:Lambda|ExternalSyntheticLambda))[\w$/]*|(lambda\$\w+?)\$\d+')
+# access$000 -> access$, Foo$1 -> Foo$
+SYNTHETIC_NUMBER_PATTERN = re.compile(r'\$\d+')
+# 0x7f3a2b, @1a2b3c4d
+ADDRESS_PATTERN = re.compile(r'0x[0-9a-fA-F]+|@[0-9a-fA-F]{6,}')
+
+
+class CrashGroup(TypedDict):
+    fingerprint: str
+    kind: str  # crash or anr
+    title: str  # the exception type of a crash, the reason of an ANR
+    count: int
+    # the runs (result directory names) and times of the first and last occurrences
+    first_seen: str
+    last_seen: str
+    first_time: str
+    last_time: str
+    # the first occurrence
+    event: Dict
+
+
+def normalize_frame(line: str) -> Optional[str]:
+    """
+    The frame of a stack trace line without what changes between builds, devices and runs:
+    source lines, addresses, lambda and synthetic accessor numbers. None if the line isn't a frame.
+    """
+    match = JAVA_FRAME_PATTERN.match(line)
+    if match:
+        frame = match.group(1)
+    else:
+        match = NATIVE_FRAME_PATTERN.match(line)
+        if not match:
+            return None
+        library = match.group(1).rsplit("/", 1)[-1]
+        frame = f"{library} ({match.group(2)})" if match.group(2) else library
+    frame = LAMBDA_PATTERN.sub(lambda m: m.group(1) and "$$Lambda" or m.group(2), frame)
+    frame = SYNTHETIC_NUMBER_PATTERN.sub("$", frame)
+    return ADDRESS_PATTERN.sub("", frame)
+
+
+def app_frames(trace: str, package: Optional[str] = None, top: int = TOP_FRAMES) -> List[str]:
+    """The top normalized frames of the app (of the whole trace when no frame is in the app package)"""
+    frames = [frame for frame in map(normalize_frame, trace.splitlines()) if frame]
+    if package:
+        in_app = [frame for frame in frames if frame.startswith(package)]
+        if in_app:
+            frames = in_app
+    return frames[:top]
+
+
+def fingerprint(kind: str, title: str, trace: str, package: Optional[str] = None) -> str:
+    """
+    The fingerprint of a crash or an ANR: a hash of its kind, title (exception type or reason)
+    and top app frames. The same crash on other devices and runs has the same fingerprint.
+    """
+    frames = app_frames(trace, package)
+    if not frames:
+        # an ANR dump without stack: the reason and the process line are all there is
+        frames = [ADDRESS_PATTERN.sub("", line) for line in trace.splitlines()
+                  if line.lstrip("/ ").startswith(("ANR:", "CRASH:"))][:1]
+        frames = [re.sub(r'\(pid\s+\d+\).*', "", frame).strip() for frame in frames]
+    digest = hashlib.sha1("\n".join([kind, title, *frames]).encode("utf-8", errors="surrogateescape"))
+    return digest.hexdigest()[:16]
+
+
+def event_fingerprint(kind: str, event: Dict, package: Optional[str] = None) -> str:
+    """The fingerprint of a crash or ANR event of the reports"""
+    if kind == "crash":
+        return fingerprint(kind, event.get("exception_type", ""), event.get("stack_trace", ""), package)
+    return fingerprint(kind, event.get("reason", ""), event.get("trace", ""), package)
+
+
+class FingerprintIndex:
+    """
+    The crash and ANR groups by fingerprint, with their occurrence counts and first and last seen runs.
+
+    Adding an event is a dict lookup. The index is a plain dict (`groups`), so that it's persisted
+    with the state of a report: the report checkpoint of a run, the merge state of a merged report.
+    """
+
+    def __init__(self, groups: Optional[Dict[str, CrashGroup]] = None, package: Optional[str] = None):
+        self.groups: Dict[str, CrashGroup] = groups if groups is not None else dict()
+        self.package = package
+
+    def add(self, kind: str, event: Dict, run: str = "") -> Tuple[str, bool]:
+        """
+        Add an occurrence of a crash or ANR. The fingerprint is set on the event.
+
+        Returns:
+            (fingerprint, new): new is True for the first occurrence of the fingerprint
+        """
+        key = event.get("fingerprint") or event_fingerprint(kind, event, self.package)
+        event["fingerprint"] = key
+        time = event.get("time") or ""
+        group = self.groups.get(key)
+        if group is None:
+            self.groups[key] = CrashGroup(
+                fingerprint=key, kind=kind,
+                title=event.get("exception_type" if kind == "crash" else "reason", ""),
+                count=1, first_seen=run, last_seen=run, first_time=time, last_time=time, event=event,
+            )
+            return key, True
+        group["count"] += 1
+        group["last_seen"], group["last_time"] = run, time
+        return key, False
+
+    def count(self, key: str) -> int:
+        group = self.groups.get(key)
+        return group["count"] if group else 0
+
+    def by_kind(self, kind: str) -> List[CrashGroup]:
+        """The groups of a kind, in the order of their first occurrence"""
+        return [group for group in self.groups.values() if group["kind"] == kind]
+
+    def events(self, kind: str, fields: Sequence[str] = ("count", "first_seen", "last_seen", "first_time", "last_time")) -> List[Dict]:
+        """The first occurrence of every group of a kind, with the group fields"""
+        return [{**group["event"], **{field: group[field] for field in fields}} for group in self.by_kind(kind)]
@@ -1,18 +1,29 @@
 from dataclasses import dataclass
+import os
 import re
+import threading
 
 from datetime import datetime
 from pathlib import Path
 from PIL import Image, ImageDraw, ImageFont
+from PIL.PngImagePlugin import PngInfo
 
 from ..utils import catchException, getLogger
 
-from typing import TYPE_CHECKING, Dict, List, Tuple, Union
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple, Union
 if TYPE_CHECKING:
+    from concurrent.futures import Executor, Future
     from .bug_report_generator import BugReportGenerator, StepData
+    from ..resultSyncer import SyncProgress
 
 
+# The marking tasks submitted to the executor and not finished yet. Bounds the memory
+# when the steps are parsed faster than the screenshots are marked.
+MAX_PENDING_MARKS = 1024
+
 CRASH_PATTERN = r'(?:StepsCount:\s*(\d+)\s*\nCrashScreen:\s*([^\n]*)\s*\n)?(\d{14})\ncrash:\n(.*?)\n// crash end'
+# screenshot-<MonkeyStepsCount>-<stamp>.png
+SCREENSHOT_NAME_PATTERN = re.compile(r'screenshot-(\d+)-')
 ANR_PATTERN = r'(?:StepsCount:\s*(\d+)\s*\nCrashScreen:\s*([^\n]+)\s*\n)?(\d{14})\nanr:\n(.*?)\nanr end'
 
 
@@ -20,17 +31,25 @@ ANR_PATTERN = r'(?:StepsCount:\s*(\d+)\s*\nCrashScreen:\s*([^\n]+)\s*\n)?(\d{14}
 class DataPath:
     output_dir: Path
     steps_log: Path
+    steps_index: Path
     result_json: Path
     coverage_log: Path
     screenshots_dir: Path
+    thumbnails_dir: Path
+    webp_dir: Path
     property_exec_info: Path
     crash_dump_log: Path
+    perf_json: Path
 
 
 logger = getLogger(__name__)
 
 
 class CrashAnrMixin:
+
+    # The end of the last crash/anr block parsed in the content
+    _crash_content_end: int = 0
+
     def _iter_crash_info(self: "BugReportGenerator", content: str, pattern: str):
         """
         Iterate over crash info blocks in crash-dump.log content
@@ -40,22 +59,19 @@ class CrashAnrMixin:
 
         Yields:
             Tuple[str, str, str, str]: steps_count, crash_screen, timestamp_str, crash_content
+            (crash_screen is empty when the crash dump has none, it is resolved by steps_count later)
         """
         for match in re.finditer(pattern, content, re.DOTALL):
             steps_count = match.group(1)
             crash_screen = match.group(2)
             timestamp_str = match.group(3)
             crash_content = match.group(4)
+            self._crash_content_end = max(self._crash_content_end, match.end())
             
             if timestamp_str:
                 timestamp = datetime.strptime(timestamp_str, "%Y%m%d%H%M%S")
                 timestamp_str = timestamp.strftime("%Y-%m-%d %H:%M:%S")
-                
-            if not crash_screen and steps_count:
-                _crash_screens = list(self.data_path.screenshots_dir.glob(f'screenshot-{steps_count}-*.png'))
-                if _crash_screens:
-                    crash_screen = str(_crash_screens[0].name)
-            
+
             yield steps_count, crash_screen, timestamp_str, crash_content
 
     def _parse_crash_events_with_screenshots(self: "BugReportGenerator", content: str) -> List[Dict]:
@@ -282,150 +298,303 @@ class PathParserMixin:
         self._data_path: DataPath = DataPath(
             output_dir=output_dir,
             steps_log=output_dir / "steps.log",
+            steps_index=output_dir / "steps.idx",
             coverage_log=output_dir / "coverage.log",
             screenshots_dir=output_dir / "screenshots",
+            thumbnails_dir=output_dir / "thumbnails",
+            webp_dir=output_dir / "webp",
             crash_dump_log=output_dir / "crash-dump.log",
             property_exec_info=property_exec_info_file,
             result_json=result_file,
+            perf_json=result_file.with_name(result_file.name.replace("result_", "perf_", 1)),
         )
 
 
-class ScreenshotsMixin:
+# The png text key recording that the screenshot is marked
+MARKED_KEY = "kea2-marked"
+# The thumbnails fit in the screenshot box of the report
+THUMBNAIL_SIZE = (300, 400)
 
-    _take_screenshots: bool = None
-    
-    @property
-    def take_screenshots(self: "BugReportGenerator") -> bool:
-        """Whether the `--take-screenshots` enabled. Should we report the screenshots?
+_font = None
 
-        Returns:
-            bool: Whether the `--take-screenshots` enabled.
-        """
-        if self._take_screenshots is None:
-            self._take_screenshots = self.data_path.screenshots_dir.exists()
-        return self._take_screenshots
-
-    @catchException("Error when marking screenshot")
-    def _mark_screenshot(self: "BugReportGenerator", step_data: "StepData"):
-        step_type = step_data["Type"]
-        screenshot_name = step_data["Screenshot"]
-        if not screenshot_name:
-            return
-        info = step_data.get("Info")
-        if not isinstance(info, dict):
-            return
-
-        if step_type == "Monkey":
-            act = info.get("act")
-            pos = info.get("pos")
-            if act in ["CLICK", "LONG_CLICK"] or act.startswith("SCROLL"):
-                self._mark_screenshot_interaction(step_type, screenshot_name, act, pos)
-
-        elif step_type == "Script":
-            act = info.get("method")
-            pos = info.get("params")
-            if act in ["click", "setText", "swipe"]:
-                self._mark_screenshot_interaction(step_type, screenshot_name, act, pos)
-
-    def _mark_screenshot_interaction(
-            self: "BugReportGenerator",
-            step_type: str, screenshot_name: str, action_type: str, position: Union[List, Tuple]
-        ) -> bool:
-        """
-        Mark interaction on screenshot with colored rectangle
-
-        Args:
-            step_type (str): Type of the step (Monkey or Script)
-            screenshot_name (str): Name of the screenshot file
-            action_type (str): Type of action (CLICK/LONG_CLICK/SCROLL for Monkey, click/setText/swipe for Script)
-            position: Position coordinates or parameters (format varies by action type)
-
-        Returns:
-            bool: True if marking was successful, False otherwise
-        """
-        screenshot_path: Path = self.data_path.screenshots_dir / screenshot_name
-        if not screenshot_path.exists():
-            logger.debug(f"Screenshot file {screenshot_path} not exists.")
-            return False
 
+def _get_font():
+    global _font
+    if _font is None:
         try:
-            img = Image.open(screenshot_path).convert("RGB")
-        except OSError as e:
-            logger.debug(f"Error opening image {screenshot_path}: {e}")
+            _font = ImageFont.truetype("arial.ttf", 80)
+        except OSError:
+            _font = ImageFont.load_default()
+    return _font
+
+
+def init_marking_worker():
+    """Initializer of the marking processes: load the font once per worker"""
+    _get_font()
+
+
+@catchException("Error when marking screenshot")
+def mark_screenshot(screenshot_path: str, step_data: "StepData") -> bool:
+    """
+    Mark the interaction of the step on its screenshot. Runs in the marking processes.
+
+    Returns:
+        bool: True if the screenshot was marked, False if there's nothing to mark or it is already marked
+    """
+    step_type = step_data["Type"]
+    if not step_data["Screenshot"]:
+        return False
+    info = step_data.get("Info")
+    if not isinstance(info, dict):
+        return False
+
+    if step_type == "Monkey":
+        act = info.get("act")
+        pos = info.get("pos")
+        if act in ["CLICK", "LONG_CLICK"] or act.startswith("SCROLL"):
+            return _mark_screenshot_interaction(Path(screenshot_path), step_type, act, pos)
+
+    elif step_type == "Script":
+        act = info.get("method")
+        pos = info.get("params")
+        if act in ["click", "setText", "swipe"]:
+            return _mark_screenshot_interaction(Path(screenshot_path), step_type, act, pos)
+
+    return False
+
+
+def process_screenshot(screenshot_path: str, step_data: "StepData", webp: bool = False) -> bool:
+    """
+    Mark the screenshot, then generate its derivatives. Runs in the marking processes.
+
+    Returns:
+        bool: True if the screenshot was marked
+    """
+    marked = mark_screenshot(screenshot_path, step_data)
+    make_derivatives(Path(screenshot_path), webp)
+    return bool(marked)
+
+
+def derivative_paths(screenshot_path: Path) -> Tuple[Path, Path]:
+    """The (thumbnail, webp) paths of a screenshot in output_dir/screenshots"""
+    output_dir = screenshot_path.parent.parent
+    return (
+        output_dir / "thumbnails" / f"{screenshot_path.stem}.jpg",
+        output_dir / "webp" / f"{screenshot_path.stem}.webp",
+    )
+
+
+@catchException("Error when generating the screenshot derivatives")
+def make_derivatives(screenshot_path: Path, webp: bool = False):
+    """
+    Generate the thumbnail (and the full-size webp) of a screenshot.
+    A derivative newer than the screenshot is up to date and not generated again.
+    """
+    if not screenshot_path.exists():
+        return
+    mtime = screenshot_path.stat().st_mtime
+    thumbnail, webp_path = derivative_paths(screenshot_path)
+    todo = [p for p in ([thumbnail, webp_path] if webp else [thumbnail])
+            if not p.exists() or p.stat().st_mtime < mtime]
+    if not todo:
+        return
+
+    with Image.open(screenshot_path) as img:
+        img = img.convert("RGB")
+        for path in todo:
+            path.parent.mkdir(exist_ok=True)
+            part = path.with_name(path.name + ".part")
+            if path == thumbnail:
+                thumb = img.copy()
+                thumb.thumbnail(THUMBNAIL_SIZE)
+                thumb.save(part, format="JPEG", quality=75)
+            else:
+                img.save(part, format="WEBP", quality=80)
+            os.replace(part, path)
+
+
+def _mark_screenshot_interaction(
+    screenshot_path: Path, step_type: str, action_type: str, position: Union[List, Tuple]
+) -> bool:
+    """
+    Mark interaction on screenshot with colored rectangle
+
+    Args:
+        screenshot_path (Path): Path of the screenshot file
+        step_type (str): Type of the step (Monkey or Script)
+        action_type (str): Type of action (CLICK/LONG_CLICK/SCROLL for Monkey, click/setText/swipe for Script)
+        position: Position coordinates or parameters (format varies by action type)
+
+    Returns:
+        bool: True if marking was successful, False otherwise
+    """
+    if not screenshot_path.exists():
+        logger.debug(f"Screenshot file {screenshot_path} not exists.")
+        return False
+
+    try:
+        with Image.open(screenshot_path) as src:
+            if src.info.get(MARKED_KEY):
+                # Marked by a previous report generation
+                return False
+            img = src.convert("RGB")
+    except OSError as e:
+        logger.debug(f"Error opening image {screenshot_path}: {e}")
+        return False
+    draw = ImageDraw.Draw(img)
+    line_width = 5
+
+    if step_type == "Monkey":
+        if len(position) < 4:
+            logger.warning(f"Monkey action requires 4 coordinates, got {len(position)}. Skip drawing.")
             return False
-        draw = ImageDraw.Draw(img)
-        line_width = 5
 
-        if step_type == "Monkey":
-            if len(position) < 4:
-                logger.warning(f"Monkey action requires 4 coordinates, got {len(position)}. Skip drawing.")
-                return False
+        x1, y1, x2, y2 = map(int, position[:4])
 
-            x1, y1, x2, y2 = map(int, position[:4])
+        if action_type == "CLICK":
+            for i in range(line_width):
+                draw.rectangle([x1 - i, y1 - i, x2 + i, y2 + i], outline=(255, 0, 0))
+        elif action_type == "LONG_CLICK":
+            for i in range(line_width):
+                draw.rectangle([x1 - i, y1 - i, x2 + i, y2 + i], outline=(0, 0, 255))
+        elif action_type.startswith("SCROLL"):
+            for i in range(line_width):
+                draw.rectangle([x1 - i, y1 - i, x2 + i, y2 + i], outline=(0, 255, 0))
 
-            if action_type == "CLICK":
-                for i in range(line_width):
-                    draw.rectangle([x1 - i, y1 - i, x2 + i, y2 + i], outline=(255, 0, 0))
-            elif action_type == "LONG_CLICK":
-                for i in range(line_width):
-                    draw.rectangle([x1 - i, y1 - i, x2 + i, y2 + i], outline=(0, 0, 255))
-            elif action_type.startswith("SCROLL"):
-                for i in range(line_width):
-                    draw.rectangle([x1 - i, y1 - i, x2 + i, y2 + i], outline=(0, 255, 0))
+    elif step_type == "Script":
+        if action_type == "click":
 
-        elif step_type == "Script":
-            if action_type == "click":
+            if len(position) < 2:
+                logger.warning(f"Script click action requires 2 coordinates, got {len(position)}. Skip drawing.")
+                return False
+            
+            x, y = map(float, position[:2])
+            x1, y1, x2, y2 = x - 50, y - 50, x + 50, y + 50
 
-                if len(position) < 2:
-                    logger.warning(f"Script click action requires 2 coordinates, got {len(position)}. Skip drawing.")
-                    return False
+            for i in range(line_width):
+                draw.rectangle([x1 - i, y1 - i, x2 + i, y2 + i], outline=(255, 0, 0))
                 
-                x, y = map(float, position[:2])
-                x1, y1, x2, y2 = x - 50, y - 50, x + 50, y + 50
+        elif action_type == "swipe":
 
-                for i in range(line_width):
-                    draw.rectangle([x1 - i, y1 - i, x2 + i, y2 + i], outline=(255, 0, 0))
-                    
-            elif action_type == "swipe":
-
-                if len(position) < 4:
-                    logger.warning(f"Script swipe action requires 4 coordinates, got {len(position)}. Skip drawing.")
-                    return False
-                
-                x1, y1, x2, y2 = map(float, position[:4])
-                
-                # mark start and end positions with rectangles
-                start_x1, start_y1, start_x2, start_y2 = x1 - 50, y1 - 50, x1 + 50, y1 + 50
-                for i in range(line_width):
-                    draw.rectangle([start_x1 - i, start_y1 - i, start_x2 + i, start_y2 + i], outline=(255, 0, 0))
-
-                end_x1, end_y1, end_x2, end_y2 = x2 - 50, y2 - 50, x2 + 50, y2 + 50
-                for i in range(line_width):
-                    draw.rectangle([end_x1 - i, end_y1 - i, end_x2 + i, end_y2 + i], outline=(255, 0, 0))
+            if len(position) < 4:
+                logger.warning(f"Script swipe action requires 4 coordinates, got {len(position)}. Skip drawing.")
+                return False
+            
+            x1, y1, x2, y2 = map(float, position[:4])
+            
+            # mark start and end positions with rectangles
+            start_x1, start_y1, start_x2, start_y2 = x1 - 50, y1 - 50, x1 + 50, y1 + 50
+            for i in range(line_width):
+                draw.rectangle([start_x1 - i, start_y1 - i, start_x2 + i, start_y2 + i], outline=(255, 0, 0))
+
+            end_x1, end_y1, end_x2, end_y2 = x2 - 50, y2 - 50, x2 + 50, y2 + 50
+            for i in range(line_width):
+                draw.rectangle([end_x1 - i, end_y1 - i, end_x2 + i, end_y2 + i], outline=(255, 0, 0))
+            
+            # draw line between start and end positions
+            draw.line([(x1, y1), (x2, y2)], fill=(255, 0, 0), width=line_width)
+            
+            # add text labels for start and end positions
+            font = _get_font()
                 
-                # draw line between start and end positions
-                draw.line([(x1, y1), (x2, y2)], fill=(255, 0, 0), width=line_width)
+            # draw "start" at start position
+            draw.text((x1 - 20, y1 - 70), "start", fill=(255, 0, 0), font=font)
                 
-                # add text labels for start and end positions
-                font = ImageFont.truetype("arial.ttf", 80)
-                    
-                # draw "start" at start position
-                draw.text((x1 - 20, y1 - 70), "start", fill=(255, 0, 0), font=font)
-                    
-                # draw "end" at end position
-                draw.text((x2 - 15, y2 - 70), "end", fill=(255, 0, 0), font=font)
-
-        img.save(screenshot_path)
-        return True
+            # draw "end" at end position
+            draw.text((x2 - 15, y2 - 70), "end", fill=(255, 0, 0), font=font)
+
+    # Record the marking in the png so that it's never marked twice
+    pnginfo = PngInfo()
+    pnginfo.add_text(MARKED_KEY, "1")
+    part = screenshot_path.with_name(screenshot_path.name + ".part")
+    img.save(part, format="PNG", pnginfo=pnginfo)
+    os.replace(part, screenshot_path)
+    return True
+
+
+class MarkingQueue:
+    """
+    Submit the screenshot marking tasks to the executor.
+
+    When the report is generated during the final sync (sync_progress given), the screenshots
+    not yet on host are kept pending and submitted as soon as they land.
+    `submit` blocks while MAX_PENDING_MARKS tasks are queued in the executor.
+    """
+
+    def __init__(self, executor: "Executor", screenshots_dir: Path, sync_progress: Optional["SyncProgress"] = None, webp: bool = False):
+        self.executor = executor
+        self.screenshots_dir = screenshots_dir
+        self.webp = webp
+        self.sync_progress = sync_progress
+        self._lock = threading.Lock()
+        self._pending: Dict[str, "StepData"] = dict()
+        self._landed: Set[str] = set()
+        self._slots = threading.BoundedSemaphore(MAX_PENDING_MARKS)
+        # The screenshots newly marked (the others had nothing to mark or were marked before)
+        self.marked = 0
+        self._consumer = None
+        if sync_progress:
+            self._consumer = threading.Thread(target=self._consume, daemon=True)
+            self._consumer.start()
+
+    def submit(self, step_data: "StepData"):
+        if self.sync_progress:
+            with self._lock:
+                name = step_data["Screenshot"]
+                if name not in self._landed and not (self.screenshots_dir / name).exists():
+                    self._pending[name] = step_data
+                    return
+        self._submit(step_data)
+
+    def _submit(self, step_data: "StepData"):
+        self._slots.acquire()
+        future = self.executor.submit(process_screenshot, str(self.screenshots_dir / step_data["Screenshot"]), step_data, self.webp)
+        future.add_done_callback(self._on_done)
+
+    def _on_done(self, future: "Future"):
+        self._slots.release()
+        if not future.cancelled() and future.exception() is None and future.result():
+            with self._lock:
+                self.marked += 1
+
+    def _consume(self):
+        for name in self.sync_progress.iter_landed():
+            with self._lock:
+                self._landed.add(name)
+                step_data = self._pending.pop(name, None)
+            if step_data:
+                self._submit(step_data)
+
+    def join(self):
+        """Wait until all the landed screenshots have been submitted."""
+        if self._consumer:
+            self._consumer.join()
+
+
+class ScreenshotsMixin:
+
+    _take_screenshots: bool = None
+    # Generate full-size webp versions of the screenshots
+    webp: bool = False
     
-    def _add_screenshot_info(self:"BugReportGenerator", step_data: "StepData", step_index: int, data: Dict):
+    @property
+    def take_screenshots(self: "BugReportGenerator") -> bool:
+        """Whether the `--take-screenshots` enabled. Should we report the screenshots?
+
+        Returns:
+            bool: Whether the `--take-screenshots` enabled.
         """
-        Add screenshot information to data structure
+        if self._take_screenshots is None:
+            self._take_screenshots = self.data_path.screenshots_dir.exists()
+        return self._take_screenshots
+
+    def _add_screenshot_info(self:"BugReportGenerator", step_data: "StepData", step_index: int):
+        """
+        Add screenshot information to the screenshots timeline
 
         Args:
             step_data: data for the current step
             step_index: Current step index
-            data: Data dictionary to update
         """
         caption = ""
         info = step_data.get("Info")
@@ -460,23 +629,60 @@ class ScreenshotsMixin:
         screenshot_name = step_data["Screenshot"]
 
         # Check if the screenshot file actually exists
+        # (the missing ones are dropped after the final sync when it is still running)
         screenshot_file_path = self.data_path.screenshots_dir / screenshot_name
-        if not screenshot_file_path.exists():
+        if not self.sync_progress and not screenshot_file_path.exists():
             # Skip adding this screenshot if the file doesn't exist
             return
 
         # Use relative path string instead of Path object
         abs_screenshots_path = self.data_path.output_dir / "screenshots" / screenshot_name
         relative_screenshot_path = str(abs_screenshots_path.relative_to(self.result_dir))
-
-        data["screenshot_info"][screenshot_name] = {
-            "type": step_data["Type"],
-            "caption": caption,
-            "step_index": step_index
-        }
+        # The derivatives are generated with the marking. The report shows the thumbnail and links to the full image.
+        thumbnail, webp_path = derivative_paths(abs_screenshots_path)
 
         self.screenshots.append({
             'id': step_index,
             'path': relative_screenshot_path,  # Now using string path
+            'thumb': str(thumbnail.relative_to(self.result_dir)),
+            'full': str((webp_path if self.webp else abs_screenshots_path).relative_to(self.result_dir)),
             'caption': f"{step_index}. {caption}"
         })
+
+    def _index_screenshots(self: "BugReportGenerator", filenames: Set[str],
+                           steps_counts: Set[str]) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """
+        Look up screenshots in the timeline, in a single pass for all the lookups of the report.
+        Only the requested entries are kept, the timeline itself stays on disk.
+
+        Args:
+            filenames: screenshot file names to find the ids of
+            steps_counts: monkey steps counts to find the first screenshot of
+
+        Returns:
+            Tuple[Dict[str, str], Dict[str, str]]: the ids of the screenshots by file name
+                (for filenames and the screenshots found by steps count), and the file name by steps count
+        """
+        ids: Dict[str, str] = dict()
+        by_steps_count: Dict[str, str] = dict()
+        if not filenames and not steps_counts:
+            return ids, by_steps_count
+
+        for screenshot in self.screenshots:
+            if not screenshot["path"]:
+                continue
+            name = Path(screenshot["path"]).name
+            m = SCREENSHOT_NAME_PATTERN.match(name)
+            if m and m.group(1) in steps_counts and m.group(1) not in by_steps_count:
+                by_steps_count[m.group(1)] = name
+                ids.setdefault(name, str(screenshot["id"]))
+            elif name in filenames:
+                ids.setdefault(name, str(screenshot["id"]))
+        return ids, by_steps_count
+
+    def _drop_missing_screenshots(self: "BugReportGenerator"):
+        """
+        Drop the screenshots never landed on host. Only needed when the report is generated during the final sync.
+        The timeline is filtered in place, so that the checkpoint resumes it from its actual size.
+        """
+        self.screenshots.filter(lambda s: not s["path"] or (self.result_dir / s["path"]).exists())
@@ -1,25 +1,184 @@
 import json
 import os
 import re
+from dataclasses import dataclass, field
 from datetime import datetime
+from fnmatch import fnmatch
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
 from collections import defaultdict
 
+from .crash_fingerprint import CrashGroup, FingerprintIndex, event_fingerprint
+from .coverage_trend import CoverageChange, coverage_trend, merge_coverage_changes, read_coverage_log
+from .utils import available_cpus, process_pool
 from ..utils import getLogger, catchException
 
 logger = getLogger(__name__)
 
+MERGE_STATE_FILE = "merge_state.json"
+MERGE_STATE_VERSION = 3
+PROPERTY_RESULT_KEYS = ["precond_satisfied", "executed", "fail", "error"]
+
+
+@dataclass
+class DirectoryAggregate:
+    """The compact data of one result directory, collected by a worker of the merge"""
+    result_dir: str
+    package_name: Optional[str] = None
+    # the package validation of this directory stops the merge
+    fatal_error: bool = False
+    html_file: Optional[str] = None
+    # None when the directory has no result file or no html report
+    property_results: Optional[Dict[str, Dict[str, int]]] = None
+    # the last line of coverage.log
+    coverage: Optional[Dict] = None
+    # the steps of coverage.log where new activities were tested
+    coverage_changes: List[CoverageChange] = field(default_factory=list)
+    crash_events: List[Dict] = field(default_factory=list)
+    anr_events: List[Dict] = field(default_factory=list)
+
+    @property
+    def dir_name(self) -> str:
+        return Path(self.result_dir).name
+
+
+@dataclass
+class MergeState:
+    """
+    The aggregate state of a merged report, saved as merge_state.json in the merged report directory.
+    New result directories are folded into it without reading the merged ones again (`kea2 merge --into`).
+    """
+    package_name: Optional[str] = None
+    # resolved paths of the merged result directories, in merge order
+    source_directories: List[str] = field(default_factory=list)
+    property_stats: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    # property name -> [{'dir_name': str, 'report_path': str}] of the directories where it failed
+    property_source_mapping: Dict[str, List[Dict]] = field(default_factory=dict)
+    total_activities: Set[str] = field(default_factory=set)
+    tested_activities: Set[str] = field(default_factory=set)
+    activity_count_history: Dict[str, int] = field(default_factory=dict)
+    total_steps: int = 0
+    # the steps of the longest run, where the merged coverage trend ends
+    max_run_steps: int = 0
+    # the merged coverage trend of all the runs, see merge_coverage_changes
+    coverage_changes: List[CoverageChange] = field(default_factory=list)
+    # the crash and ANR groups of all the runs, see crash_fingerprint.FingerprintIndex
+    crash_fingerprints: Dict[str, CrashGroup] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.total_activities = set(self.total_activities)
+        self.tested_activities = set(self.tested_activities)
+        self._crash_index = FingerprintIndex(self.crash_fingerprints)
+
+    def add(self, aggregate: DirectoryAggregate, report_path: Optional[str]):
+        """
+        Fold a result directory into the state
+
+        Args:
+            aggregate: The collected result directory
+            report_path: The path of its html report, relative to the merged report directory
+        """
+        self.source_directories.append(aggregate.result_dir)
+        dir_name = aggregate.dir_name  # Get the directory name (e.g., res_2025072011_5048015228)
+
+        for prop_name, prop_result in (aggregate.property_results or {}).items():
+            stats = self.property_stats.setdefault(prop_name, dict.fromkeys(PROPERTY_RESULT_KEYS, 0))
+            for key in PROPERTY_RESULT_KEYS:
+                stats[key] += prop_result.get(key, 0)
+
+            # Track source directories for properties with fail/error
+            if prop_result.get('fail', 0) > 0 or prop_result.get('error', 0) > 0:
+                sources = self.property_source_mapping.setdefault(prop_name, [])
+                if dir_name not in [item['dir_name'] for item in sources]:
+                    sources.append({'dir_name': dir_name, 'report_path': report_path})
+
+        last_coverage = aggregate.coverage
+        if last_coverage:
+            self.total_activities.update(last_coverage.get("totalActivities", []))
+            self.tested_activities.update(last_coverage.get("testedActivities", []))
+            for activity, count in last_coverage.get("activityCountHistory", {}).items():
+                self.activity_count_history[activity] = self.activity_count_history.get(activity, 0) + count
+            self.total_steps += last_coverage.get("stepsCount", 0)
+            self.max_run_steps = max(self.max_run_steps, last_coverage.get("stepsCount", 0))
+
+        # The events link to the report of their directory. A group links to its first occurrence.
+        if aggregate.html_file:
+            for kind, events in (("crash", aggregate.crash_events), ("anr", aggregate.anr_events)):
+                for event in events:
+                    event.update(source_directory=dir_name, report_path=report_path)
+                    self._crash_index.add(kind, event, dir_name)
+
+    def coverage_data(self) -> Dict:
+        """The merged coverage information"""
+        # Calculate final coverage percentage (rounded to 2 decimal places)
+        coverage_percent = round((len(self.tested_activities) / len(self.total_activities) * 100), 2) if self.total_activities else 0.00
+        trend = coverage_trend(self.coverage_changes)
+        if trend and trend[-1]["stepsCount"] < self.max_run_steps:
+            trend.append({**trend[-1], "stepsCount": self.max_run_steps})
+        return {
+            "coverage_percent": coverage_percent,
+            "total_activities": sorted(self.total_activities),
+            "tested_activities": sorted(self.tested_activities),
+            "total_activities_count": len(self.total_activities),
+            "tested_activities_count": len(self.tested_activities),
+            "activity_count_history": dict(self.activity_count_history),
+            "total_steps": self.total_steps,
+            "coverage_trend": trend
+        }
+
+    def crash_anr_data(self) -> Dict:
+        """The merged crash and ANR events, one per fingerprint"""
+        crash_events = self._crash_index.events("crash")
+        anr_events = self._crash_index.events("anr")
+        return {
+            "crash_events": crash_events,
+            "anr_events": anr_events,
+            "total_crash_count": len(crash_events),
+            "total_anr_count": len(anr_events)
+        }
+
+    def save(self, path: Path):
+        data = {field_name: getattr(self, field_name) for field_name in self.__dataclass_fields__}
+        data["total_activities"] = sorted(self.total_activities)
+        data["tested_activities"] = sorted(self.tested_activities)
+        tmp_path = Path(f"{path}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as fp:
+            json.dump({"version": MERGE_STATE_VERSION, **data}, fp, ensure_ascii=False)
+        # a merge interrupted while saving keeps the previous state
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "MergeState":
+        with open(path, "r", encoding="utf-8") as fp:
+            data = json.load(fp)
+        version = data.pop("version", None)
+        if version != MERGE_STATE_VERSION:
+            raise ValueError(f"Unsupported merge state version {version} in {path}")
+        return cls(**data)
+
+
+def collect_directory(result_dir: Path) -> DirectoryAggregate:
+    """Collect a result directory in a worker process of the merge"""
+    return TestReportMerger()._collect_directory(Path(result_dir))
+
 
 class TestReportMerger:
     """
     Merge multiple test result directories into a single combined dataset
     Only processes result_*.json and coverage.log files for the simplified template
+
+    Every directory is read once, by a worker of a process pool, into a DirectoryAggregate.
+    The aggregates are then reduced into the merged report.
     """
     
-    def __init__(self):
+    def __init__(self, workers: Optional[int] = None):
+        """
+        Args:
+            workers: Number of processes collecting the result directories (one per core by default)
+        """
         self.merged_data = {}
         self.result_dirs = []
+        self.workers = workers
         self._package_name: Optional[str] = None
     
     @catchException("Error merging reports")
@@ -38,7 +197,14 @@ class TestReportMerger:
         self.result_dirs = [Path(p).resolve() for p in result_paths]
         self._package_name = None
 
-        package_name, fatal_error = self._determine_package_name()
+        if not self.result_dirs:
+            logger.error("No result directories provided for merge.")
+            return None
+
+        logger.debug(f"Merging {len(self.result_dirs)} test result directories...")
+        aggregates = self._collect_directories(self.result_dirs)
+
+        package_name, fatal_error = self._determine_package_name(aggregates)
         if fatal_error:
             logger.error("Aborting merge because package validation failed.")
             return None
@@ -53,48 +219,168 @@ class TestReportMerger:
         
         output_dir.mkdir(parents=True, exist_ok=True)
 
-        logger.debug(f"Merging {len(self.result_dirs)} test result directories...")
+        # Reduce the aggregates of the directories
+        state = MergeState(package_name=package_name)
+        self._merge_aggregates(state, aggregates, output_dir)
+        return self._write_report(state, output_dir)
+
+    @catchException("Error merging reports")
+    def merge_into(self, merged_dir: Union[str, Path], result_paths: List[Union[str, Path]]) -> Optional[Path]:
+        """
+        Fold new test result directories into an existing merged report. Only the new directories are read.
+
+        Args:
+            merged_dir: The merged report directory (with its merge_state.json)
+            result_paths: List of paths to the new test result directories (res_* directories)
+
+        Returns:
+            Path to the updated HTML report, or None if validation fails
+        """
+        merged_dir = Path(merged_dir).resolve()
+        state_file = merged_dir / MERGE_STATE_FILE
+        if not state_file.exists():
+            logger.error(f"No {MERGE_STATE_FILE} in {merged_dir}. Merge its source directories again to create it.")
+            return None
+        state = MergeState.load(state_file)
+
+        merged = set(state.source_directories)
+        new_dirs = []
+        for path in result_paths:
+            result_dir = Path(path).resolve()
+            if str(result_dir) in merged:
+                logger.warning(f"{result_dir} is already merged in {merged_dir}, skipped.")
+                continue
+            merged.add(str(result_dir))
+            new_dirs.append(result_dir)
+        self.result_dirs = [Path(d) for d in state.source_directories] + new_dirs
+        self._package_name = state.package_name
+        if not new_dirs:
+            logger.warning(f"No new result directory to merge into {merged_dir}")
+            return merged_dir / "merged_report.html"
+
+        logger.debug(f"Merging {len(new_dirs)} test result directories into {merged_dir}...")
+        aggregates = self._collect_directories(new_dirs)
+
+        package_name, fatal_error = self._determine_package_name(aggregates, state.package_name)
+        if fatal_error:
+            logger.error("Aborting merge because package validation failed.")
+            return None
+        self._package_name = state.package_name = package_name
 
-        # Merge different types of data
-        merged_property_stats, property_source_mapping = self._merge_property_results(output_dir)
-        merged_coverage_data = self._merge_coverage_data()
-        merged_crash_anr_data = self._merge_crash_dump_data(output_dir)
+        self._merge_aggregates(state, aggregates, merged_dir)
+        return self._write_report(state, merged_dir)
 
+    def _write_report(self, state: MergeState, output_dir: Path) -> Optional[Path]:
+        """Generate the merged HTML report of the state and save the state next to it"""
         # Calculate final statistics
-        final_data = self._calculate_final_statistics(merged_property_stats, merged_coverage_data, merged_crash_anr_data, property_source_mapping)
+        final_data = self._calculate_final_statistics(state.property_stats, state.coverage_data(), state.crash_anr_data(), state.property_source_mapping)
         
         # Add merge information to final data
         final_data['merge_info'] = {
             'merge_timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'source_count': len(self.result_dirs),
-            'source_directories': [str(Path(d).name) for d in self.result_dirs],
+            'source_count': len(state.source_directories),
+            'source_directories': [Path(d).name for d in state.source_directories],
             'package_name': self._package_name or ""
         }
 
         # Generate HTML report (now includes merge info)
         report_file = self._generate_html_report(final_data, output_dir)
+        if report_file is None:
+            return None
+        state.save(output_dir / MERGE_STATE_FILE)
         
         logger.debug(f"Reports generated successfully in: {output_dir}")
         return report_file
 
-    def _determine_package_name(self) -> Tuple[Optional[str], bool]:
+    def _collect_directories(self, result_dirs: List[Path]) -> List[DirectoryAggregate]:
+        """Collect the result directories in a process pool, in their order"""
+        workers = min(self.workers or available_cpus(), len(result_dirs))
+        if workers <= 1:
+            return [self._collect_directory(result_dir) for result_dir in result_dirs]
+        with process_pool(max_workers=workers) as executor:
+            # a few directories per task, to keep the overhead low on hundreds of small directories
+            chunksize = max(1, len(result_dirs) // (workers * 4))
+            return list(executor.map(collect_directory, result_dirs, chunksize=chunksize))
+
+    def _collect_directory(self, result_dir: Path) -> DirectoryAggregate:
+        """
+        Read everything the merge needs from a result directory, listing it only once.
+        """
+        aggregate = DirectoryAggregate(str(result_dir))
+        aggregate.package_name, aggregate.fatal_error = self._extract_package_name(result_dir)
+
+        result_file = html_file = output_dir = None
+        with os.scandir(result_dir) as entries:
+            for entry in entries:
+                if result_file is None and fnmatch(entry.name, "result_*.json"):
+                    result_file = Path(entry.path)
+                elif html_file is None and fnmatch(entry.name, "*.html"):
+                    html_file = Path(entry.path)
+                elif output_dir is None and fnmatch(entry.name, "output_*"):
+                    output_dir = Path(entry.path)
+        aggregate.html_file = str(html_file.resolve()) if html_file else None
+
+        if not result_file:
+            logger.warning(f"No result file found in {result_dir}")
+        elif not html_file:
+            logger.warning(f"No html file found in {result_dir}")
+        else:
+            with open(result_file, 'r', encoding='utf-8') as f:
+                test_results = json.load(f)
+            aggregate.property_results = {
+                prop_name: {key: prop_result.get(key, 0) for key in PROPERTY_RESULT_KEYS}
+                for prop_name, prop_result in test_results.items()
+            }
+            logger.debug(f"Collected results from: {result_file}")
+
+        if not output_dir:
+            logger.warning(f"No output directory found in {result_dir}")
+            return aggregate
+
+        coverage_file = output_dir / "coverage.log"
+        if coverage_file.exists():
+            aggregate.coverage_changes, aggregate.coverage = read_coverage_log(coverage_file)
+            logger.debug(f"Collected coverage data from: {coverage_file}")
+        else:
+            logger.warning(f"No coverage.log found in {output_dir}")
+
+        # The events are linked to the html report of the directory, there are none without it
+        crash_dump_file = output_dir / "crash-dump.log"
+        if html_file and not crash_dump_file.exists():
+            logger.debug(f"No crash-dump.log found in {output_dir}")
+        elif html_file:
+            try:
+                # Parse crash and ANR events from this file
+                aggregate.crash_events, aggregate.anr_events = self._parse_crash_dump_file(crash_dump_file) or ([], [])
+                # The fingerprints are computed by the workers, grouping is a lookup in the reduce
+                for kind, events in (("crash", aggregate.crash_events), ("anr", aggregate.anr_events)):
+                    for event in events:
+                        event["fingerprint"] = event_fingerprint(kind, event, aggregate.package_name)
+                logger.debug(f"Collected {len(aggregate.crash_events)} crash events and {len(aggregate.anr_events)} ANR events from: {crash_dump_file}")
+            except Exception as e:
+                logger.error(f"Error reading crash dump file {crash_dump_file}: {e}")
+        return aggregate
+
+    def _determine_package_name(self, aggregates: List[DirectoryAggregate], known_package: Optional[str] = None) -> Tuple[Optional[str], bool]:
         """
         Ensure all reports belong to the same application and return the shared package name.
 
+        Args:
+            aggregates: The collected result directories
+            known_package: The package of the directories merged before (optional)
+
         Returns:
             tuple: (package_name, fatal_error)
                 package_name: shared package name if determined, otherwise None
                 fatal_error: True if validation should stop the merge
         """
-        if not self.result_dirs:
+        if not aggregates:
             logger.error("No result directories provided for merge.")
             return None, True
 
-        known_package: Optional[str] = None
-
-        for result_dir in self.result_dirs:
-            package_name, fatal_error = self._extract_package_name(result_dir)
-            if fatal_error:
+        for aggregate in aggregates:
+            package_name = aggregate.package_name
+            if aggregate.fatal_error:
                 return None, True
             if package_name is None:
                 continue
@@ -104,7 +390,7 @@ class TestReportMerger:
             elif package_name != known_package:
                 logger.error(
                     f"Cannot merge reports generated for different applications: "
-                    f"{result_dir.name} uses package '{package_name}' while others use '{known_package}'."
+                    f"{aggregate.dir_name} uses package '{package_name}' while others use '{known_package}'."
                 )
                 return None, True
 
@@ -150,201 +436,34 @@ class TestReportMerger:
         logger.error(f"packageNames format is invalid in {config_path}")
         return None, True
     
-    def _merge_property_results(self, output_dir: Path = None) -> Tuple[Dict[str, Dict], Dict[str, List[Dict]]]:
+    def _merge_aggregates(self, state: MergeState, aggregates: Iterable[DirectoryAggregate], output_dir: Path):
         """
-        Merge property test results from all directories
+        Fold the collected result directories into the state
 
         Args:
+            state: The merge state
+            aggregates: The collected result directories
             output_dir: The output directory where the merged report will be saved (for calculating relative paths)
-
-        Returns:
-            Tuple of (merged_property_results, property_source_mapping)
-            - merged_property_results: Merged property execution results
-            - property_source_mapping: Maps property names to list of source directory info with fail/error
-              Each entry contains: {'dir_name': str, 'report_path': str}
-        """
-        merged_results = defaultdict(lambda: {
-            "precond_satisfied": 0,
-            "executed": 0,
-            "fail": 0,
-            "error": 0
-        })
-
-        # Track which directories have fail/error for each property
-        property_source_mapping = defaultdict(list)
-
-        for result_dir in self.result_dirs:
-            result_files = list(result_dir.glob("result_*.json"))
-            html_files = list(result_dir.glob("*.html"))
-            if not result_files:
-                logger.warning(f"No result file found in {result_dir}")
-                continue
-            if not html_files:
-                logger.warning(f"No html file found in {result_dir}")
-                continue
-
-            result_file = result_files[0]  # Take the first (should be only one)
-            html_file = html_files[0]
-            dir_name = result_dir.name  # Get the directory name (e.g., res_2025072011_5048015228)
-
-            # Find the HTML report file in the result directory
-            html_report_path = None
-            
-            # Calculate relative path from output_dir to the HTML file
-            try:
-                html_report_path = os.path.relpath(html_file.resolve(), output_dir.resolve())
-            except ValueError:
-                # If on different drives (Windows), use absolute path as fallback
-                html_report_path = str(html_file.resolve())
-
-            with open(result_file, 'r', encoding='utf-8') as f:
-                test_results = json.load(f)
-
-            # Merge results for each property
-            for prop_name, prop_result in test_results.items():
-                for key in ["precond_satisfied", "executed", "fail", "error"]:
-                    merged_results[prop_name][key] += prop_result.get(key, 0)
-
-                # Track source directories for properties with fail/error
-                if prop_result.get('fail', 0) > 0 or prop_result.get('error', 0) > 0:
-                    # Check if this directory is already in the mapping
-                    existing_dirs = [item['dir_name'] for item in property_source_mapping[prop_name]]
-                    if dir_name not in existing_dirs:
-                        property_source_mapping[prop_name].append({
-                            'dir_name': dir_name,
-                            'report_path': html_report_path
-                        })
-
-            logger.debug(f"Merged results from: {result_file}")
-
-        return dict(merged_results), dict(property_source_mapping)
-    
-    def _merge_coverage_data(self) -> Dict:
-        """
-        Merge coverage data from all directories
-        
-        Returns:
-            Final merged coverage information
         """
-        all_activities = set()
-        tested_activities = set()
-        activity_counts = defaultdict(int)
-        total_steps = 0
-        
-        for result_dir in self.result_dirs:
-            # Find coverage log file
-            output_dirs = list(result_dir.glob("output_*"))
-            if not output_dirs:
-                logger.warning(f"No output directory found in {result_dir}")
-                continue
-                
-            coverage_file = output_dirs[0] / "coverage.log"
-            if not coverage_file.exists():
-                logger.warning(f"No coverage.log found in {output_dirs[0]}")
-                continue
-
-            # Read the last line of coverage.log to get final state
-            last_coverage = None
-            with open(coverage_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    if line.strip():
-                        last_coverage = json.loads(line)
-            
-            if last_coverage:
-                # Collect all activities
-                all_activities.update(last_coverage.get("totalActivities", []))
-                tested_activities.update(last_coverage.get("testedActivities", []))
-                
-                # Update activity counts (take maximum)
-                for activity, count in last_coverage.get("activityCountHistory", {}).items():
-                    activity_counts[activity] += count
-                
-                # Add steps count
-                total_steps += last_coverage.get("stepsCount", 0)
-            
-            logger.debug(f"Merged coverage data from: {coverage_file}")
-        
-        # Calculate final coverage percentage (rounded to 2 decimal places)
-        coverage_percent = round((len(tested_activities) / len(all_activities) * 100), 2) if all_activities else 0.00
-        
-        return {
-            "coverage_percent": coverage_percent,
-            "total_activities": list(all_activities),
-            "tested_activities": list(tested_activities),
-            "total_activities_count": len(all_activities),
-            "tested_activities_count": len(tested_activities),
-            "activity_count_history": dict(activity_counts),
-            "total_steps": total_steps
-        }
-
-    def _merge_crash_dump_data(self, output_dir: Path = None) -> Dict:
-        """
-        Merge crash and ANR data from all directories
-
-        Returns:
-            Dict containing merged crash and ANR events
-        """
-        all_crash_events = []
-        all_anr_events = []
-
-        for result_dir in self.result_dirs:
-            dir_name = result_dir.name
-
-            # Locate corresponding HTML report for hyperlinking
+        for aggregate in aggregates:
             html_report_path = None
-            html_files = list(result_dir.glob("*.html"))
-            if not html_files:
-                continue
-            html_file = html_files[0]
-            try:
-                html_report_path = os.path.relpath(html_file.resolve(), output_dir.resolve())
-            except ValueError:
-                html_report_path = str(html_file.resolve())
-
-            # Find crash dump log file
-            output_dirs = list(result_dir.glob("output_*"))
-            if not output_dirs:
-                continue
-
-            crash_dump_file = output_dirs[0] / "crash-dump.log"
-            if not crash_dump_file.exists():
-                logger.debug(f"No crash-dump.log found in {output_dirs[0]}")
-                continue
+            if aggregate.html_file:
+                # Calculate relative path from output_dir to the HTML file
+                try:
+                    html_report_path = os.path.relpath(aggregate.html_file, output_dir.resolve())
+                except ValueError:
+                    # If on different drives (Windows), use absolute path as fallback
+                    html_report_path = aggregate.html_file
+            state.add(aggregate, html_report_path)
+            logger.debug(f"Merged {aggregate.result_dir}")
+
+        # The trend merged before is one more run of the trend
+        state.coverage_changes = list(merge_coverage_changes(
+            [state.coverage_changes] + [aggregate.coverage_changes for aggregate in aggregates]
+        ))
+
+        logger.debug(f"Total crash and ANR groups: {len(state.crash_fingerprints)}")
 
-            try:
-                # Parse crash and ANR events from this file
-                crash_events, anr_events = self._parse_crash_dump_file(crash_dump_file)
-
-                for crash in crash_events:
-                    crash["source_directory"] = dir_name
-                    crash["report_path"] = html_report_path
-
-                for anr in anr_events:
-                    anr["source_directory"] = dir_name
-                    anr["report_path"] = html_report_path
-
-                all_crash_events.extend(crash_events)
-                all_anr_events.extend(anr_events)
-
-                logger.debug(f"Merged {len(crash_events)} crash events and {len(anr_events)} ANR events from: {crash_dump_file}")
-
-            except Exception as e:
-                logger.error(f"Error reading crash dump file {crash_dump_file}: {e}")
-                continue
-
-        # Deduplicate events based on content and timestamp
-        unique_crash_events = self._deduplicate_crash_events(all_crash_events)
-        unique_anr_events = self._deduplicate_anr_events(all_anr_events)
-
-        logger.debug(f"Total unique crash events: {len(unique_crash_events)}, ANR events: {len(unique_anr_events)}")
-
-        return {
-            "crash_events": unique_crash_events,
-            "anr_events": unique_anr_events,
-            "total_crash_count": len(unique_crash_events),
-            "total_anr_count": len(unique_anr_events)
-        }
-    
     @catchException("Error parsing crash-dump.log")
     def _parse_crash_dump_file(self, crash_dump_file: Path) -> Tuple[List[Dict], List[Dict]]:
         """
@@ -583,63 +702,6 @@ class TestReportMerger:
         # If all else fails, return the original but truncated
         return full_reason[:50] + "..." if len(full_reason) > 50 else full_reason
 
-    def _deduplicate_crash_events(self, crash_events: List[Dict]) -> List[Dict]:
-        """
-        Deduplicate crash events based on exception type and stack trace
-
-        Args:
-            crash_events: List of crash events
-
-        Returns:
-            List[Dict]: Deduplicated crash events
-        """
-        seen_crashes = set()
-        unique_crashes = []
-
-        for crash in crash_events:
-            # Create a hash key based on exception type and first few lines of stack trace
-            exception_type = crash.get("exception_type", "")
-            stack_trace = crash.get("stack_trace", "")
-
-            # Use first 3 lines of stack trace for deduplication
-            stack_lines = stack_trace.split('\n')[:3]
-            crash_key = (
-                exception_type,
-                '\n'.join(stack_lines),
-                crash.get("source_directory", "")
-            )
-
-            if crash_key not in seen_crashes:
-                seen_crashes.add(crash_key)
-                unique_crashes.append(crash)
-
-        return unique_crashes
-
-    def _deduplicate_anr_events(self, anr_events: List[Dict]) -> List[Dict]:
-        """
-        Deduplicate ANR events based on reason and process
-
-        Args:
-            anr_events: List of ANR events
-
-        Returns:
-            List[Dict]: Deduplicated ANR events
-        """
-        seen_anrs = set()
-        unique_anrs = []
-
-        for anr in anr_events:
-            # Create a hash key based on reason and process
-            reason = anr.get("reason", "")
-            process = anr.get("process", "")
-            anr_key = (reason, process, anr.get("source_directory", ""))
-
-            if anr_key not in seen_anrs:
-                seen_anrs.add(anr_key)
-                unique_anrs.append(anr)
-
-        return unique_anrs
-
     def _calculate_final_statistics(self, property_stats: Dict, coverage_data: Dict, crash_anr_data: Dict = None, property_source_mapping: Dict = None) -> Dict:
         """
         Calculate final statistics for template rendering
@@ -0,0 +1,74 @@
+import json
+import shutil
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, TypedDict
+
+from ..utils import getLogger
+
+
+logger = getLogger(__name__)
+
+SHARDS_DIR = "report_data"
+# Items per chunk of each section. A chunk is a page of the report.
+CHUNK_SIZES = {
+    "screenshots": 200,
+    "coverage": 5000,
+    "crashes": 20,
+    "anrs": 20,
+    "errors": 20,
+}
+
+
+class SectionManifest(TypedDict):
+    chunks: int
+    size: int
+    count: int
+    # The first item key of every chunk (e.g. the screenshot ids), to locate an item without loading the chunks
+    bounds: List
+
+
+class ShardWriter:
+    """
+    Write the data of the sharded bug report in `<result_dir>/report_data`.
+
+    The report is usually opened from file://, where browsers block fetch() and XHR.
+    So every chunk is a script calling `kea2Shards.receive(section, index, items)`,
+    which the report page loads with a script tag when the user pages to it.
+    """
+
+    def __init__(self, result_dir: Path):
+        self.shards_dir = Path(result_dir) / SHARDS_DIR
+        # The chunks of a previous report may outnumber the new ones
+        shutil.rmtree(self.shards_dir, ignore_errors=True)
+        self.shards_dir.mkdir(parents=True)
+        self.manifest: Dict[str, SectionManifest] = dict()
+
+    def write(self, section: str, items: Iterable, key: Optional[str] = None) -> SectionManifest:
+        """
+        Split items into chunks of CHUNK_SIZES[section] and write them. items are consumed lazily.
+
+        Args:
+            section: name of the section
+            items: JSON serializable items of the section
+            key: the item field recorded in the bounds of the chunks (optional)
+        """
+        size = CHUNK_SIZES[section]
+        it = iter(items)
+        manifest = SectionManifest(chunks=0, size=size, count=0, bounds=[])
+        while chunk := list(islice(it, size)):
+            path = self.shards_dir / f"{section}-{manifest['chunks']}.js"
+            with open(path, "w", encoding="utf-8") as fp:
+                fp.write(f"kea2Shards.receive({json.dumps(section)}, {manifest['chunks']}, ")
+                json.dump(chunk, fp)
+                fp.write(");\n")
+            if key is not None:
+                manifest["bounds"].append(chunk[0][key])
+            manifest["chunks"] += 1
+            manifest["count"] += len(chunk)
+        self.manifest[section] = manifest
+        logger.debug(f"Wrote {manifest['count']} {section} in {manifest['chunks']} chunks")
+        return manifest
+
+    def to_template(self) -> Dict:
+        return {"dir": SHARDS_DIR, "sections": self.manifest}
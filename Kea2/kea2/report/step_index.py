@@ -0,0 +1,197 @@
+import json
+import os
+import struct
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from ..utils import getLogger
+
+
+logger = getLogger(__name__)
+
+STEP_INDEX_MAGIC = b"KEA2STEP"
+STEP_INDEX_VERSION = 1
+STEP_TYPES = ("", "Monkey", "Script", "ScriptInfo", "Fuzz")
+
+# magic, version
+HEADER = struct.Struct("<8sI")
+# offset, length, MonkeyStepsCount, type, screenshot name (NUL padded, empty if it doesn't fit)
+RECORD = struct.Struct("<QIIB55s")
+
+
+class StepRecord(NamedTuple):
+    index: int  # the step index of the report, starts at 1
+    offset: int  # byte offset of the line in steps.log
+    length: int
+    type: str
+    monkey_steps_count: int
+    screenshot: str
+
+
+class Violation(NamedTuple):
+    index: int  # the index of the violation in the report
+    property_name: str
+    start: int  # step index of the start of the property
+    end: int  # step index of the fail / error
+    state: str
+
+
+class StepIndex:
+    """
+    Fixed-size binary records of the lines of steps.log, in `<output_dir>/steps.idx`.
+
+    The record of step N is at a known position, so any step range of a large log
+    is read with a single seek. The index is appended while the report parses steps.log
+    and catches up by itself (`update`) when the log grew since.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        exists = self.path.exists()
+        self.fp = open(self.path, "r+b" if exists else "w+b")
+        if exists and not self._check_header():
+            logger.warning(f"Rebuilding the invalid step index {self.path}")
+            exists = False
+        if not exists:
+            self.fp.seek(0)
+            self.fp.truncate()
+            self.fp.write(HEADER.pack(STEP_INDEX_MAGIC, STEP_INDEX_VERSION))
+            self.fp.flush()
+        # a partially written record is dropped
+        self._len = (os.fstat(self.fp.fileno()).st_size - HEADER.size) // RECORD.size
+        self.truncate(self._len)
+
+    def _check_header(self) -> bool:
+        header = self.fp.read(HEADER.size)
+        return len(header) == HEADER.size and HEADER.unpack(header) == (STEP_INDEX_MAGIC, STEP_INDEX_VERSION)
+
+    def __len__(self):
+        return self._len
+
+    @property
+    def end(self) -> int:
+        """The byte offset in steps.log after the last indexed line"""
+        if not self._len:
+            return 0
+        last = self[self._len]
+        return last.offset + last.length
+
+    def truncate(self, length: int):
+        """Keep the first `length` records (e.g. when the report resumes parsing at an earlier step)"""
+        self._len = min(self._len, length)
+        self.fp.truncate(HEADER.size + self._len * RECORD.size)
+        self.fp.seek(0, os.SEEK_END)
+
+    def append(self, offset: int, length: int, step_data: Optional[Dict]):
+        step_data = step_data or {}
+        step_type = step_data.get("Type", "")
+        monkey_steps_count = step_data.get("MonkeyStepsCount")
+        screenshot = (step_data.get("Screenshot") or "").encode("utf-8")
+        self.fp.write(RECORD.pack(
+            offset, length,
+            monkey_steps_count if isinstance(monkey_steps_count, int) and monkey_steps_count >= 0 else 0,
+            STEP_TYPES.index(step_type) if step_type in STEP_TYPES else 0,
+            screenshot if len(screenshot) <= 55 else b""
+        ))
+        self._len += 1
+
+    def update(self, steps_log: Path, end: Optional[int] = None) -> int:
+        """
+        Index the complete lines of steps_log after the last indexed one (up to the byte offset `end`).
+
+        Returns:
+            int: the number of indexed lines
+        """
+        added = 0
+        if self.end > os.path.getsize(steps_log):
+            logger.warning(f"{steps_log} is smaller than its index, indexing it again.")
+            self.truncate(0)
+        with open(steps_log, "rb") as f:
+            offset = self.end
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n") or (end is not None and offset + len(line) > end):
+                    break
+                try:
+                    step_data = json.loads(line)
+                except json.JSONDecodeError:
+                    step_data = None
+                self.append(offset, len(line), step_data if isinstance(step_data, dict) else None)
+                offset += len(line)
+                added += 1
+        self.fp.flush()
+        return added
+
+    def __getitem__(self, index: int) -> StepRecord:
+        if not 1 <= index <= self._len:
+            raise IndexError(f"step {index} out of range [1, {self._len}]")
+        self.fp.seek(HEADER.size + (index - 1) * RECORD.size)
+        offset, length, monkey_steps_count, step_type, screenshot = RECORD.unpack(self.fp.read(RECORD.size))
+        self.fp.seek(0, os.SEEK_END)
+        return StepRecord(index, offset, length, STEP_TYPES[step_type], monkey_steps_count,
+                          screenshot.rstrip(b"\0").decode("utf-8"))
+
+    def records(self, start: int, end: int) -> List[StepRecord]:
+        """The records of the steps [start, end], clamped to the indexed steps"""
+        start, end = max(start, 1), min(end, self._len)
+        if start > end:
+            return []
+        self.fp.seek(HEADER.size + (start - 1) * RECORD.size)
+        data = self.fp.read((end - start + 1) * RECORD.size)
+        self.fp.seek(0, os.SEEK_END)
+        return [
+            StepRecord(start + i, offset, length, STEP_TYPES[step_type], monkey_steps_count,
+                       screenshot.rstrip(b"\0").decode("utf-8"))
+            for i, (offset, length, monkey_steps_count, step_type, screenshot) in enumerate(RECORD.iter_unpack(data))
+        ]
+
+    def read_steps(self, steps_log: Path, start: int, end: int) -> Iterator[Tuple[StepRecord, bytes]]:
+        """Read the lines of the steps [start, end] from steps_log, with one seek"""
+        records = self.records(start, end)
+        if not records:
+            return
+        with open(steps_log, "rb") as f:
+            f.seek(records[0].offset)
+            for record in records:
+                yield record, f.read(record.length)
+
+    def violations(self, steps_log: Path) -> List[Violation]:
+        """
+        The property violations, numbered like in the bug report. Only the ScriptInfo lines are read.
+        """
+        by_property: Dict[str, List[Tuple[int, int, str]]] = dict()
+        current_property, start = None, 0
+        with open(steps_log, "rb") as f:
+            for i in range(1, self._len + 1, 4096):
+                for record in self.records(i, i + 4095):
+                    if record.type != "ScriptInfo":
+                        continue
+                    f.seek(record.offset)
+                    info = json.loads(f.read(record.length)).get("Info", {})
+                    if isinstance(info, str):
+                        info = json.loads(info) if info.strip()[:1] == "{" else {}
+                    if not isinstance(info, dict):
+                        continue
+                    property_name, state = info.get("propName", ""), info.get("state", "")
+                    if not property_name or not state:
+                        continue
+                    if state == "start":
+                        current_property, start = property_name, record.index
+                    elif state in ("pass", "fail", "error") and current_property == property_name:
+                        if state != "pass":
+                            by_property.setdefault(property_name, []).append((start, record.index, state))
+                        current_property = None
+        violations = []
+        for property_name, items in by_property.items():
+            for start, end, state in items:
+                violations.append(Violation(len(violations) + 1, property_name, start, end, state))
+        return violations
+
+    def close(self):
+        self.fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
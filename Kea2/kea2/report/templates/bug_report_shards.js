@@ -0,0 +1,247 @@
+        // Runtime of the sharded report: the data chunks in {{ shards.dir }}/ are loaded on demand.
+        // Browsers block fetch() on file://, so every chunk is a script calling kea2Shards.receive().
+        window.kea2Shards = (function() {
+            var manifest = {{ shards|tojson }};
+            var takeScreenshots = {{ take_screenshots|tojson }};
+            var cache = {};
+            var waiting = {};
+            var screenshotsPage = 0;
+
+            function escapeHtml(text) {
+                var div = document.createElement('div');
+                div.textContent = text === undefined || text === null ? '' : String(text);
+                return div.innerHTML;
+            }
+
+            function section(name) {
+                return manifest.sections[name] || {chunks: 0, size: 0, count: 0, bounds: []};
+            }
+
+            function load(name, index) {
+                var key = name + '-' + index;
+                if (cache[key]) {
+                    return Promise.resolve(cache[key]);
+                }
+                if (!waiting[key]) {
+                    waiting[key] = {};
+                    waiting[key].promise = new Promise(function(resolve, reject) {
+                        waiting[key].resolve = resolve;
+                        var script = document.createElement('script');
+                        script.src = manifest.dir + '/' + key + '.js';
+                        script.onload = function() { script.remove(); };
+                        script.onerror = function() {
+                            script.remove();
+                            delete waiting[key];
+                            reject(new Error('Failed to load ' + script.src));
+                        };
+                        document.head.appendChild(script);
+                    });
+                }
+                return waiting[key].promise;
+            }
+
+            function receive(name, index, items) {
+                var key = name + '-' + index;
+                cache[key] = items;
+                if (waiting[key]) {
+                    waiting[key].resolve(items);
+                    delete waiting[key];
+                }
+            }
+
+            function loadAll(name) {
+                var loads = [];
+                for (var i = 0; i < section(name).chunks; i++) {
+                    loads.push(load(name, i));
+                }
+                return Promise.all(loads).then(function(chunks) {
+                    return [].concat.apply([], chunks);
+                });
+            }
+
+            // Previous / next buttons and the page number, in the style of the other paginations
+            function renderPager(paginationId, page, totalPages, onPage) {
+                var pagination = document.getElementById(paginationId);
+                if (!pagination) return;
+                var container = pagination.closest('.pagination-container');
+                if (container) {
+                    container.style.display = totalPages > 1 ? '' : 'none';
+                }
+                pagination.innerHTML =
+                    '<li class="page-item' + (page === 0 ? ' disabled' : '') + '"><a class="page-link" href="#" data-page="' + (page - 1) + '">&laquo;</a></li>' +
+                    '<li class="page-item active"><span class="page-link">' + (page + 1) + ' / ' + totalPages + '</span></li>' +
+                    '<li class="page-item' + (page >= totalPages - 1 ? ' disabled' : '') + '"><a class="page-link" href="#" data-page="' + (page + 1) + '">&raquo;</a></li>';
+                pagination.querySelectorAll('a.page-link').forEach(function(link) {
+                    link.addEventListener('click', function(e) {
+                        e.preventDefault();
+                        var target = parseInt(this.dataset.page);
+                        if (target >= 0 && target < totalPages) {
+                            onPage(target);
+                        }
+                    });
+                });
+            }
+
+            function renderScreenshot(screenshot) {
+                var item = '<div class="screenshot-item">';
+                if (screenshot.path) {
+                    item += '<a href="' + escapeHtml(screenshot.full || screenshot.path) + '" target="_blank">' +
+                        '<img src="' + escapeHtml(screenshot.thumb || screenshot.path) + '" class="screenshot-img" id="' + escapeHtml(screenshot.id) + '"' +
+                        ' loading="lazy" decoding="async" data-fallback="' + escapeHtml(screenshot.path) + '"></a>';
+                } else {
+                    item += '<div class="screenshot-placeholder" id="' + escapeHtml(screenshot.id) + '">' +
+                        '<div class="placeholder-content"><span class="placeholder-icon info"><i class="bi bi-info-circle"></i></span>' +
+                        '<div class="placeholder-text">Info event</div></div></div>';
+                }
+                return item + '<div class="screenshot-caption">' + escapeHtml(screenshot.caption) + '</div></div>';
+            }
+
+            function showScreenshots(page) {
+                var container = document.getElementById('screenshots');
+                if (!container) return Promise.resolve();
+                return load('screenshots', page).then(function(items) {
+                    screenshotsPage = page;
+                    container.innerHTML = items.map(renderScreenshot).join('');
+                    container.querySelectorAll('img[data-fallback]').forEach(function(img) {
+                        img.onerror = function() { this.onerror = null; this.src = this.dataset.fallback; };
+                    });
+                    container.scrollLeft = 0;
+                    if (window.beautifyScreenshotCaptions) {
+                        window.beautifyScreenshotCaptions(container);
+                    }
+                    renderPager('screenshots-pagination', page, section('screenshots').chunks, showScreenshots);
+                });
+            }
+
+            // Show the page of the screenshot and call then(). Return false if it's not in the report.
+            function gotoScreenshot(screenshotId, then) {
+                var bounds = section('screenshots').bounds;
+                var id = parseInt(screenshotId);
+                var page = -1;
+                for (var lo = 0, hi = bounds.length - 1; lo <= hi;) {
+                    var mid = (lo + hi) >> 1;
+                    if (bounds[mid] <= id) {
+                        page = mid;
+                        lo = mid + 1;
+                    } else {
+                        hi = mid - 1;
+                    }
+                }
+                if (page < 0 || page === screenshotsPage && document.getElementById('screenshots').childElementCount) {
+                    return false;
+                }
+                showScreenshots(page).then(function() {
+                    if (document.getElementById(screenshotId)) {
+                        then(screenshotId);
+                    }
+                });
+                return true;
+            }
+
+            function renderEvent(event, type, number) {
+                var colspan = takeScreenshots ? 6 : 5;
+                var isCrash = type === 'crash';
+                var stackIndex = isCrash ? number : 'anr-' + number;
+                var detailId = (isCrash ? 'crash-detail-' : 'anr-detail-') + number;
+                var row = '<tr class="event-row" data-type="' + type + '">' +
+                    (isCrash ? '<td><span class="badge bg-danger">CRASH</span></td>' : '<td><span class="badge bg-warning text-dark">ANR</span></td>') +
+                    '<td>' + escapeHtml(event.time) + '</td>' +
+                    '<td>' + escapeHtml(isCrash ? event.exception_type : event.reason) +
+                    (event.occurrences > 1 ? ' <span class="badge bg-secondary ms-1" title="' + event.occurrences + ' events with the same fingerprint in this run">&times;' + event.occurrences + '</span>' : '') + '</td>' +
+                    '<td>' + escapeHtml(event.process) + '</td>';
+                if (takeScreenshots) {
+                    row += '<td>' + (event.screenshot_id ?
+                        '<a href="#' + escapeHtml(event.screenshot_id) + '" class="link-button" onclick="scrollToScreenshot(\'' + escapeHtml(event.screenshot_id) + '\')">' +
+                        '<i class="bi bi-camera"></i> Screenshot ' + escapeHtml(event.screenshot_id) + '</a>' :
+                        '<span class="text-muted">No screenshot</span>') + '</td>';
+                }
+                row += '<td><button class="btn btn-sm btn-outline-primary" type="button" data-bs-toggle="collapse" data-bs-target="#' + detailId + '"' +
+                    ' aria-expanded="false" aria-controls="' + detailId + '"><i class="bi bi-eye"></i> Details</button> ' +
+                    '<button class="btn btn-sm btn-outline-secondary copy-stack-btn" data-stack-index="' + stackIndex + '"><i class="bi bi-clipboard"></i> Copy</button></td></tr>' +
+                    '<tr class="collapse" id="' + detailId + '"><td colspan="' + colspan + '"><div class="bg-light p-3 rounded">' +
+                    (isCrash ? '<h6 class="text-danger">Stack Trace:</h6>' : '<h6 class="text-dark">ANR Details:</h6>') +
+                    '<pre class="' + (isCrash ? 'text-danger' : 'text-dark') + ' mb-0 text-start" id="stack-trace-' + stackIndex + '"' +
+                    ' style="font-size: 0.9em; white-space: pre-wrap; text-align: left;">' + escapeHtml(isCrash ? event.stack_trace : event.trace) + '</pre>' +
+                    '</div></td></tr>';
+                return row;
+            }
+
+            // The crash pages come first in "All Events", like in the single file report
+            function showEvents(filter, page) {
+                var container = document.getElementById('crash-events-container');
+                if (!container) return;
+                var pages = [];
+                if (filter !== 'anr-only') {
+                    for (var i = 0; i < section('crashes').chunks; i++) pages.push(['crashes', i]);
+                }
+                if (filter !== 'crashes-only') {
+                    for (var j = 0; j < section('anrs').chunks; j++) pages.push(['anrs', j]);
+                }
+                if (pages.length === 0) {
+                    container.innerHTML = '';
+                    renderPager('events-pagination', 0, 0, function() {});
+                    return;
+                }
+                var name = pages[page][0], index = pages[page][1];
+                load(name, index).then(function(items) {
+                    var type = name === 'crashes' ? 'crash' : 'anr';
+                    var first = index * section(name).size + 1;
+                    container.innerHTML = items.map(function(event, i) {
+                        return renderEvent(event, type, first + i);
+                    }).join('');
+                    renderPager('events-pagination', page, pages.length, function(target) {
+                        showEvents(filter, target);
+                    });
+                });
+            }
+
+            function renderErrors(errors) {
+                return errors.map(function(error, i) {
+                    var badge = error.state === 'fail' ? 'danger' : 'warning';
+                    var html = '<div class="mb-3"><div class="mb-2">' +
+                        '<span class="badge bg-' + badge + '">' + escapeHtml(error.state.toUpperCase()) + ' #' + (i + 1) + '</span>';
+                    if (errors.length > 1) {
+                        html += '<small class="text-muted ms-2">Error ' + (i + 1) + ' of ' + errors.length + '</small>';
+                    }
+                    if (error.occurrence_count > 1) {
+                        html += '<span class="badge bg-info ms-2">' + error.occurrence_count + ' occurrences</span>';
+                    }
+                    if (error.startStepsCountList && error.startStepsCountList.length > 0) {
+                        html += '<span class="badge bg-secondary ms-2"><i class="bi bi-step-forward"></i> Monkey Steps: ' +
+                            escapeHtml(error.startStepsCountList.join(', ')) + '</span>';
+                    }
+                    html += '</div>';
+                    if (error.short_description) {
+                        html += '<div class="mb-2"><strong>Error:</strong> <code>' + escapeHtml(error.short_description) + '</code></div>';
+                    }
+                    return html + '<details><summary class="btn btn-sm btn-outline-secondary mb-2">Show Full Traceback</summary>' +
+                        '<pre class="text-danger mb-0 text-start" style="font-size: 0.85rem; white-space: pre-wrap; text-align: left;">' +
+                        escapeHtml(error.traceback) + '</pre></details></div>';
+                }).join('');
+            }
+
+            // The error details of a property are loaded when they are expanded
+            document.addEventListener('show.bs.collapse', function(e) {
+                var row = e.target;
+                if (!row.classList || !row.classList.contains('sharded-error-detail') || row.dataset.loaded) return;
+                row.dataset.loaded = 'true';
+                load('errors', parseInt(row.dataset.errorChunk)).then(function(items) {
+                    var property = items.find(function(item) { return item.property === row.dataset.detailFor; });
+                    row.querySelector('.sharded-error-content').innerHTML = property ? renderErrors(property.errors) : '';
+                });
+            });
+
+            document.addEventListener('DOMContentLoaded', function() {
+                if (section('screenshots').chunks > 0) {
+                    showScreenshots(0);
+                }
+            });
+
+            return {
+                receive: receive,
+                load: load,
+                loadAll: loadAll,
+                showEvents: showEvents,
+                gotoScreenshot: gotoScreenshot
+            };
+        })();
@@ -1,5 +1,11 @@
-from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import tempfile
+import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
 
 @contextmanager
 def thread_pool(max_workers=128, wait=True, name_prefix="worker"):
@@ -7,4 +13,116 @@ def thread_pool(max_workers=128, wait=True, name_prefix="worker"):
     try:
         yield executor
     finally:
-        executor.shutdown(wait=wait)
\ No newline at end of file
+        executor.shutdown(wait=wait)
+
+
+def available_cpus() -> int:
+    """The number of cores this process may run on"""
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+
+
+@contextmanager
+def process_pool(max_workers=None, wait=True, initializer=None):
+    """Process pool for the CPU-bound work. One worker per available core by default."""
+    if max_workers is None:
+        max_workers = available_cpus()
+    executor = ProcessPoolExecutor(max_workers=max_workers, initializer=initializer)
+    try:
+        yield executor
+    finally:
+        executor.shutdown(wait=wait)
+
+
+def read_lines_reversed(path: Path, block_size: int = 1 << 16) -> Iterator[bytes]:
+    """
+    Yield the lines of a file from the last one, reading the file backwards by blocks.
+    Only the tail of a large log is read when the caller stops early (e.g. at the last line).
+    The line ends are stripped, and a trailing line end yields an empty line first.
+    """
+    with open(path, "rb") as f:
+        position = f.seek(0, os.SEEK_END)
+        tail = b""
+        while position > 0:
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            lines = (f.read(size) + tail).split(b"\n")
+            # the first line may start in the previous block
+            tail = lines.pop(0)
+            yield from reversed(lines)
+        yield tail
+
+
+class SpillList:
+    """
+    Append-only list of json-serializable items spilled to a json lines file.
+
+    The memory stays flat however many items are appended. Iterating reads the items back from disk.
+    By default the file is temporary. When `path` is given the file is kept, and the items
+    already in it are resumed: the file is truncated to `size` bytes holding `length` items.
+    """
+
+    def __init__(self, items: Iterable[Any] = (), path: Optional[Path] = None, size: int = 0, length: int = 0):
+        self._temporary = path is None
+        if self._temporary:
+            fd, self.path = tempfile.mkstemp(prefix="kea2_", suffix=".jsonl")
+            self._fp = open(fd, "wb")
+            self._len = 0
+        else:
+            self.path = str(path)
+            self._fp = open(self.path, "ab")
+            self._fp.truncate(size)
+            self._fp.seek(size)
+            self._len = length
+        self._finalizer = weakref.finalize(self, SpillList._cleanup, self._fp, self.path, self._temporary)
+        for item in items:
+            self.append(item)
+
+    def append(self, item: Any):
+        self._fp.write(json.dumps(item).encode("utf-8") + b"\n")
+        self._len += 1
+
+    def tell(self) -> Tuple[int, int]:
+        """The (size, length) to resume the list from"""
+        return self._fp.tell(), self._len
+
+    def filter(self, predicate: Callable[[Any], bool]):
+        """Keep only the items satisfying predicate"""
+        part = self.path + ".part"
+        length = 0
+        with open(part, "wb") as fp:
+            for item in self:
+                if predicate(item):
+                    fp.write(json.dumps(item).encode("utf-8") + b"\n")
+                    length += 1
+        self._fp.close()
+        os.replace(part, self.path)
+        self._fp = open(self.path, "ab")
+        self._len = length
+        self._finalizer.detach()
+        self._finalizer = weakref.finalize(self, SpillList._cleanup, self._fp, self.path, self._temporary)
+
+    def __len__(self):
+        return self._len
+
+    def __bool__(self):
+        return self._len > 0
+
+    def __iter__(self) -> Iterator[Any]:
+        self._fp.flush()
+        with open(self.path, "rb") as fp:
+            for line in fp:
+                yield json.loads(line)
+
+    def close(self):
+        self._finalizer()
+
+    @staticmethod
+    def _cleanup(fp, path, temporary):
+        fp.close()
+        if not temporary:
+            return
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -1,25 +1,163 @@
+import os
+import queue
+import shutil
+import stat
+import tarfile
 import threading
 
-from pathlib import Path
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from time import perf_counter
 
 from .adbUtils import ADBDevice
 from .utils import getLogger, catchException, timer
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Set, Tuple
 if TYPE_CHECKING:
     from .keaUtils import Options
 
 logger = getLogger(__name__)
 
 
+# The logs written by fastbot are append-only. Only the new bytes are pulled in incremental mode.
+APPEND_ONLY_LOGS = ("steps.log", "coverage.log", "crash-dump.log")
+SCREENSHOTS_DIR = "screenshots"
+# Keep the `rm` command line below the shell argument limit of old devices
+RM_BATCH_SIZE = 200
+ARCHIVE_BATCH_SIZE = 200
+
+
+@dataclass
+class SyncStats:
+    """Statistic of a single sync."""
+    files: int = 0
+    bytes: int = 0
+    cost: float = 0.0
+
+
+@dataclass
+class DeviceUsage:
+    """Usage of the device output dir probed by the adaptive sync scheduler."""
+    # bytes of the device output dir
+    size: int
+    # screenshots waiting on device
+    files: int
+    # free bytes of the device output root
+    free: int
+
+
+class SyncScheduler:
+    """
+    Decide when to sync under `--sync-policy adaptive`.
+
+    The device usage is probed every profile period. A sync is fired when the data grown
+    since the last sync exceeds the byte or file threshold, when the free space on the
+    device drops below the limit, or when nothing has been synced for MAX_PERIOD_FACTOR
+    profile periods (so that the host data doesn't get too stale).
+    """
+
+    MAX_PERIOD_FACTOR = 10
+
+    def __init__(self, options: "Options"):
+        self.bytes_threshold = options.sync_threshold_mb * 2**20
+        self.files_threshold = options.sync_threshold_files
+        self.min_free = options.sync_min_free_mb * 2**20
+        self.max_period = options.profile_period * self.MAX_PERIOD_FACTOR
+        self.baseline = 0
+        self.last_sync_step = 0
+
+    def decide(self, steps_count: int, usage: DeviceUsage) -> Optional[str]:
+        """Return the reason to sync, or None to skip this sync point."""
+        grown = usage.size - self.baseline
+        if grown >= self.bytes_threshold:
+            reason = f"bytes threshold ({grown} >= {self.bytes_threshold})"
+        elif usage.files >= self.files_threshold:
+            reason = f"files threshold ({usage.files} >= {self.files_threshold})"
+        elif usage.free < self.min_free:
+            reason = f"low free space ({usage.free} < {self.min_free})"
+        elif steps_count - self.last_sync_step >= self.max_period:
+            reason = f"max period ({steps_count - self.last_sync_step} steps)"
+        else:
+            reason = None
+
+        logger.debug(
+            f"[SyncScheduler] step {steps_count}: grown {grown} bytes, {usage.files} files, "
+            f"free {usage.free} bytes -> {'sync: ' + reason if reason else 'skip'}"
+        )
+        return reason
+
+    def on_synced(self, steps_count: int, usage: DeviceUsage):
+        self.baseline = usage.size
+        self.last_sync_step = steps_count
+
+
+class SyncProgress:
+    """
+    Progress of the final sync. It lets the report generator parse the logs and mark
+    the screenshots while the remaining screenshots are still being pulled.
+    """
+
+    def __init__(self):
+        self.logs_synced = threading.Event()
+        self.done = threading.Event()
+        self._landed: "queue.Queue[Optional[str]]" = queue.Queue()
+
+    def land(self, screenshot_name: str):
+        self._landed.put(screenshot_name)
+
+    def finish(self):
+        self.logs_synced.set()
+        self.done.set()
+        self._landed.put(None)
+
+    def iter_landed(self) -> Iterator[str]:
+        """Yield the names of the screenshots landed on host until the final sync is done."""
+        while True:
+            name = self._landed.get()
+            if name is None:
+                return
+            yield name
+
+
+class _CountingReader:
+    """File-like wrapper counting the bytes read from the underlying stream."""
+    def __init__(self, fp):
+        self.fp = fp
+        self.count = 0
+
+    def read(self, size=-1) -> bytes:
+        data = self.fp.read(size)
+        self.count += len(data)
+        return data
+
+
 class ResultSyncer:
 
     def __init__(self, device_output_dir, options: "Options"):
         self.device_output_dir = device_output_dir
         self.output_dir = options.output_dir / Path(device_output_dir).name
+        self.sync_mode = options.sync_mode
+        self.sync_compress = options.sync_compress
+        self.profile_period = options.profile_period
+        self.scheduler = SyncScheduler(options) if options.sync_policy == "adaptive" else None
         self.running = False
         self.thread = None
         self.sync_event = threading.Event()
+        # cleared while a property is running on the same adb transport
+        self.idle = threading.Event()
+        self.idle.set()
+        self.steps_count = 0
+        self._sync_lock = threading.Lock()
+        self.progress: Optional[SyncProgress] = None
+        self._close_thread: Optional[threading.Thread] = None
+
+        # remote relative path -> bytes already pulled (incremental mode)
+        self.manifest: Dict[str, int] = dict()
+        # screenshots pulled but not yet removed from device
+        self._pulled_screenshots: Set[str] = set()
+        self.total_bytes = 0
+        self.sync_count = 0
 
         ADBDevice.setDevice(serial=options.serial, transport_id=options.transport_id)
         self.dev = ADBDevice()
@@ -30,22 +168,83 @@ class ResultSyncer:
         self.thread = threading.Thread(target=self._sync_thread, daemon=True)
         self.thread.start()
 
+    def trigger(self, steps_count: int):
+        """Called by the runner after each monkey step. Fire a sync point every profile period."""
+        if not self.profile_period or steps_count % self.profile_period != 0:
+            return
+        self.steps_count = steps_count
+        self.sync_event.set()
+
+    @contextmanager
+    def hold(self):
+        """Postpone the syncs while the main loop is using the adb transport (e.g. running a property)."""
+        self.idle.clear()
+        try:
+            yield
+        finally:
+            self.idle.set()
+
     def _sync_thread(self):
         """Thread function that waits for sync event and then syncs data"""
         while self.running:
             # Wait for sync event with a timeout to periodically check if still running
             if self.sync_event.wait(timeout=1):
-                self._sync_device_data()
+                while self.running and not self.idle.wait(timeout=1):
+                    pass
+                if self.scheduler is None:
+                    self._sync_device_data()
+                else:
+                    self._schedule_sync(self.steps_count)
                 self.sync_event.clear()
 
+    @catchException("Error during adaptive sync scheduling.")
+    def _schedule_sync(self, steps_count: int):
+        if not self.scheduler.decide(steps_count, self._probe_device_usage()):
+            return
+        self._sync_device_data()
+        self.scheduler.on_synced(steps_count, self._probe_device_usage())
+
+    def _probe_device_usage(self) -> DeviceUsage:
+        """Probe the size and screenshot count of the device output dir and the free space with one shell call"""
+        root = PurePosixPath(self.device_output_dir).parent
+        output = self.dev.shell(
+            f"du -sk {self.device_output_dir}; "
+            f"ls {self.device_output_dir}/{SCREENSHOTS_DIR} 2>/dev/null | wc -l; "
+            f"df -k {root} | tail -n 1"
+        )
+        du_line, files_line, df_line = output.splitlines()[-3:]
+        return DeviceUsage(
+            size=int(du_line.split()[0]) * 1024,
+            files=int(files_line.strip()),
+            free=int(df_line.split()[3]) * 1024,
+        )
+
+    def close_async(self) -> SyncProgress:
+        """Run close() in a background thread. Return the progress of the final sync."""
+        self.progress = SyncProgress()
+        self._close_thread = threading.Thread(target=self.close, daemon=True)
+        self._close_thread.start()
+        return self.progress
+
+    def join(self):
+        """Wait for close_async() to finish (including the device cleanup)."""
+        if self._close_thread:
+            self._close_thread.join()
+
     @timer("Data Sync cost %cost_time seconds")
     def close(self):
+        if self.progress is None:
+            self.progress = SyncProgress()
         self.running = False
         self.sync_event.set()
-        if self.thread and self.thread.is_alive():
-            logger.info("Syncing result data from device. Please wait...")
-            self.thread.join(timeout=10)
-        self._sync_device_data()
+        try:
+            if self.thread and self.thread.is_alive():
+                logger.info("Syncing result data from device. Please wait...")
+                self.thread.join(timeout=10)
+            self._sync_device_data()
+        finally:
+            self.progress.finish()
+        logger.info(f"Synced {self.total_bytes} bytes from device in {self.sync_count} syncs.")
         try:
             logger.debug(f"Removing device output directory: {self.device_output_dir}")
             remove_device_dir = ["rm", "-rf", self.device_output_dir]
@@ -53,13 +252,161 @@ class ResultSyncer:
         except Exception as e:
             logger.error(f"Error removing device output directory: {e}", flush=True)
 
-    @catchException("Error during device data sync.")    
+    @catchException("Error during device data sync.")
     def _sync_device_data(self):
         """
         Sync the device data to the local directory.
         """
-        logger.debug("Syncing data")
-        self.dev.sync.pull_dir(self.device_output_dir, self.output_dir, exist_ok=True)
+        logger.debug(f"Syncing data ({self.sync_mode})")
+        with self._sync_lock:
+            start = perf_counter()
+            if self.sync_mode in ("incremental", "archive"):
+                stats = self._sync_incremental()
+            else:
+                stats = self._sync_full()
+            stats.cost = perf_counter() - start
+
+            self.sync_count += 1
+            self.total_bytes += stats.bytes
+        logger.debug(f"Synced {stats.files} files, {stats.bytes} bytes in {stats.cost:.3f}s")
+        return stats
+
+    def _sync_full(self) -> SyncStats:
+        """Pull the whole device output directory and remove the pulled screenshots."""
+        size = self.dev.sync.pull_dir(self.device_output_dir, self.output_dir, exist_ok=True)
 
         remove_pulled_screenshots = ["find", self.device_output_dir, "-name", '"*.png"', "-delete"]
         self.dev.shell(remove_pulled_screenshots)
+        return SyncStats(bytes=size)
+
+    def _sync_incremental(self) -> SyncStats:
+        """Only pull the new screenshots and the new bytes of the append-only logs.
+        In archive mode, the new screenshots are streamed as tar archives.
+
+        The logs are synced before the screenshots so that the host always sees
+        the steps that refer to the pulled screenshots.
+        """
+        stats = SyncStats()
+        new_screenshots: List[str] = list()
+
+        for rel_path, size in self._iter_remote_files(self.device_output_dir):
+            if rel_path.startswith(SCREENSHOTS_DIR + "/"):
+                if rel_path not in self._pulled_screenshots:
+                    new_screenshots.append(rel_path)
+                continue
+
+            remote = f"{self.device_output_dir}/{rel_path}"
+            local = self.output_dir / rel_path
+            local.parent.mkdir(parents=True, exist_ok=True)
+
+            offset = self.manifest.get(rel_path, 0)
+            if size == offset:
+                continue
+            if rel_path in APPEND_ONLY_LOGS and offset < size and local.exists():
+                pulled = self._pull_tail(remote, local, offset)
+            else:
+                pulled = self.dev.sync.pull_file(remote, local)
+                offset = 0
+            self.manifest[rel_path] = offset + pulled
+            stats.bytes += pulled
+            stats.files += 1
+
+        if self.progress:
+            self.progress.logs_synced.set()
+
+        if new_screenshots:
+            (self.output_dir / SCREENSHOTS_DIR).mkdir(parents=True, exist_ok=True)
+        if self.sync_mode == "archive":
+            pulled_screenshots = self._pull_archive(new_screenshots, stats)
+        else:
+            pulled_screenshots = self._pull_files(new_screenshots, stats)
+        self._pulled_screenshots.update(pulled_screenshots)
+        self._remove_device_screenshots(pulled_screenshots)
+        return stats
+
+    def _pull_files(self, rel_paths: List[str], stats: SyncStats) -> List[str]:
+        """Pull the files one by one through the adb sync protocol."""
+        for rel_path in rel_paths:
+            local = self.output_dir / rel_path
+            part = local.with_name(local.name + ".part")
+            stats.bytes += self.dev.sync.pull_file(f"{self.device_output_dir}/{rel_path}", part)
+            stats.files += 1
+            self._land(part, local)
+        return rel_paths
+
+    def _land(self, part: Path, local: Path):
+        """Atomically move a pulled file into place so that the readers never see a partial screenshot."""
+        os.replace(part, local)
+        if self.progress:
+            self.progress.land(local.name)
+
+    def _pull_archive(self, rel_paths: List[str], stats: SyncStats) -> List[str]:
+        """Stream the files as tar archives through exec-out and unpack them on the fly.
+
+        Returns:
+            List[str]: the files actually received, which are safe to be removed from device.
+        """
+        received = list()
+        mode = "r|gz" if self.sync_compress else "r|"
+        tar_flags = "-czf" if self.sync_compress else "-cf"
+        for i in range(0, len(rel_paths), ARCHIVE_BATCH_SIZE):
+            batch = rel_paths[i:i + ARCHIVE_BATCH_SIZE]
+            expected = set(batch)
+            cmd = f"tar {tar_flags} - -C {self.device_output_dir} " + " ".join(batch)
+            with self._exec_out(cmd) as c, c.conn.makefile("rb") as raw:
+                stream = _CountingReader(raw)
+                with tarfile.open(fileobj=stream, mode=mode) as tar:
+                    for member in tar:
+                        # never trust the paths in the archive
+                        if not member.isfile() or member.name not in expected:
+                            continue
+                        src = tar.extractfile(member)
+                        local = self.output_dir / member.name
+                        part = local.with_name(local.name + ".part")
+                        with open(part, "wb") as fp:
+                            shutil.copyfileobj(src, fp)
+                        self._land(part, local)
+                        stats.files += 1
+                        received.append(member.name)
+                stats.bytes += stream.count
+        return received
+
+    @contextmanager
+    def _exec_out(self, cmd: str):
+        """Run cmd on device and yield the connection streaming its raw stdout (adb exec-out)."""
+        with self.dev.open_transport() as c:
+            c.send_command(f"exec:{cmd}")
+            c.check_okay()
+            yield c
+
+    def _iter_remote_files(self, remote_dir: str, prefix: str = "") -> Iterator[Tuple[str, int]]:
+        """Recursively list the regular files under remote_dir as (relative path, size)"""
+        for f in self.dev.sync.iter_directory(remote_dir):
+            if f.path in (".", ".."):
+                continue
+            rel_path = f"{prefix}{f.path}"
+            if stat.S_ISDIR(f.mode):
+                yield from self._iter_remote_files(f"{remote_dir}/{f.path}", prefix=f"{rel_path}/")
+            elif stat.S_ISREG(f.mode):
+                yield rel_path, f.size
+
+    def _pull_tail(self, remote: str, local: Path, offset: int) -> int:
+        """Append the bytes of remote after offset to local. Return the number of bytes pulled."""
+        # tail -c +N is 1-indexed
+        size = 0
+        with self._exec_out(f"tail -c +{offset + 1} {remote}") as c, open(local, "r+b") as fp:
+            fp.truncate(offset)
+            fp.seek(offset)
+            while True:
+                chunk = c.read(65536)
+                if not chunk:
+                    break
+                fp.write(chunk)
+                size += len(chunk)
+        return size
+
+    def _remove_device_screenshots(self, rel_paths: List[str]):
+        for i in range(0, len(rel_paths), RM_BATCH_SIZE):
+            batch = rel_paths[i:i + RM_BATCH_SIZE]
+            self.dev.shell(["rm", "-f"] + [f"{self.device_output_dir}/{p}" for p in batch])
+            self._pulled_screenshots.difference_update(batch)
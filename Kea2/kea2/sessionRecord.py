@@ -0,0 +1,252 @@
+import gzip
+import hashlib
+import io
+import json
+import unittest
+import zlib
+from contextlib import redirect_stdout
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .stepTimer import StepTimer
+from .utils import getLogger
+
+
+logger = getLogger(__name__)
+
+SESSION_VERSION = 1
+# the phases of a step replayed offline
+REPLAYED_PHASES = ("block", "parse", "occlusion", "preconds")
+
+
+def session_file(output_dir: Path, stamp: str) -> Path:
+    return Path(output_dir) / f"session_{stamp}.jsonl.gz"
+
+
+class SessionRecorder:
+    """
+    The session archive of `kea2 run --record`: a gzipped json lines file with, for every step of
+    KeaTestRunner, the hierarchy returned by stepMonkey or dumpHierarchy, the block lists sent with
+    stepMonkey, the properties satisfied, the property selected and the time of the phases of the step.
+
+    A hierarchy is written once, the steps showing it again refer to its id.
+    """
+
+    def __init__(self, path: Path, header: Dict):
+        self.path = Path(path)
+        self._fp = gzip.open(self.path, "wt", encoding="utf-8", compresslevel=6)
+        self._hierarchies: Dict[bytes, int] = dict()
+        self._pending: Optional[Dict] = None
+        self.steps = 0
+        self._write({"type": "header", "version": SESSION_VERSION, **header})
+
+    def _write(self, record: Dict):
+        self._fp.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def _hierarchy_id(self, xml: str) -> int:
+        digest = hashlib.blake2b(xml.encode("utf-8"), digest_size=16).digest()
+        hierarchy_id = self._hierarchies.get(digest)
+        if hierarchy_id is None:
+            hierarchy_id = self._hierarchies[digest] = len(self._hierarchies)
+            self._write({"type": "hierarchy", "id": hierarchy_id, "xml": xml})
+        return hierarchy_id
+
+    def begin(self, steps_count: int, source: str, xml: str, block: Optional[Dict], satisfied: List[str],
+              timings: Dict[str, float]):
+        """
+        Start the record of a step. It is written when the next step begins, with the property
+        selected meanwhile and the timings completed by then.
+        """
+        self._flush()
+        self._pending = {
+            "type": "step",
+            "step": steps_count,
+            "source": source,
+            "hierarchy": self._hierarchy_id(xml),
+            "block": block,
+            "satisfied": satisfied,
+            "selected": None,
+            "timings": timings,
+        }
+
+    def select(self, prop_name: str):
+        if self._pending is not None:
+            self._pending["selected"] = prop_name
+
+    def _flush(self):
+        if self._pending is None:
+            return
+        self._pending["timings"] = {name: round(seconds, 6) for name, seconds in self._pending["timings"].items()}
+        self._write(self._pending)
+        self._pending = None
+        self.steps += 1
+
+    def close(self):
+        self._flush()
+        self._fp.close()
+        logger.info(f"Recorded {self.steps} steps ({len(self._hierarchies)} distinct hierarchies) to {self.path}")
+
+
+@dataclass
+class SessionStep:
+    step: int
+    source: str  # stepMonkey, dumpHierarchy
+    hierarchy: str
+    block: Optional[Dict[str, List[str]]]
+    satisfied: List[str]
+    selected: Optional[str]
+    timings: Dict[str, float]
+
+
+def read_session(path: Path) -> Tuple[Dict, Iterator[SessionStep]]:
+    """The header of a session archive and its steps. An archive cut by the end of a run is read up to the cut."""
+    fp = gzip.open(path, "rt", encoding="utf-8")
+    try:
+        header = json.loads(fp.readline())
+    except Exception:
+        fp.close()
+        raise
+    if header.get("type") != "header":
+        fp.close()
+        raise ValueError(f"{path} is not a kea2 session archive")
+
+    def steps():
+        hierarchies: Dict[int, str] = dict()
+        with fp:
+            try:
+                for line in fp:
+                    record = json.loads(line)
+                    if record["type"] == "hierarchy":
+                        hierarchies[record["id"]] = record["xml"]
+                    elif record["type"] == "step":
+                        record.pop("type")
+                        record["hierarchy"] = hierarchies[record["hierarchy"]]
+                        yield SessionStep(**record)
+            except (EOFError, zlib.error, json.JSONDecodeError) as e:
+                logger.warning(f"{path} is truncated ({e}), replaying the steps before.")
+
+    return header, steps()
+
+
+@dataclass
+class ReplayReport:
+    steps: int = 0
+    # the steps whose satisfied properties (or block lists) differ from the recorded ones
+    mismatches: List[Dict] = field(default_factory=list)
+    block_mismatches: List[Dict] = field(default_factory=list)
+    # phase -> seconds, for the steps replayed
+    recorded: Dict[str, float] = field(default_factory=dict)
+    replayed: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def deltas(self) -> Dict[str, Optional[float]]:
+        """phase -> the replayed time relative to the recorded time, in percent"""
+        return {
+            phase: round((self.replayed.get(phase, 0.0) - recorded) / recorded * 100, 1) if recorded else None
+            for phase, recorded in self.recorded.items()
+        }
+
+    def to_dict(self) -> Dict:
+        report = asdict(self)
+        report["deltas"] = self.deltas
+        return report
+
+    def print_summary(self):
+        print(f"[INFO] Replayed {self.steps} steps: {len(self.mismatches)} with other properties satisfied, "
+              f"{len(self.block_mismatches)} with other block lists.", flush=True)
+        for mismatch in self.mismatches[:10]:
+            print(f"  step {mismatch['step']} ({mismatch['source']}): missing {mismatch['missing']}, "
+                  f"unexpected {mismatch['unexpected']}", flush=True)
+        rows = [("PHASE", "RECORDED", "REPLAYED", "DELTA")]
+        for phase, delta in self.deltas.items():
+            rows.append((phase, f"{self.recorded[phase] * 1000:.1f}ms", f"{self.replayed.get(phase, 0.0) * 1000:.1f}ms",
+                         "-" if delta is None else f"{delta:+.1f}%"))
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        for row in rows:
+            print("  " + "  ".join(cell.ljust(width) for cell, width in zip(row, widths)), flush=True)
+
+
+class _ReplayResult:
+    """The executions of the properties selected in the session, for the max_tries of getValidProperties"""
+
+    def __init__(self):
+        self.executed: Dict[str, int] = dict()
+
+    def getExcuted(self, test) -> int:
+        from .keaUtils import getFullPropName
+        return self.executed.get(getFullPropName(test), 0)
+
+
+class _ReplayDriver:
+    """The driver of the replay: the preconditions of the block widget functions are checked on the hierarchy"""
+
+    @classmethod
+    def getScriptDriver(cls, mode="proxy"):
+        from .u2Driver import U2Driver
+        return U2Driver.getStaticChecker()
+
+
+def replay_session(path: Path, suite: unittest.TestSuite) -> ReplayReport:
+    """
+    Feed the steps of a session archive through _getBlockedWidgets, getValidProperties and
+    U2StaticChecker offline, checking that the same properties are satisfied.
+
+    The block widget functions are run on the hierarchy before the step, the screen they were
+    run on during the session. Their preconditions are checked on the hierarchy, not on a device.
+    """
+    from .keaUtils import KeaTestRunner, getFullPropName
+    from .u2Driver import U2Driver, U2StaticChecker
+
+    header, steps = read_session(path)
+    runner = KeaTestRunner(stream=io.StringIO())
+    runner.options = SimpleNamespace(driverName=header.get("driverName") or "d", Driver=_ReplayDriver)
+    runner.allProperties = dict()
+    with redirect_stdout(io.StringIO()):
+        runner.collectAllProperties(suite)
+    missing = set(header.get("properties", [])) - {getFullPropName(t) for t in runner.allProperties.values()}
+    if missing:
+        logger.warning(f"Properties of the session not in the suite: {', '.join(sorted(missing))}")
+
+    report = ReplayReport(recorded=dict.fromkeys(REPLAYED_PHASES, 0.0), replayed=dict.fromkeys(REPLAYED_PHASES, 0.0))
+    result = _ReplayResult()
+    timer = StepTimer(summary_period=float("inf"))
+    saved_checker = U2Driver.staticChecker
+    U2Driver.staticChecker = U2StaticChecker(offline=True)
+    previous: Optional[str] = None
+    timer.activate()
+    try:
+        with redirect_stdout(io.StringIO()):
+            for step in steps:
+                report.steps += 1
+                timer.start_step(step.step)
+                # the block widget functions run on the hierarchy left in the static checker by the
+                # previous step, unknown before the first step
+                if step.block is not None and previous is not None:
+                    with timer.phase("block"):
+                        block = runner._getBlockedWidgets()
+                    report.recorded["block"] += step.timings.get("block", 0.0)
+                    if any(set(block[kind]) != set(step.block.get(kind, [])) for kind in ("widgets", "trees")):
+                        report.block_mismatches.append({"step": step.step, "recorded": step.block, "replayed": block})
+
+                with timer.phase("preconds"):
+                    satisfied = runner.getValidProperties(step.hierarchy, result)
+                for phase in ("parse", "occlusion", "preconds"):
+                    report.recorded[phase] += step.timings.get(phase, 0.0)
+                names = {getFullPropName(test) for test in satisfied.values()}
+                if names != set(step.satisfied):
+                    report.mismatches.append({
+                        "step": step.step, "source": step.source,
+                        "missing": sorted(set(step.satisfied) - names), "unexpected": sorted(names - set(step.satisfied)),
+                    })
+                if step.selected:
+                    result.executed[step.selected] = result.executed.get(step.selected, 0) + 1
+                previous = step.hierarchy
+    finally:
+        timer.finish(report.steps)
+        U2Driver.staticChecker = saved_checker
+    for phase, histogram in timer.histograms.items():
+        if phase in report.replayed:
+            report.replayed[phase] = histogram.total
+    return report
@@ -0,0 +1,653 @@
+import gc
+import io
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import unittest
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from time import perf_counter, sleep
+from typing import IO, Dict, Iterator, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import quoteattr
+
+import adbutils
+from adbutils import FileInfo, adb
+
+from .utils import getLogger
+
+
+logger = getLogger(__name__)
+
+# the agent port of kea2 (fastbot, proxying uiautomator2) and the port of the uiautomator2 server
+AGENT_PORT = 8090
+U2_PORT = 9008
+SIMULATOR_SERIAL = "kea2-simulator"
+BENCH_PACKAGE = "com.kea2.bench"
+# the uiautomator2 jsonrpc methods moving the simulated app to its next screen
+ACTION_METHODS = {"click", "longClick", "swipe", "swipePoints", "drag", "pressKey", "pressKeyCode", "setText", "clearTextField"}
+# uiautomator2 selector fields -> hierarchy attributes
+SELECTOR_ATTRIBUTES = {"text": "text", "resourceId": "resource-id", "description": "content-desc", "className": "class"}
+
+
+@dataclass
+class Screen:
+    activity: str
+    hierarchy: str
+
+
+def synthetic_screens(package: str, count: int = 5) -> List[Screen]:
+    """`count` screens of a fake app, one activity each, with a title, two buttons and an input"""
+    screens = []
+    for i in range(count):
+        nodes = [
+            ("android.widget.TextView", f"{package}:id/title", f"Screen {i}", (0, 0, 1080, 200), "false"),
+            ("android.widget.Button", f"{package}:id/next", "Next", (0, 200, 540, 400), "true"),
+            ("android.widget.Button", f"{package}:id/back", "Back", (540, 200, 1080, 400), "true"),
+            ("android.widget.EditText", f"{package}:id/input", "", (0, 400, 1080, 600), "true"),
+        ]
+        children = "".join(
+            f'<node index="{index}" text={quoteattr(text)} resource-id="{rid}" class="{cls}" package="{package}" '
+            f'content-desc="" checkable="false" checked="false" clickable="{clickable}" enabled="true" '
+            f'focusable="{clickable}" focused="false" scrollable="false" long-clickable="false" password="false" '
+            f'selected="false" bounds="[{left},{top}][{right},{bottom}]" />'
+            for index, (cls, rid, text, (left, top, right, bottom), clickable) in enumerate(nodes)
+        )
+        hierarchy = (
+            "<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>"
+            '<hierarchy rotation="0">'
+            f'<node index="0" text="" resource-id="" class="android.widget.FrameLayout" package="{package}" '
+            'content-desc="" checkable="false" checked="false" clickable="false" enabled="true" focusable="false" '
+            'focused="false" scrollable="false" long-clickable="false" password="false" selected="false" '
+            f'bounds="[0,0][1080,2400]">{children}</node></hierarchy>'
+        )
+        screens.append(Screen(f"{package}.Screen{i}Activity", hierarchy))
+    return screens
+
+
+def load_screens(hierarchies_dir: Path, package: str) -> List[Screen]:
+    """
+    The recorded hierarchies (*.xml) of a directory, in name order. The activity of a screen is the
+    file name (`com.example.MainActivity.xml`, or `MainActivity.xml` in the package under test).
+    """
+    screens = []
+    for path in sorted(Path(hierarchies_dir).glob("*.xml")):
+        activity = path.stem if "." in path.stem else f"{package}.{path.stem}"
+        screens.append(Screen(activity, path.read_text(encoding="utf-8")))
+    if not screens:
+        raise ValueError(f"No recorded hierarchy (*.xml) in {hierarchies_dir}")
+    return screens
+
+
+def _percentile(values: Sequence[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def latency_summary(values: Sequence[float]) -> Dict[str, float]:
+    """count, mean, p50, p95 and max of latencies in seconds, in ms"""
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(_percentile(values, 0.5) * 1000, 3),
+        "p95_ms": round(_percentile(values, 0.95) * 1000, 3),
+        "max_ms": round(max(values, default=0.0) * 1000, 3),
+    }
+
+
+class _AgentHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def _handle(self, method: str):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        status, content, content_type = self.server.agent.handle(method, self.path, json.loads(body) if body else None)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class FakeAgent:
+    """
+    A local stand-in for the kea2 agent (fastbot with --agent-u2) running on the device.
+
+    It answers the requests of FastbotManager (/ping, /init, /stepMonkey, /dumpHierarchy, /logScript,
+    /sendInfo, /stopMonkey) and the uiautomator2 jsonrpc calls it proxies, replaying the screens in
+    turn: every monkey step (and every action of a property) moves to the next screen. Like fastbot, it writes steps.log and coverage.log
+    (every profile period) in the output dir of the device, a local directory (see FakeADBDevice).
+
+    The latency of the device is simulated by sleeping in /stepMonkey and /dumpHierarchy.
+    The time spent in every request and the time the host spends between two steps are recorded.
+    """
+
+    def __init__(self, device_root: Path, screens: Sequence[Screen], step_latency: float = 0.0,
+                 dump_latency: float = 0.0, profile_period: int = 25):
+        """
+        Args:
+            device_root: the local directory standing for the device file system
+            step_latency, dump_latency: the seconds /stepMonkey and /dumpHierarchy take on the device
+        """
+        self.device_root = Path(device_root)
+        self.screens = list(screens)
+        self.step_latency = step_latency
+        self.dump_latency = dump_latency
+        self.profile_period = max(1, profile_period)
+        self.stopped = threading.Event()
+        self.output_dir: Optional[Path] = None
+        self.take_screenshots = False
+        self.steps = 0
+        self._screen = 0
+        self.visits: Dict[str, int] = dict()
+        # path -> the seconds spent in the requests
+        self.latencies: Dict[str, List[float]] = dict()
+        # the seconds between the response of a step (or a dump) and the next step request
+        self.host_latencies: List[float] = list()
+        # the seconds between the start and the end of the properties executed (/logScript)
+        self.property_latencies: List[float] = list()
+        self._property_start: Optional[float] = None
+        self.first_step: Optional[float] = None
+        self.stop_time: Optional[float] = None
+        self._last_response: Optional[float] = None
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @property
+    def screen(self) -> Screen:
+        return self.screens[self._screen % len(self.screens)]
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _AgentHandler)
+        self._server.daemon_threads = True
+        self._server.agent = self
+        threading.Thread(target=self._server.serve_forever, name="kea2-fake-agent", daemon=True).start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def handle(self, method: str, path: str, data) -> Tuple[int, bytes, str]:
+        start = perf_counter()
+        path = path.split("?")[0]
+        if path == "/stepMonkey" and self._last_response is not None:
+            self.host_latencies.append(start - self._last_response)
+        try:
+            with self._lock:
+                result = self._dispatch(method, path, data)
+        except Exception as e:
+            logger.error(f"Fake agent: {method} {path} failed: {e}")
+            return 500, str(e).encode("utf-8"), "text/plain"
+        if result is None:
+            return 404, b"Not Found", "text/plain"
+        end = perf_counter()
+        self.latencies.setdefault(path, []).append(end - start)
+        if path in ("/stepMonkey", "/dumpHierarchy"):
+            self._last_response = end
+        if isinstance(result, str):
+            return 200, result.encode("utf-8"), "text/plain"
+        return 200, json.dumps(result).encode("utf-8"), "application/json"
+
+    def _dispatch(self, method: str, path: str, data):
+        if path == "/ping":
+            return "pong"
+        if path == "/init":
+            return self._init(data)
+        if path == "/stepMonkey":
+            return self._step(data or {})
+        if path == "/dumpHierarchy":
+            sleep(self.dump_latency)
+            return {"result": self.screen.hierarchy}
+        if path == "/logScript":
+            if data["state"] == "start":
+                self._property_start = perf_counter()
+            elif self._property_start is not None:
+                self.property_latencies.append(perf_counter() - self._property_start)
+                self._property_start = None
+            self._log_step("ScriptInfo", json.dumps({"propName": data["propName"], "state": data["state"]}),
+                           data.get("startStepsCount", self.steps))
+            return "OK"
+        if path == "/sendInfo":
+            self._log_step("Monkey", data if isinstance(data, str) else json.dumps(data))
+            return "OK"
+        if path == "/stopMonkey":
+            self.stopped.set()
+            self.stop_time = perf_counter()
+            return "Monkey stopped."
+        if path.startswith("/jsonrpc/"):
+            return self._jsonrpc(data or {})
+        return None
+
+    def _init(self, data) -> str:
+        remote = f"{data['deviceOutputRoot'].rstrip('/')}/output_{data['logStamp']}"
+        self.output_dir = self.device_root / remote.lstrip("/")
+        (self.output_dir / "screenshots").mkdir(parents=True, exist_ok=True)
+        self.take_screenshots = bool(data.get("takeScreenshots"))
+        return f"outputDir:{remote}"
+
+    def _step(self, data) -> Dict:
+        if self.first_step is None:
+            self.first_step = perf_counter()
+        sleep(self.step_latency)
+        self.steps += 1
+        screen = self._next_screen()
+        screenshot = ""
+        if self.take_screenshots:
+            screenshot = f"screenshot-{self.steps}-0.png"
+            (self.output_dir / "screenshots" / screenshot).write_bytes(_blank_png())
+        self._log_step("Monkey", json.dumps({"act": "CLICK", "pos": [0, 200, 540, 400]}), screenshot=screenshot)
+        if self.steps % self.profile_period == 0:
+            self._log_coverage()
+        return {"result": screen.hierarchy}
+
+    def _next_screen(self) -> Screen:
+        self._screen += 1
+        screen = self.screen
+        self.visits[screen.activity] = self.visits.get(screen.activity, 0) + 1
+        return screen
+
+    def _log_step(self, type_: str, info: str, steps: Optional[int] = None, screenshot: str = ""):
+        if self.output_dir is None:
+            return
+        step = {
+            "Type": type_,
+            "MonkeyStepsCount": self.steps if steps is None else steps,
+            "Time": datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+            "Info": info,
+            "Screenshot": screenshot,
+        }
+        with open(self.output_dir / "steps.log", "a", encoding="utf-8") as fp:
+            fp.write(json.dumps(step) + "\n")
+
+    def _log_coverage(self):
+        activities = list(dict.fromkeys(screen.activity for screen in self.screens))
+        tested = [activity for activity in activities if activity in self.visits]
+        coverage = {
+            "stepsCount": self.steps,
+            "coverage": round(len(tested) / len(activities) * 100, 2),
+            "totalActivitiesCount": len(activities),
+            "testedActivitiesCount": len(tested),
+            "totalActivities": activities,
+            "testedActivities": tested,
+            "activityCountHistory": dict(self.visits),
+        }
+        with open(self.output_dir / "coverage.log", "a", encoding="utf-8") as fp:
+            fp.write(json.dumps(coverage) + "\n")
+
+    def _jsonrpc(self, data) -> Dict:
+        method = data.get("method")
+        if method == "dumpWindowHierarchy":
+            result = self.screen.hierarchy
+        elif method == "deviceInfo":
+            result = {"currentPackageName": self.screen.activity.rsplit(".", 1)[0], "displayWidth": 1080,
+                      "displayHeight": 2400, "displayRotation": 0, "displaySizeDpX": 411, "displaySizeDpY": 914,
+                      "productName": "kea2-simulator", "screenOn": True, "sdkInt": 33, "naturalOrientation": True}
+        elif method == "objInfo":
+            result = {"bounds": {"left": 0, "top": 200, "right": 540, "bottom": 400}, "className": "android.widget.Button",
+                      "text": "", "contentDescription": "", "enabled": True, "clickable": True, "checkable": False,
+                      "checked": False, "focusable": True, "focused": False, "scrollable": False, "longClickable": False,
+                      "selected": False, "packageName": self.screen.activity.rsplit(".", 1)[0], "childCount": 0}
+        elif method in ("exist", "waitForExists", "count"):
+            found = self._match(data["params"][0])
+            result = int(found) if method == "count" else found
+        else:
+            if method in ACTION_METHODS:
+                self._next_screen()
+            result = True
+        return {"jsonrpc": "2.0", "id": data.get("id", 1), "result": result}
+
+    def _match(self, selector: Dict) -> bool:
+        """Whether the current screen has a node with the text, resource id, description and class of a selector"""
+        hierarchy = self.screen.hierarchy
+        return all(f"{attribute}={quoteattr(str(selector[field]))}" in hierarchy
+                   for field, attribute in SELECTOR_ATTRIBUTES.items() if field in selector)
+
+    def summary(self) -> Dict:
+        return {
+            "steps": self.steps,
+            "requests": {path: latency_summary(values) for path, values in sorted(self.latencies.items())},
+            "host_per_step": latency_summary(self.host_latencies),
+            "property": latency_summary(self.property_latencies),
+        }
+
+
+_BLANK_PNG: Optional[bytes] = None
+
+
+def _blank_png() -> bytes:
+    global _BLANK_PNG
+    if _BLANK_PNG is None:
+        from PIL import Image
+        buf = io.BytesIO()
+        Image.new("RGB", (108, 240), (255, 255, 255)).save(buf, format="PNG")
+        _BLANK_PNG = buf.getvalue()
+    return _BLANK_PNG
+
+
+class FakeFastbot:
+    """The fastbot process started by FastbotManager. It runs until the agent gets /stopMonkey."""
+
+    def __init__(self, agent: FakeAgent, cmdargs, stdout: Optional[IO] = None):
+        self.agent = agent
+        self.stdout = stdout
+        if stdout is not None:
+            stdout.write(f"[Fastbot] simulated: {' '.join(cmdargs)}\n")
+
+    def is_running(self) -> bool:
+        return not self.agent.stopped.is_set()
+
+    def poll(self) -> Optional[int]:
+        return None if self.is_running() else 0
+
+    def wait(self) -> int:
+        self.agent.stopped.wait()
+        return 0
+
+    def join(self):
+        self.wait()
+        if self.stdout is not None and not self.stdout.closed:
+            self.stdout.write("[Fastbot] Monkey finished\n")
+            self.stdout.close()
+
+
+class _FakeTransport:
+    """The exec: transport of ResultSyncer (tail and tar of the device output dir)"""
+
+    def __init__(self, device: "FakeADBDevice"):
+        self.device = device
+        self._data = io.BytesIO()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    @property
+    def conn(self):
+        return self
+
+    def makefile(self, mode):
+        return self._data
+
+    def send_command(self, cmd: str):
+        args = cmd[len("exec:"):].split(" ")
+        data = b""
+        if args[0] == "tail":
+            # tail -c +N <path>
+            with open(self.device.local(args[3]), "rb") as fp:
+                fp.seek(int(args[2]) - 1)
+                data = fp.read()
+        elif args[0] == "tar":
+            # tar -c[z]f - -C <dir> <files>
+            buf = io.BytesIO()
+            with tarfile.open(fileobj=buf, mode="w:gz" if "z" in args[1] else "w") as tar:
+                for name in args[5:]:
+                    tar.add(self.device.local(args[4]) / name, arcname=name)
+            data = buf.getvalue()
+        self._data = io.BytesIO(data)
+
+    def check_okay(self):
+        pass
+
+    def read(self, n: int) -> bytes:
+        return self._data.read(n)
+
+
+class _FakeSync:
+    def __init__(self, device: "FakeADBDevice"):
+        self.device = device
+
+    def push(self, src, dst: str, mode: int = 0o755, check: bool = False) -> int:
+        local = self.device.local(dst)
+        local.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(src, (str, Path)):
+            shutil.copyfile(src, local)
+        else:
+            local.write_bytes(src if isinstance(src, bytes) else src.read())
+        return local.stat().st_size
+
+    def pull_file(self, src: str, dst) -> int:
+        shutil.copyfile(self.device.local(src), dst)
+        return os.path.getsize(dst)
+
+    def pull_dir(self, src: str, dst, exist_ok: bool = False) -> int:
+        local = self.device.local(src)
+        shutil.copytree(local, dst, dirs_exist_ok=exist_ok)
+        return sum(p.stat().st_size for p in local.rglob("*") if p.is_file())
+
+    def iter_directory(self, path: str) -> Iterator[FileInfo]:
+        local = self.device.local(path)
+        for name in sorted(os.listdir(local)):
+            st = os.stat(local / name)
+            yield FileInfo(st.st_mode, st.st_size, datetime.fromtimestamp(st.st_mtime), name)
+
+    def stat(self, path: str) -> FileInfo:
+        st = os.stat(self.device.local(path))
+        return FileInfo(st.st_mode, st.st_size, datetime.fromtimestamp(st.st_mtime), path)
+
+
+class FakeADBDevice(adbutils.AdbDevice):
+    """
+    A local stand-in for the device under test: its file system is a local directory, its
+    connections to the agent port go to a FakeAgent, and its shell answers the commands of kea2.
+    """
+
+    def __init__(self, root: Path, agent: FakeAgent, serial: str = SIMULATOR_SERIAL,
+                 packages: Sequence[str] = (BENCH_PACKAGE,), release: str = "13"):
+        super().__init__(client=adb, serial=serial)
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.agent = agent
+        self.packages = list(packages)
+        self.release = release
+        self.shell_commands: List[str] = list()
+
+    def local(self, remote: str) -> Path:
+        return self.root / str(remote).lstrip("/")
+
+    @property
+    def sync(self) -> _FakeSync:
+        return _FakeSync(self)
+
+    def get_features(self) -> str:
+        return "shell_v2"
+
+    def create_connection(self, network, address):
+        import socket
+        # the uiautomator2 server is proxied by the agent, both stop with fastbot
+        if address in (AGENT_PORT, U2_PORT) and not self.agent.stopped.is_set():
+            return socket.create_connection(("127.0.0.1", self.agent.port))
+        raise ConnectionRefusedError(f"{self.serial}: nothing listening on {address}")
+
+    def open_transport(self, command: Optional[str] = None, timeout: Optional[float] = None) -> _FakeTransport:
+        return _FakeTransport(self)
+
+    @property
+    def stream_shell(self):
+        return lambda cmdargs, stdout=None, stderr=None: FakeFastbot(self.agent, cmdargs, stdout)
+
+    def getprop(self, prop: str) -> str:
+        return {"ro.build.version.release": self.release, "ro.build.version.sdk": "33"}.get(prop, "")
+
+    def list_packages(self, filter_list=None) -> List[str]:
+        return list(self.packages)
+
+    def kill_proc(self, proc_name):
+        pass
+
+    def shell(self, cmdargs, stream=False, timeout=None, encoding="utf-8", rstrip=True):
+        cmd = cmdargs if isinstance(cmdargs, str) else " ".join(str(arg) for arg in cmdargs)
+        self.shell_commands.append(cmd)
+        args = cmd.split()
+        output = ""
+        if args[:2] in (["rm", "-f"], ["rm", "-rf"]):
+            for path in args[2:]:
+                local = self.local(path)
+                if local.is_dir():
+                    shutil.rmtree(local, ignore_errors=True)
+                elif local.exists():
+                    local.unlink()
+        elif args[:1] == ["find"] and "-delete" in args:
+            # find <dir> -name "*.png" -delete
+            for png in self.local(args[1]).rglob("*.png"):
+                png.unlink()
+        elif args[:2] == ["du", "-sk"]:
+            output = self._usage(args[2].rstrip(";"))
+        elif args[:3] == ["pm", "list", "packages"]:
+            output = "\n".join(f"package:{package}" for package in self.packages)
+        elif args[:1] == ["getprop"] and len(args) > 1:
+            output = self.getprop(args[1])
+        return output if encoding else output.encode("utf-8")
+
+    def _usage(self, remote_dir: str) -> str:
+        """The output of the device usage probe of ResultSyncer (du, ls | wc -l, df)"""
+        local = self.local(remote_dir)
+        files = [p for p in local.rglob("*") if p.is_file()] if local.exists() else []
+        size = sum(p.stat().st_size for p in files) // 1024
+        screenshots = len([p for p in files if p.parent.name == "screenshots"])
+        free = shutil.disk_usage(self.root).free // 1024
+        return f"{size}\t{remote_dir}\n{screenshots}\n/dev/fuse 0 0 {free} 0% /sdcard"
+
+
+@contextmanager
+def simulated_device(root: Path, screens: Sequence[Screen], packages: Sequence[str] = (BENCH_PACKAGE,),
+                     step_latency: float = 0.0, dump_latency: float = 0.0, profile_period: int = 25,
+                     serial: str = SIMULATOR_SERIAL):
+    """
+    Make kea2 drive a FakeADBDevice and its FakeAgent instead of a device connected to adb,
+    for the `with` block. Yields the agent.
+    """
+    import uiautomator2 as u2
+    from .adbUtils import ADBDevice
+    from .u2Driver import U2Driver, U2ScriptDriver
+
+    # A KeaTestRunner of a previous run left to the garbage collector stops uiautomator when deleted
+    # (KeaTestRunner.__del__). Collected during this run, it would stop it on the fake device, from a
+    # request of the agent to itself. Collect it before.
+    gc.collect()
+    agent = FakeAgent(Path(root), screens, step_latency, dump_latency, profile_period)
+    agent.start()
+    device = FakeADBDevice(root, agent, serial, packages)
+    saved = (ADBDevice._instance, ADBDevice.serial, ADBDevice.transport_id,
+             U2ScriptDriver.d, U2ScriptDriver.deviceSerial, U2Driver.scriptDriver)
+    # ADBDevice() is a singleton, its instance is the fake device
+    ADBDevice._instance, ADBDevice.serial, ADBDevice.transport_id = device, serial, None
+    U2Driver.scriptDriver = None
+    U2ScriptDriver.deviceSerial = serial
+    U2ScriptDriver.d = u2.Device(device)
+    try:
+        yield agent
+    finally:
+        (ADBDevice._instance, ADBDevice.serial, ADBDevice.transport_id,
+         U2ScriptDriver.d, U2ScriptDriver.deviceSerial, U2Driver.scriptDriver) = saved
+        agent.stop()
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        # Windows
+        return None
+    import sys
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KB on linux
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+@dataclass
+class BenchResult:
+    steps: int
+    seconds: float
+    steps_per_sec: float
+    # the phases of the run, in seconds: startup (until the first step), explore, teardown (from /stopMonkey)
+    phases: Dict[str, float] = field(default_factory=dict)
+    # the latencies of the agent requests and of the host per step
+    latency: Dict[str, Dict] = field(default_factory=dict)
+    peak_rss_mb: Optional[float] = None
+    result_dir: str = ""
+
+    def print_summary(self):
+        print(f"[INFO] {self.steps} steps in {self.seconds:.2f}s: {self.steps_per_sec:.2f} steps/s", flush=True)
+        print("[INFO] Phases: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.phases.items()), flush=True)
+        rows = [("PHASE", "COUNT", "MEAN", "P50", "P95", "MAX")]
+        for name, summary in self.latency.items():
+            rows.append((name, str(summary["count"]), *(f"{summary[k]:.2f}ms" for k in ("mean_ms", "p50_ms", "p95_ms", "max_ms"))))
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        for row in rows:
+            print("  " + "  ".join(cell.ljust(width) for cell, width in zip(row, widths)), flush=True)
+        if self.peak_rss_mb is not None:
+            print(f"[INFO] Peak memory (RSS): {self.peak_rss_mb} MB", flush=True)
+        print(f"[INFO] Result dir: {self.result_dir}", flush=True)
+
+
+def run_bench(suite: unittest.TestSuite, output_dir: Path, screens: Sequence[Screen], steps: int = 200,
+              package: str = BENCH_PACKAGE, step_latency: float = 0.0, dump_latency: float = 0.0,
+              profile_period: int = 25, throttle: int = 0, running_minutes: int = 10, report_format: str = "json",
+              sync_mode: str = "full", take_screenshots: bool = False, log_stamp: Optional[str] = None,
+              record: bool = False) -> BenchResult:
+    """Run KeaTestRunner on the property suite against a simulated device, and measure the run"""
+    from .keaUtils import KeaTestRunner, Options
+    from .u2Driver import U2Driver
+
+    output_dir = Path(output_dir)
+    device_root = Path(tempfile.mkdtemp(prefix="kea2-device-"))
+    start = perf_counter()
+    try:
+        with simulated_device(device_root, screens, [package], step_latency, dump_latency, profile_period) as agent:
+            options = Options(
+                agent="u2", driverName="d", Driver=U2Driver, packageNames=[package], serial=SIMULATOR_SERIAL,
+                maxStep=steps, running_mins=running_minutes, throttle=throttle, output_dir=str(output_dir),
+                log_stamp=log_stamp, profile_period=profile_period, report_format=report_format,
+                sync_mode=sync_mode, take_screenshots=take_screenshots, record=record,
+            )
+            KeaTestRunner.setOptions(options)
+            KeaTestRunner().run(suite)
+            end = perf_counter()
+    finally:
+        shutil.rmtree(device_root, ignore_errors=True)
+
+    first_step = agent.first_step or end
+    stop_time = agent.stop_time or end
+    explore = stop_time - first_step
+    summary = agent.summary()
+    latency = {"host per step": summary["host_per_step"], "property": summary["property"]}
+    latency.update({f"agent {path}": values for path, values in summary["requests"].items()
+                    if not path.startswith("/jsonrpc")})
+    return BenchResult(
+        steps=agent.steps,
+        seconds=round(end - start, 3),
+        steps_per_sec=round(agent.steps / explore, 2) if explore > 0 else 0.0,
+        phases={"startup": round(first_step - start, 3), "explore": round(explore, 3), "teardown": round(end - stop_time, 3)},
+        latency=latency,
+        peak_rss_mb=_peak_rss_mb(),
+        result_dir=str(options.output_dir),
+    )
+
+
+def save_bench(result: BenchResult, path: Path):
+    with open(path, "w", encoding="utf-8") as fp:
+        json.dump(asdict(result), fp, indent=4)
@@ -0,0 +1,215 @@
+import json
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List, Optional
+
+from .utils import getLogger
+
+
+logger = getLogger(__name__)
+
+# the phases of a step of KeaTestRunner, in the order of the step
+PHASES = ("block", "rpc", "parse", "occlusion", "preconds", "property", "logScript", "flush", "sync")
+# How often (in seconds) the timing summary line is printed
+SUMMARY_PERIOD = 60.0
+
+
+def perf_file(output_dir: Path, stamp: str) -> Path:
+    return Path(output_dir) / f"perf_{stamp}.json"
+
+
+class LatencyHistogram:
+    """
+    A HDR-style histogram of latencies: the values (in microseconds) go to log-linear buckets,
+    32 per power of two, so that any percentile is known within 1/32 (3%) of its value, whatever
+    the range of the values. Only the buckets used are stored.
+    """
+
+    SUB_BUCKETS = 32
+
+    def __init__(self):
+        self.counts: Dict[int, int] = dict()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @classmethod
+    def _bucket(cls, us: int) -> int:
+        if us < 2 * cls.SUB_BUCKETS:
+            return us
+        shift = us.bit_length() - 6
+        return 2 * cls.SUB_BUCKETS + (shift - 1) * cls.SUB_BUCKETS + (us >> shift) - cls.SUB_BUCKETS
+
+    @classmethod
+    def _upper(cls, bucket: int) -> int:
+        """The largest value (in microseconds) of a bucket"""
+        if bucket < 2 * cls.SUB_BUCKETS:
+            return bucket
+        shift = (bucket - 2 * cls.SUB_BUCKETS) // cls.SUB_BUCKETS + 1
+        sub = (bucket - 2 * cls.SUB_BUCKETS) % cls.SUB_BUCKETS + cls.SUB_BUCKETS
+        return ((sub + 1) << shift) - 1
+
+    def record(self, seconds: float):
+        bucket = self._bucket(int(seconds * 1e6))
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> float:
+        """The value (in seconds) below which q of the values are"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(self._upper(bucket) / 1e6, self.max)
+        return self.max
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "total_seconds": round(self.total, 6),
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.5) * 1000, 3),
+            "p90_ms": round(self.percentile(0.9) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            # bucket -> count, the upper bound of a bucket in microseconds is LatencyHistogram._upper(bucket)
+            "buckets": {str(bucket): count for bucket, count in sorted(self.counts.items())},
+        }
+
+
+_active: Optional["StepTimer"] = None
+
+
+def phase(name: str):
+    """A phase of the active StepTimer (nothing without), for the code below KeaTestRunner.run"""
+    if _active is None:
+        return nullcontext()
+    return _active.phase(name)
+
+
+class StepTimer:
+    """
+    The time spent in the phases of the steps of KeaTestRunner (the blocked widgets, the agent request,
+    the hierarchy parsing, the preconditions, the property...), in seconds.
+
+    A phase entered several times in a step adds up. The phases can be nested: the time of a phase
+    doesn't include the phases inside it, so that the phases of a step add up to the step.
+    Every phase has a LatencyHistogram of its time per step. A summary of the last period is printed
+    every `summary_period` seconds, and kept as the timeline of the run (saved to `path` then, when given).
+    """
+
+    def __init__(self, summary_period: float = SUMMARY_PERIOD, path: Optional[Path] = None):
+        self.summary_period = summary_period
+        self.path = Path(path) if path else None
+        self.timings: Dict[str, float] = dict()
+        self.histograms: Dict[str, LatencyHistogram] = dict()
+        self.steps = 0
+        self.timeline: List[Dict] = list()
+        self._start = perf_counter()
+        # the time of the phases inside the phases being timed
+        self._nested: List[float] = list()
+        self._window: Dict[str, float] = dict()
+        self._window_start = self._start
+        self._window_steps = 0
+        self._window_steps_count = 0
+        self._steps_count = 0
+
+    def activate(self):
+        """Make this timer the one of the phase() function"""
+        global _active
+        _active = self
+
+    def start_step(self, steps_count: int = 0):
+        """
+        Start a step, ending the previous one.
+        Args:
+            steps_count: the monkey steps sent so far
+        """
+        self._end_step()
+        self._steps_count = steps_count
+        # a new dict: the timings of the previous step may still be referenced (see SessionRecorder)
+        self.timings = dict()
+        if perf_counter() - self._window_start >= self.summary_period:
+            self._summarize_window()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = perf_counter()
+        self._nested.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = perf_counter() - start
+            nested = self._nested.pop()
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed - nested
+            if self._nested:
+                self._nested[-1] += elapsed
+
+    def _end_step(self):
+        if not self.timings:
+            return
+        for name, seconds in self.timings.items():
+            self.histograms.setdefault(name, LatencyHistogram()).record(seconds)
+            self._window[name] = self._window.get(name, 0.0) + seconds
+        self.steps += 1
+        self._window_steps += 1
+
+    def _summarize_window(self):
+        if not self._window_steps:
+            return
+        now = perf_counter()
+        monkey_steps = self._steps_count - self._window_steps_count
+        entry = {
+            "steps_count": self._steps_count,
+            "elapsed_seconds": round(now - self._start, 3),
+            "steps_per_sec": round(monkey_steps / (now - self._window_start), 3),
+            # the mean time of the phases per step of the period, in ms
+            "phases": {name: round(self._window.get(name, 0.0) / self._window_steps * 1000, 3)
+                       for name in self._ordered(self._window)},
+        }
+        self.timeline.append(entry)
+        top = sorted(entry["phases"].items(), key=lambda item: -item[1])
+        logger.info(f"Step timing: {self._steps_count} steps, {entry['steps_per_sec']} steps/s over the last "
+                    f"{now - self._window_start:.0f}s | " + ", ".join(f"{name} {ms:.1f}ms" for name, ms in top) + " per step")
+        self._window = dict()
+        self._window_start = now
+        self._window_steps = 0
+        self._window_steps_count = self._steps_count
+        if self.path:
+            self.save(self.path)
+
+    @staticmethod
+    def _ordered(names) -> List[str]:
+        return sorted(names, key=lambda name: (PHASES.index(name) if name in PHASES else len(PHASES), name))
+
+    def finish(self, steps_count: int):
+        """End the last step and the last period"""
+        global _active
+        self._end_step()
+        self.timings = dict()
+        self._steps_count = steps_count
+        self._summarize_window()
+        if _active is self:
+            _active = None
+
+    def summary(self) -> Dict:
+        elapsed = perf_counter() - self._start
+        return {
+            "steps": self.steps,
+            "steps_count": self._steps_count,
+            "elapsed_seconds": round(elapsed, 3),
+            "steps_per_sec": round(self._steps_count / elapsed, 3) if elapsed > 0 else 0.0,
+            "phases": {name: self.histograms[name].to_dict() for name in self._ordered(self.histograms)},
+            "timeline": self.timeline,
+        }
+
+    def save(self, path: Path) -> Path:
+        with open(path, "w", encoding="utf-8") as fp:
+            json.dump(self.summary(), fp, indent=4)
+        return Path(path)
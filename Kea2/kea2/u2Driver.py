@@ -13,6 +13,7 @@ from lxml import etree
 from packaging.version import Version
 from .absDriver import AbstractScriptDriver, AbstractStaticChecker, AbstractDriver
 from .adbUtils import list_forwards, remove_forward
+from .stepTimer import phase
 from .utils import getLogger
 
 
@@ -524,19 +525,25 @@ class U2StaticChecker(AbstractStaticChecker):
         ...
     ```
     """
-    def __init__(self):
-        self.d = U2StaticDevice(U2ScriptDriver().getInstance()) 
+    def __init__(self, offline: bool = False):
+        """
+        Args:
+            offline: without a device (e.g. replaying a session archive). Only the hierarchy can be checked.
+        """
+        self.d = U2StaticDevice(None if offline else U2ScriptDriver().getInstance())
 
     def setHierarchy(self, hierarchy: str):
         if hierarchy is None:
             return
-        if isinstance(hierarchy, str):
-            self.d.xml = etree.fromstring(hierarchy.encode("utf-8"))
-        elif isinstance(hierarchy, etree._Element):
-            self.d.xml = hierarchy
-        elif isinstance(hierarchy, etree._ElementTree):
-            self.d.xml = hierarchy.getroot()
-        _HindenWidgetFilter(self.d.xml)
+        with phase("parse"):
+            if isinstance(hierarchy, str):
+                self.d.xml = etree.fromstring(hierarchy.encode("utf-8"))
+            elif isinstance(hierarchy, etree._Element):
+                self.d.xml = hierarchy
+            elif isinstance(hierarchy, etree._ElementTree):
+                self.d.xml = hierarchy.getroot()
+        with phase("occlusion"):
+            _HindenWidgetFilter(self.d.xml)
 
     def getInstance(self, hierarchy: str=None):
         self.setHierarchy(hierarchy)
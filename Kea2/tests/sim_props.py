@@ -0,0 +1,18 @@
+"""
+The properties run by kea2 on the simulated device in the tests, not by the test runner:
+import the module (not the class) in a test module, for unittest not to collect them.
+"""
+import unittest
+
+from kea2 import precondition
+
+
+class BenchProps(unittest.TestCase):
+    @precondition(lambda self: self.d(text="Screen 1").exists and self.d(text="Next").exists)
+    def test_next(self):
+        self.d(text="Next").click()
+
+    @precondition(lambda self: self.d(text="Screen 3").exists)
+    def test_back(self):
+        self.d(text="Back").click()
+        assert self.d(text="Screen 2").exists
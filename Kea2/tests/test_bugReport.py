@@ -0,0 +1,482 @@
+import contextlib
+import io
+import json
+import re
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from typing import Optional
+
+from PIL import Image, PngImagePlugin
+
+from kea2.report.bug_report_generator import BugReportGenerator
+from kea2.cli import cmd_report, cmd_steps
+from kea2.report.checkpoint import ReportCheckpoint
+from kea2.report.crash_fingerprint import FingerprintIndex, fingerprint, normalize_frame
+from kea2.report.mixin import MARKED_KEY
+from kea2.report.step_index import StepIndex
+from kea2.report.utils import SpillList
+from kea2.resultSyncer import SyncProgress
+
+
+STAMP = "test"
+PROP = "quicktest.Omni.test_rotation"
+
+
+def make_result_dir(root: Path, steps: int = 20, screenshots: bool = True) -> Path:
+    """Create a synthetic result dir as produced by `kea2 run --take-screenshots`"""
+    result_dir = root / f"res_{STAMP}"
+    output_dir = result_dir / f"output_{STAMP}"
+    (output_dir / "screenshots").mkdir(parents=True)
+
+    with open(result_dir / "bug_report_config.json", "w") as fp:
+        json.dump({"packageNames": ["com.example"], "log_stamp": STAMP, "take_screenshots": screenshots,
+                   "test_time": "2025-01-01 10:00:00"}, fp)
+    with open(result_dir / f"result_{STAMP}.json", "w") as fp:
+        json.dump({PROP: {"precond_satisfied": 2, "executed": 2, "fail": 1, "error": 0}}, fp)
+    with open(result_dir / f"property_exec_info_{STAMP}.json", "w") as fp:
+        fp.write(json.dumps({"propName": PROP, "state": "fail", "tb": "AssertionError", "startStepsCount": 5}) + "\n")
+
+    append_steps(result_dir, 1, steps, screenshots)
+    return result_dir
+
+
+def append_steps(result_dir: Path, start: int, end: int, screenshots: bool = True):
+    """Append the steps [start, end] to steps.log and coverage.log, as during a run"""
+    output_dir = result_dir / f"output_{STAMP}"
+    activities = [f"com.example.Act{i}" for i in range(4)]
+    with open(output_dir / "steps.log", "a") as steps_log, open(output_dir / "coverage.log", "a") as cov_log:
+        for i in range(start, end + 1):
+            name = f"screenshot-{i}-0.png" if screenshots else ""
+            step = {"Type": "Monkey", "MonkeyStepsCount": i, "Time": f"2025-01-01 10:00:{i % 60:02d}.000",
+                    "Info": json.dumps({"act": "CLICK", "pos": [10, 10, 30, 30]}), "Screenshot": name}
+            steps_log.write(json.dumps(step) + "\n")
+            if i in (5, 10):
+                for state in ("start", "fail" if i == 5 else "pass"):
+                    info = {"Type": "ScriptInfo", "MonkeyStepsCount": i, "Time": f"2025-01-01 10:00:{i:02d}.500",
+                            "Info": json.dumps({"propName": PROP, "state": state}), "Screenshot": ""}
+                    steps_log.write(json.dumps(info) + "\n")
+            if i % 5 == 0:
+                tested = activities[:min(i // 5, 4)]
+                cov_log.write(json.dumps({
+                    "stepsCount": i, "coverage": len(tested) / 4 * 100,
+                    "totalActivitiesCount": 4, "testedActivitiesCount": len(tested),
+                    "totalActivities": activities, "testedActivities": tested,
+                    "activityCountHistory": {a: i for a in tested},
+                }) + "\n")
+
+
+def append_script_info(result_dir: Path, steps_count: int, prop: str, state: str, screenshot: str = ""):
+    """Append the ScriptInfo of a property to steps.log"""
+    with open(result_dir / f"output_{STAMP}" / "steps.log", "a") as steps_log:
+        info = {"Type": "ScriptInfo", "MonkeyStepsCount": steps_count, "Time": "2025-01-01 10:01:00.000",
+                "Info": json.dumps({"propName": prop, "state": state}), "Screenshot": screenshot}
+        steps_log.write(json.dumps(info) + "\n")
+
+
+def write_screenshot(path: Path, pnginfo: Optional[PngImagePlugin.PngInfo] = None):
+    Image.new("RGB", (64, 64), (255, 255, 255)).save(path, pnginfo=pnginfo)
+
+
+def is_marked(path: Path) -> bool:
+    """Whether the screenshot carries the marking record of the report"""
+    with Image.open(path) as img:
+        return img.info.get(MARKED_KEY) == "1"
+
+
+class TestBugReport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.result_dir = make_result_dir(self.tmp)
+        self.screenshots_dir = self.result_dir / f"output_{STAMP}" / "screenshots"
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_report_during_final_sync(self):
+        # half of the screenshots are on host, the other half lands while the report is generated
+        for i in range(1, 11):
+            write_screenshot(self.screenshots_dir / f"screenshot-{i}-0.png")
+
+        progress = SyncProgress()
+
+        def final_sync():
+            progress.logs_synced.set()
+            for i in range(11, 21):
+                write_screenshot(self.screenshots_dir / f"screenshot-{i}-0.png")
+                progress.land(f"screenshot-{i}-0.png")
+            progress.finish()
+
+        t = threading.Thread(target=final_sync)
+        t.start()
+        report = BugReportGenerator(self.result_dir).generate_report(sync_progress=progress)
+        t.join()
+
+        self.assertTrue(Path(report).exists())
+        html = Path(report).read_text(encoding="utf-8")
+        for i in range(1, 21):
+            self.assertIn(f"screenshot-{i}-0.png", html)
+            # every screenshot is marked with the red click rectangle
+            img = Image.open(self.screenshots_dir / f"screenshot-{i}-0.png")
+            self.assertEqual(img.getpixel((10, 10)), (255, 0, 0))
+
+    def test_regenerate_after_missing_screenshots(self):
+        # the screenshots 3, 4 and 7 never land on host during the final sync
+        missing = (3, 4, 7)
+        for i in range(1, 21):
+            if i not in missing:
+                write_screenshot(self.screenshots_dir / f"screenshot-{i}-0.png")
+        progress = SyncProgress()
+        progress.logs_synced.set()
+        progress.finish()
+        self.assertIsNotNone(BugReportGenerator(self.result_dir).generate_report(sync_progress=progress))
+
+        # the checkpoint resumes the timeline from its actual size
+        steps = BugReportGenerator(self.result_dir).checkpoint.steps
+        timeline = ReportCheckpoint.timeline_path(self.result_dir)
+        self.assertEqual(steps.timeline_size, timeline.stat().st_size)
+        self.assertEqual(steps.timeline_len, len(timeline.read_bytes().splitlines()))
+
+        append_steps(self.result_dir, 21, 25)
+        for i in range(21, 26):
+            write_screenshot(self.screenshots_dir / f"screenshot-{i}-0.png")
+        report = BugReportGenerator(self.result_dir).generate_report()
+        self.assertIsNotNone(report)
+        html = Path(report).read_text(encoding="utf-8")
+        for i in range(1, 26):
+            link = f'href="output_{STAMP}/screenshots/screenshot-{i}-0.png"'
+            self.assertEqual(html.count(link), 0 if i in missing else 1)
+
+    def test_render_error_fails_the_report(self):
+        with patch("jinja2.Template.stream", side_effect=ValueError("broken")):
+            self.assertIsNone(BugReportGenerator(self.result_dir).generate_report())
+        self.assertFalse((self.result_dir / "bug_report.html").exists())
+
+    def read_timeline(self):
+        with open(ReportCheckpoint.timeline_path(self.result_dir), "rb") as fp:
+            return [json.loads(line) for line in fp]
+
+    def test_screenshots_window(self):
+        for i in range(1, 23):
+            write_screenshot(self.screenshots_dir / f"screenshot-{i}-0.png")
+        with patch("kea2.report.bug_report_generator.RECENT_SCREENSHOTS_WINDOW", 2):
+            BugReportGenerator(self.result_dir).generate_report()
+            # the property started on the screen of step 20 shares its screenshot, across the regeneration
+            append_script_info(self.result_dir, 20, PROP, "start", "screenshot-20-0.png")
+            append_steps(self.result_dir, 21, 21)
+            append_script_info(self.result_dir, 21, PROP, "pass", "screenshot-21-0.png")
+            append_steps(self.result_dir, 22, 22)
+            generator = BugReportGenerator(self.result_dir)
+            generator.generate_report()
+
+        paths = [Path(s["path"]).name for s in self.read_timeline()]
+        self.assertEqual(paths, [f"screenshot-{i}-0.png" for i in range(1, 23)])
+        # only the window is remembered
+        self.assertEqual(list(generator.checkpoint.steps.recent_screenshots), ["screenshot-21-0.png", "screenshot-22-0.png"])
+
+    def test_executed_properties_count(self):
+        for i in range(1, 24):
+            write_screenshot(self.screenshots_dir / f"screenshot-{i}-0.png")
+        generator = BugReportGenerator(self.result_dir)
+        generator.generate_report()
+        # PROP started at the steps 5 and 10, counted once
+        self.assertEqual(generator.checkpoint.steps.executed_properties_by_step, {5: 1})
+
+        other = "quicktest.Omni.test_search"
+        append_steps(self.result_dir, 21, 22)
+        append_script_info(self.result_dir, 22, other, "start")
+        append_script_info(self.result_dir, 22, other, "pass")
+        append_steps(self.result_dir, 23, 23)
+        append_script_info(self.result_dir, 23, PROP, "start")
+        generator = BugReportGenerator(self.result_dir)
+        generator.generate_report()
+        self.assertEqual(generator.checkpoint.steps.executed_properties_by_step, {5: 1, 22: 2})
+
+    def test_marked_without_checkpoint(self):
+        # screenshots marked by the report of another copy of the result directory: no checkpoint here
+        pnginfo = PngImagePlugin.PngInfo()
+        pnginfo.add_text(MARKED_KEY, "1")
+        for i in range(1, 21):
+            write_screenshot(self.screenshots_dir / f"screenshot-{i}-0.png", pnginfo if i <= 10 else None)
+        self.assertFalse(ReportCheckpoint.checkpoint_dir(self.result_dir).exists())
+
+        BugReportGenerator(self.result_dir, rebuild=True).generate_report()
+        for i in range(1, 21):
+            with Image.open(self.screenshots_dir / f"screenshot-{i}-0.png") as img:
+                self.assertEqual(img.info.get(MARKED_KEY), "1")
+                # the marked ones are not drawn on again, the others get the click rectangle
+                self.assertEqual(img.convert("RGB").getpixel((10, 10)), (255, 255, 255) if i <= 10 else (255, 0, 0))
+
+    def test_incremental_regeneration(self):
+        for i in range(1, 31):
+            write_screenshot(self.screenshots_dir / f"screenshot-{i}-0.png")
+        # the screenshot of step 15 is not synced yet
+        (self.screenshots_dir / "screenshot-15-0.png").unlink()
+
+        BugReportGenerator(self.result_dir).generate_report()
+        self.assertEqual([i for i in range(1, 31) if i != 15 and is_marked(self.screenshots_dir / f"screenshot-{i}-0.png")],
+                         [i for i in range(1, 21) if i != 15])
+        marked = {i: (self.screenshots_dir / f"screenshot-{i}-0.png").read_bytes() for i in range(1, 21) if i != 15}
+
+        # the run goes on
+        write_screenshot(self.screenshots_dir / "screenshot-15-0.png")
+        append_steps(self.result_dir, 21, 30)
+        generator = BugReportGenerator(self.result_dir)
+        report = generator.generate_report()
+        # the new screenshots are marked: 15 and 21-30, the others are left as they were
+        self.assertTrue(all(is_marked(self.screenshots_dir / f"screenshot-{i}-0.png") for i in range(1, 31)))
+        for i, content in marked.items():
+            self.assertEqual((self.screenshots_dir / f"screenshot-{i}-0.png").read_bytes(), content)
+
+        # same report as parsing everything again, without marking the screenshots twice
+        marked = {i: (self.screenshots_dir / f"screenshot-{i}-0.png").read_bytes() for i in range(1, 31)}
+        html = Path(report).read_text(encoding="utf-8")
+        generator = BugReportGenerator(self.result_dir, rebuild=True)
+        rebuilt = Path(generator.generate_report()).read_text(encoding="utf-8")
+        for i, content in marked.items():
+            self.assertEqual((self.screenshots_dir / f"screenshot-{i}-0.png").read_bytes(), content)
+        strip = lambda h: re.sub(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}", "", h)
+        self.assertEqual(strip(html), strip(rebuilt))
+        for i in range(1, 31):
+            self.assertEqual(html.count(f'href="output_{STAMP}/screenshots/screenshot-{i}-0.png"'), 1)
+            self.assertIn(f'src="output_{STAMP}/thumbnails/screenshot-{i}-0.jpg"', html)
+
+    def test_thumbnails_cached(self):
+        for i in range(1, 21):
+            write_screenshot(self.screenshots_dir / f"screenshot-{i}-0.png")
+        BugReportGenerator(self.result_dir, webp=True).generate_report()
+        thumbnails_dir = self.result_dir / f"output_{STAMP}" / "thumbnails"
+        mtimes = {p.name: p.stat().st_mtime_ns for p in thumbnails_dir.iterdir()}
+        self.assertEqual(len(mtimes), 20)
+        self.assertEqual(len(list((self.result_dir / f"output_{STAMP}" / "webp").iterdir())), 20)
+        with Image.open(thumbnails_dir / "screenshot-1-0.jpg") as thumb:
+            # the thumbnail shows the marking
+            self.assertEqual(thumb.size, (64, 64))
+            self.assertGreater(thumb.getpixel((10, 10))[0], 200)
+            self.assertLess(thumb.getpixel((10, 10))[1], 60)
+
+        BugReportGenerator(self.result_dir, rebuild=True, webp=True).generate_report()
+        self.assertEqual({p.name: p.stat().st_mtime_ns for p in thumbnails_dir.iterdir()}, mtimes)
+
+    def test_crash_screenshots(self):
+        for i in range(1, 21):
+            write_screenshot(self.screenshots_dir / f"screenshot-{i}-0.png")
+        with open(self.result_dir / f"output_{STAMP}" / "crash-dump.log", "w") as fp:
+            for steps_count, crash_screen in ((7, ""), (3, "screenshot-3-0.png"), (99, "")):
+                fp.write(f"StepsCount: {steps_count}\nCrashScreen: {crash_screen}\n20250101100000\ncrash:\n"
+                         "// CRASH: com.example (pid 42)\n// Long Msg: java.lang.RuntimeException: boom\n// crash end\n")
+        generator = BugReportGenerator(self.result_dir)
+        generator.generate_report()
+        with open(ReportCheckpoint.timeline_path(self.result_dir), "r") as fp:
+            ids = {s["path"].rsplit("/", 1)[-1]: str(s["id"]) for s in map(json.loads, fp)}
+        # the crash without a crash screen takes the screenshot of its steps count
+        self.assertEqual([e["screenshot_id"] for e in generator.checkpoint.crash_events],
+                         [ids["screenshot-7-0.png"], ids["screenshot-3-0.png"], ""])
+
+        # the same crash three times, then another one parsed from the checkpoint
+        self.assertEqual([e["occurrences"] for e in generator.checkpoint.crash_events], [3, 3, 3])
+        with open(self.result_dir / f"output_{STAMP}" / "crash-dump.log", "a") as fp:
+            fp.write("StepsCount: 9\nCrashScreen: \n20250101100001\ncrash:\n"
+                     "// CRASH: com.example (pid 43)\n// Long Msg: java.lang.IllegalStateException: boom\n// crash end\n")
+        generator = BugReportGenerator(self.result_dir)
+        generator.generate_summary()
+        groups = generator.checkpoint.crash_fingerprints.values()
+        self.assertEqual(sorted((g["title"], g["count"]) for g in groups),
+                         [("java.lang.IllegalStateException", 1), ("java.lang.RuntimeException", 3)])
+
+    def test_summary(self):
+        for i in range(1, 21):
+            write_screenshot(self.screenshots_dir / f"screenshot-{i}-0.png")
+        summary_path = BugReportGenerator(self.result_dir).generate_summary()
+        with open(summary_path, "r", encoding="utf-8") as fp:
+            summary = json.load(fp)
+        self.assertEqual((summary["bugs_found"], summary["executed_events"], summary["crash_count"]), (1, 20, 0))
+        self.assertEqual(summary["coverage"], 100)
+        self.assertEqual(summary["property_violations"][0]["property_name"], PROP)
+        self.assertEqual(summary["property_errors"][PROP][0]["state"], "fail")
+        self.assertEqual(summary["property_stats"][PROP]["pass_count"], 1)
+
+        # the screenshots and the checkpoint are untouched
+        self.assertFalse((self.result_dir / f"output_{STAMP}" / "thumbnails").exists())
+        with Image.open(self.screenshots_dir / "screenshot-1-0.png") as img:
+            self.assertNotIn("kea2-marked", img.info)
+        self.assertFalse(ReportCheckpoint.checkpoint_dir(self.result_dir).exists())
+        self.assertFalse((self.result_dir / f"output_{STAMP}" / "steps.idx").exists())
+        self.assertFalse((self.result_dir / "bug_report.html").exists())
+
+    def test_parallel_reports(self):
+        result_dirs = [self.result_dir, make_result_dir(self.tmp / "device2", screenshots=False)]
+        # a result directory without its config fails alone
+        broken = self.tmp / "res_broken"
+        broken.mkdir()
+        args = SimpleNamespace(path=[str(d) for d in result_dirs + [broken]], rebuild=False, webp=False,
+                               sharded=False, format="json", jobs=2)
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            cmd_report(args)
+
+        for result_dir in result_dirs:
+            with open(result_dir / "report_summary.json", "r", encoding="utf-8") as fp:
+                self.assertEqual(json.load(fp)["bugs_found"], 1)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len([line for line in lines if re.match(r"\[\d/3\]", line)]), 3)
+        self.assertIn(f"❌ {broken}", out.getvalue())
+        self.assertTrue(lines[-1].startswith("Generated 2/3 reports in"))
+
+    def test_property_execution_trend(self):
+        generator = BugReportGenerator.__new__(BugReportGenerator)
+        generator._cov_trend = [{"stepsCount": n} for n in (5, 10, 15, 20)]
+        trend = generator._generate_property_execution_trend({12: 2, 7: 1, 15: 3})
+        self.assertEqual([t["executedPropertiesCount"] for t in trend], [0, 1, 3, 3])
+
+        # without coverage, the trend is sampled at the steps the counter grew
+        generator._cov_trend = []
+        trend = generator._generate_property_execution_trend({12: 2, 7: 1})
+        self.assertEqual([(t["stepsCount"], t["executedPropertiesCount"]) for t in trend], [(7, 1), (12, 2)])
+
+    def test_sharded_report(self):
+        for i in range(1, 21):
+            write_screenshot(self.screenshots_dir / f"screenshot-{i}-0.png")
+        with patch.dict("kea2.report.shards.CHUNK_SIZES", screenshots=8):
+            BugReportGenerator(self.result_dir, sharded=True).generate_report()
+
+        def read_chunk(name):
+            content = (self.result_dir / "report_data" / f"{name}.js").read_text(encoding="utf-8")
+            section, index = name.rsplit("-", 1)
+            prefix = f'kea2Shards.receive("{section}", {index}, '
+            self.assertTrue(content.startswith(prefix))
+            return json.loads(content[len(prefix):].rstrip().rstrip(";").rstrip(")"))
+
+        chunks = [read_chunk(f"screenshots-{i}") for i in range(3)]
+        self.assertEqual([len(c) for c in chunks], [8, 8, 4])
+        self.assertEqual(chunks[2][-1]["thumb"], f"output_{STAMP}/thumbnails/screenshot-20-0.jpg")
+        self.assertEqual(len(read_chunk("coverage-0")), 4)
+        errors = read_chunk("errors-0")
+        self.assertEqual(errors[0]["property"], PROP)
+        self.assertEqual(errors[0]["errors"][0]["traceback"], "AssertionError")
+
+        html = (self.result_dir / "bug_report.html").read_text(encoding="utf-8")
+        # the shell only holds the manifest of the chunks
+        self.assertNotIn("screenshot-1-0", html)
+        self.assertNotIn("AssertionError", html)
+        self.assertIn(f'"bounds": {json.dumps([c[0]["id"] for c in chunks])}', html)
+        self.assertIn('data-error-chunk="0"', html)
+
+
+
+class TestSpillList(unittest.TestCase):
+
+    def test_round_trip(self):
+        items = [{"id": i, "path": f"screenshot-{i}-0.png", "caption": "é"} for i in range(100)]
+        spill = SpillList(items[:50])
+        for item in items[50:]:
+            spill.append(item)
+        self.assertEqual(len(spill), 100)
+        self.assertEqual(list(spill), items)
+        # iterating again reads the items back again
+        self.assertEqual(list(spill), items)
+
+        spill.filter(lambda item: item["id"] % 2 == 0)
+        self.assertEqual(list(spill), items[::2])
+        self.assertEqual(spill.tell(), (Path(spill.path).stat().st_size, 50))
+        path = spill.path
+        spill.close()
+        self.assertFalse(Path(path).exists())
+
+    def test_resume(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "timeline.jsonl"
+            spill = SpillList([{"id": 1}, {"id": 2}], path=path)
+            size, length = spill.tell()
+            # appended after the checkpoint, dropped when resuming from it
+            spill.append({"id": 3})
+            spill.close()
+            self.assertTrue(path.exists())
+
+            spill = SpillList(path=path, size=size, length=length)
+            spill.append({"id": 4})
+            self.assertEqual(list(spill), [{"id": 1}, {"id": 2}, {"id": 4}])
+            self.assertEqual(len(spill), 3)
+            spill.close()
+
+
+class TestCrashFingerprint(unittest.TestCase):
+
+    def test_normalize_frame(self):
+        self.assertEqual(normalize_frame("\tat com.example.Foo$1.lambda$onClick$0(Foo.java:42)"),
+                         "com.example.Foo$.lambda$onClick")
+        self.assertEqual(normalize_frame("at com.example.Foo.access$000(Foo.java)"), "com.example.Foo.access$")
+        self.assertEqual(normalize_frame("at com.example.Bar$$Lambda$12/0x0000000800a1.run(Unknown Source:2)"),
+                         "com.example.Bar$$Lambda.run")
+        self.assertEqual(normalize_frame("at com.example.Bar$$ExternalSyntheticLambda3.run(D8$$SyntheticClass:0)"),
+                         "com.example.Bar$$Lambda.run")
+        self.assertEqual(normalize_frame("#00 pc 0000000000089b1c  /apex/lib64/bionic/libc.so (abort+164) (BuildId: 1f)"),
+                         "libc.so (abort)")
+        self.assertIsNone(normalize_frame("java.lang.RuntimeException: boom"))
+
+    def test_fingerprint(self):
+        def trace(line, frame="com.example.Main.onClick"):
+            return (f"java.lang.RuntimeException: boom@{line:x}\n\tat android.os.Handler.dispatch(Handler.java:{line})\n"
+                    f"\tat {frame}(Main.java:{line})\n\tat com.example.Main$1.run(Main.java:{line + 1})")
+
+        self.assertEqual(fingerprint("crash", "RuntimeException", trace(10), "com.example"),
+                         fingerprint("crash", "RuntimeException", trace(99), "com.example"))
+        self.assertNotEqual(fingerprint("crash", "RuntimeException", trace(10), "com.example"),
+                            fingerprint("crash", "RuntimeException", trace(10, "com.example.Main.onResume"), "com.example"))
+        self.assertNotEqual(fingerprint("crash", "RuntimeException", trace(10)),
+                            fingerprint("anr", "RuntimeException", trace(10)))
+
+        index = FingerprintIndex(package="com.example")
+        for run, line in (("res_1", 10), ("res_2", 20), ("res_3", 30)):
+            index.add("crash", {"exception_type": "RuntimeException", "stack_trace": trace(line), "time": run}, run)
+        (group,) = index.events("crash")
+        self.assertEqual((group["count"], group["first_seen"], group["last_seen"]), (3, "res_1", "res_3"))
+
+
+class TestStepIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.result_dir = make_result_dir(self.tmp, screenshots=False)
+        self.steps_log = self.result_dir / f"output_{STAMP}" / "steps.log"
+        self.index_path = self.result_dir / f"output_{STAMP}" / "steps.idx"
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_index_follows_the_report(self):
+        BugReportGenerator(self.result_dir).generate_report()
+        lines = self.steps_log.read_bytes().splitlines(keepends=True)
+        with StepIndex(self.index_path) as step_index:
+            self.assertEqual(len(step_index), len(lines))
+            record = step_index[6]
+            self.assertEqual((record.type, record.monkey_steps_count), ("ScriptInfo", 5))
+            self.assertEqual([line for _, line in step_index.read_steps(self.steps_log, 5, 7)], lines[4:7])
+
+            append_steps(self.result_dir, 21, 30, screenshots=False)
+            self.assertEqual(step_index.update(self.steps_log), 10)
+            self.assertEqual(step_index[len(step_index)].monkey_steps_count, 30)
+
+            violations = step_index.violations(self.steps_log)
+            self.assertEqual([(v.index, v.property_name, v.start, v.end, v.state) for v in violations],
+                             [(1, PROP, 6, 7, "fail")])
+            self.assertEqual(BugReportGenerator(self.result_dir).checkpoint.steps.property_violations[PROP][0]["end"], 7)
+
+    def test_steps_command(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            # the index is built on demand
+            cmd_steps(SimpleNamespace(path=str(self.result_dir), range=None, around_violation=1, context=1))
+        printed = out.getvalue().splitlines()
+        self.assertIn(PROP, printed[0])
+        self.assertEqual([line.split("\t")[0] for line in printed[1:]], ["5", "6", "7", "8"])
+        self.assertEqual(json.loads(printed[2].split("\t")[1])["Type"], "ScriptInfo")
+
+if __name__ == "__main__":
+    unittest.main()
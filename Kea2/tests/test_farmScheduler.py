@@ -0,0 +1,120 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from kea2 import multiDevice
+from kea2.farmCoverage import CoverageAggregator
+from kea2.farmScheduler import FARM_SCHEDULE_FILE, FarmClient, FarmCoordinator, partition_properties
+
+
+PROPERTIES = ["Props.test_a", "Props.test_b", "Props.test_c"]
+
+
+def stats(**satisfied):
+    return {f"Props.test_{name}": {"precond_satisfied": count, "executed": 0, "fail": 0, "error": 0}
+            for name, count in satisfied.items()}
+
+
+def farm_device(device_args, console_log, suite, farm_conn=None):
+    """A device reporting its statistics. The second device dies, the first one waits for its budget."""
+    multiDevice._redirect_output(console_log)
+    client = FarmClient(farm_conn, report_period=1)
+    print(f"assigned {sorted(client.properties)} for {client.budget}s", flush=True)
+    client.update(1, 5.0, stats(a=3, b=0, c=1))
+    if device_args.serial.endswith("2"):
+        time.sleep(0.2)
+        os._exit(2)
+    deadline = time.monotonic() + 20
+    while client.budget <= 60 and time.monotonic() < deadline:
+        client.update(1, 5.0, stats(a=3, b=0, c=1))
+        time.sleep(0.05)
+    with open(Path(device_args.output_dir) / "farm.json", "w") as fp:
+        json.dump({"budget": client.budget, "properties": sorted(client.properties)}, fp)
+    os._exit(0)
+
+
+class TestFarmScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_partition(self):
+        devices = ["d1", "d2", "d3"]
+        # no statistics yet: the properties are spread
+        assignment = partition_properties(PROPERTIES, devices)
+        self.assertEqual(sorted(p for props in assignment.values() for p in props), PROPERTIES)
+        self.assertTrue(all(len(props) == 1 for props in assignment.values()))
+
+        # a is satisfied everywhere, c only on d3, b never
+        farm_stats = {"d1": stats(a=10, b=0, c=0), "d2": stats(a=10, b=0, c=0), "d3": stats(a=10, b=0, c=15)}
+        assignment = partition_properties(PROPERTIES, devices, farm_stats)
+        devices_of = {p: [d for d in devices if p in assignment[d]] for p in PROPERTIES}
+        self.assertEqual(len(devices_of["Props.test_a"]), 1)
+        self.assertEqual(devices_of["Props.test_b"], devices)
+        self.assertEqual(len(devices_of["Props.test_c"]), 2)
+        self.assertIn("d3", devices_of["Props.test_c"])
+
+    def test_dead_device(self):
+        args = argparse.Namespace(devices="all", serial=None, transport_id=None, output_dir=str(self.tmp),
+                                  log_stamp="stamp", running_minutes=1)
+        coordinator = FarmCoordinator(PROPERTIES, ["emulator-1", "emulator-2"], budget=60, rebalance_period=3600)
+        self.assertEqual(coordinator.assignment, {"emulator-1": ["Props.test_a", "Props.test_c"],
+                                                  "emulator-2": ["Props.test_b"]})
+        runner = multiDevice.MultiDeviceRunner(args, ["emulator-1", "emulator-2"], target=farm_device, coordinator=coordinator)
+        self.assertEqual(runner.device_args(runner.devices["emulator-1"]).running_minutes, 2)
+        runner.run()
+
+        self.assertEqual([d.state for d in runner.devices.values()], ["passed", "error"])
+        self.assertIn("assigned ['Props.test_b'] for 60.0s", (self.tmp / "emulator-2" / multiDevice.CONSOLE_LOG).read_text())
+        # the 55s left of emulator-2 and its property went to emulator-1
+        with open(self.tmp / "emulator-1" / "farm.json") as fp:
+            self.assertEqual(json.load(fp), {"budget": 115.0, "properties": PROPERTIES})
+        with open(self.tmp / FARM_SCHEDULE_FILE) as fp:
+            schedule = json.load(fp)
+        self.assertEqual(schedule["devices"]["emulator-2"]["budget_seconds"], 5.0)
+        self.assertFalse(schedule["devices"]["emulator-2"]["alive"])
+
+    def test_coverage_hints(self):
+        activities = [f"com.example.Act{i}" for i in range(5)]
+
+        def write_coverage(device, steps, tested):
+            with open(self.tmp / f"{device}.log", "a") as fp:
+                fp.write(json.dumps({"stepsCount": steps, "totalActivities": activities, "testedActivities": tested,
+                                     "activityCountHistory": {a: 1 for a in tested}}) + "\n")
+
+        write_coverage("d1", 10, activities[:1])
+        write_coverage("d2", 10, activities[1:2])
+        coverage = CoverageAggregator({d: self.tmp / f"{d}.log" for d in ("d1", "d2", "d3")})
+        coordinator = FarmCoordinator(PROPERTIES, ["d1", "d2", "d3"], budget=60, coverage=coverage)
+        clients = {d: FarmClient(coordinator.connect(d)) for d in ("d1", "d2")}
+
+        # the first hints only record the coverage of the devices
+        coordinator.send_hints()
+        self.assertEqual(coverage.unexplored(), activities[2:])
+        # d1 found new activities, d2 is stalled, d3 hasn't synced its coverage
+        write_coverage("d1", 20, activities[:3])
+        write_coverage("d2", 20, activities[1:2])
+        coordinator.send_hints()
+        clients["d2"].update(0, 0.0, {})
+        self.assertEqual(clients["d2"].pop_hint(), activities[3])
+        self.assertIsNone(clients["d2"].pop_hint())
+        clients["d1"].update(0, 0.0, {})
+        self.assertIsNone(clients["d1"].hint)
+        # both stalled: the activities not hinted yet first
+        write_coverage("d1", 30, activities[:3])
+        write_coverage("d2", 30, activities[1:2])
+        coordinator.send_hints()
+        self.assertEqual(coordinator.hints, {"d1": [activities[3]], "d2": [activities[3], activities[4]], "d3": []})
+        self.assertEqual(coordinator.summary()["coverage"]["tested_activities_count"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
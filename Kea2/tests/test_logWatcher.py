@@ -0,0 +1,109 @@
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from kea2.logWatcher import LogEventType, LogParser, LogWatcher
+
+
+LOG = """[Fastbot][2025-01-01 10:00:00.000] start
+:Sending Touch (ACTION_DOWN): 0:(100.0,200.0)
+:Sending Touch (ACTION_UP): 0:(100.0,200.0)
+// CRASH: com.example (pid 1234)
+// Short Msg: java.lang.NullPointerException
+// Long Msg: java.lang.NullPointerException: boom
+// 	at com.example.MainActivity.onClick(MainActivity.java:42)
+:Sending Touch (ACTION_DOWN): 0:(10.0,20.0)
+// NOT RESPONDING: com.example (pid 1234)
+ANR in com.example (com.example/.MainActivity)
+Reason: Input dispatching timed out
+
+[Fastbot][2025-01-01 10:01:00.000] Monkey is over!
+Total steps: 3
+Activity coverage: 2
+"""
+
+
+class TestLogParser(unittest.TestCase):
+
+    def parse(self, chunk_size):
+        events = []
+        parser = LogParser(events.append)
+        for i in range(0, len(LOG), chunk_size):
+            parser.feed(LOG[i:i + chunk_size])
+        parser.flush()
+        return events
+
+    def test_events(self):
+        events = self.parse(len(LOG))
+        self.assertEqual(
+            [e.type for e in events],
+            [LogEventType.STEP, LogEventType.STEP, LogEventType.CRASH, LogEventType.STEP,
+             LogEventType.ANR, LogEventType.STATISTIC]
+        )
+        crash, anr, statistic = events[2], events[4], events[5]
+        self.assertEqual((crash.package, crash.pid, crash.line_no), ("com.example", 1234, 4))
+        self.assertIn("MainActivity.java:42", crash.body)
+        self.assertIn("Input dispatching timed out", anr.body)
+        self.assertEqual(statistic.counters, {"Total steps": 3, "Activity coverage": 2})
+        self.assertEqual(events[3].counters, {"steps": 3})
+
+    def test_chunks_split_lines(self):
+        # the events must not depend on how the log is split while it is being written
+        expected = self.parse(len(LOG))
+        for chunk_size in (1, 7, 64):
+            self.assertEqual(self.parse(chunk_size), expected)
+
+    def test_internal_error_emitted_without_flush(self):
+        events = []
+        parser = LogParser(events.append)
+        parser.feed("[Fastbot][2025-01-01] Internal error\n")
+        self.assertEqual(events, [])
+        parser.feed("std::out_of_range\n")
+        self.assertEqual(events[0].type, LogEventType.INTERNAL_ERROR)
+        self.assertEqual(events[0].body, "std::out_of_range")
+
+
+class TestLogWatcher(unittest.TestCase):
+
+    def test_live_events(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            log_file = Path(tmp) / "fastbot.log"
+            fp = open(log_file, "w", encoding="utf-8", buffering=1)
+            watcher = LogWatcher(log_file)
+            crashes = []
+            watcher.subscribe(LogEventType.CRASH, crashes.append)
+
+            fp.write("// CRASH: com.example (pid 1)\n// Short Msg: boom\n:Sending Touch\n")
+            deadline = time.time() + 5
+            while not crashes and time.time() < deadline:
+                time.sleep(0.05)
+            self.assertEqual(crashes[0].package, "com.example")
+
+            fp.write("[Fastbot] Monkey is over!\nTotal steps: 1\n")
+            fp.close()
+            watcher.close()
+            self.assertTrue(watcher.statistic_printed)
+
+    def test_failing_subscriber(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            log_file = Path(tmp) / "fastbot.log"
+            # events written before the watcher starts
+            log_file.write_text("// CRASH: com.example (pid 1)\n// Short Msg: boom\n:Sending Touch\n"
+                                "// CRASH: com.other (pid 2)\n// Short Msg: boom\n:Sending Touch\n", encoding="utf-8")
+
+            def fail(event):
+                raise ValueError("broken subscriber")
+
+            crashes = []
+            watcher = LogWatcher(log_file, subscribers={LogEventType.CRASH: [fail, crashes.append]})
+            deadline = time.time() + 5
+            while len(crashes) < 2 and time.time() < deadline:
+                time.sleep(0.05)
+            watcher.close()
+            # the watcher thread survived the failing subscriber
+            self.assertEqual([e.package for e in crashes], ["com.example", "com.other"])
+
+
+if __name__ == "__main__":
+    unittest.main()
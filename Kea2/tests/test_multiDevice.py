@@ -0,0 +1,73 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from kea2 import multiDevice
+from kea2.kea_launcher import parse_args, _sanitize_args
+from kea2.report.report_merger import MergeState, MERGE_STATE_FILE
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from test_reportMerger import make_result_dir  # noqa: E402
+
+
+def fake_device(device_args, console_log, suite, farm_conn=None):
+    """A device process writing its console output and a result dir, failing on the second device"""
+    multiDevice._redirect_output(console_log)
+    print(f"testing {device_args.serial}")
+    print(f"{len(list(suite))} tests", flush=True)
+    make_result_dir(Path(device_args.output_dir), device_args.log_stamp, tested=2, fail=0)
+    os._exit(1 if device_args.serial.endswith("2") else 0)
+
+
+class TestMultiDevice(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_resolve_devices(self):
+        with mock.patch("kea2.adbUtils.get_devices", return_value=["emulator-5554", "10.0.0.2:5555"]):
+            self.assertEqual(multiDevice.resolve_devices("all"), ["emulator-5554", "10.0.0.2:5555"])
+            self.assertEqual(multiDevice.resolve_devices("10.0.0.2:5555, emulator-5554,10.0.0.2:5555"),
+                             ["10.0.0.2:5555", "emulator-5554"])
+            with self.assertRaises(ValueError):
+                multiDevice.resolve_devices("emulator-5554,emulator-5556")
+        with mock.patch("kea2.adbUtils.get_devices", return_value=[]):
+            with self.assertRaises(ValueError):
+                multiDevice.resolve_devices("all")
+
+        args = parse_args(["run", "-p", "com.example", "--devices", "all", "-s", "emulator-5554"])
+        with self.assertRaises(ValueError):
+            _sanitize_args(args)
+
+    def test_run_devices(self):
+        args = argparse.Namespace(devices="all", serial=None, transport_id=None,
+                                  output_dir=str(self.tmp), log_stamp="stamp")
+        runner = multiDevice.MultiDeviceRunner(args, ["emulator-1", "10.0.0.2:5552"], target=fake_device)
+        device_args = runner.device_args(runner.devices["10.0.0.2:5552"])
+        self.assertEqual((device_args.serial, device_args.devices, device_args.log_stamp),
+                         ("10.0.0.2:5552", None, "stamp_10.0.0.2_5552"))
+        self.assertEqual(Path(device_args.output_dir), self.tmp / "10.0.0.2_5552")
+        self.assertEqual(args.serial, None)
+
+        suite = unittest.TestSuite([unittest.FunctionTestCase(lambda: None)])
+        self.assertFalse(runner.run(suite))
+        self.assertEqual([d.state for d in runner.devices.values()], ["passed", "failed"])
+        console = (self.tmp / "emulator-1" / multiDevice.CONSOLE_LOG).read_text()
+        self.assertEqual(console, "testing emulator-1\n1 tests\n")
+
+        merged = list(self.tmp.glob("merged_report_*"))
+        self.assertEqual(len(merged), 1)
+        state = MergeState.load(merged[0] / MERGE_STATE_FILE)
+        self.assertEqual(len(state.source_directories), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
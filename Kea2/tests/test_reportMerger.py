@@ -0,0 +1,162 @@
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from kea2.report import report_merger
+from kea2.report.coverage_trend import merge_coverage_changes, read_coverage_changes, read_coverage_log
+from kea2.report.utils import read_lines_reversed
+
+
+PACKAGE = "com.example"
+ACTIVITIES = [f"{PACKAGE}.Act{i}" for i in range(4)]
+
+
+def make_result_dir(root: Path, name: str, tested: int, fail: int, crashes: int = 0, package: str = PACKAGE) -> Path:
+    """A result directory with its report, as merged by `kea2 merge`"""
+    result_dir = root / f"res_{name}"
+    output_dir = result_dir / f"output_{name}"
+    output_dir.mkdir(parents=True)
+    with open(result_dir / "bug_report_config.json", "w") as fp:
+        json.dump({"packageNames": [package], "log_stamp": name}, fp)
+    with open(result_dir / f"result_{name}.json", "w") as fp:
+        json.dump({"Props.test_a": {"precond_satisfied": 3, "executed": 2, "fail": fail, "error": 0},
+                   "Props.test_b": {"precond_satisfied": 1, "executed": 1, "fail": 0, "error": 0}}, fp)
+    (result_dir / "bug_report.html").write_text("<html></html>")
+    with open(output_dir / "coverage.log", "w") as fp:
+        for steps in range(1, tested + 1):
+            fp.write(json.dumps({"stepsCount": steps * 10, "totalActivities": ACTIVITIES,
+                                 "testedActivities": ACTIVITIES[:steps],
+                                 "activityCountHistory": {a: steps for a in ACTIVITIES[:steps]}}) + "\n")
+    with open(output_dir / "crash-dump.log", "w") as fp:
+        for i in range(crashes):
+            # the same crashes in every run, at other addresses and lines
+            fp.write(f"2025010110000{i}\ncrash:\n// CRASH: {PACKAGE} (pid {100 + i})\n"
+                     f"// Long Msg: java.lang.IllegalStateException{i}: boom@{id(name):x}\n"
+                     f"// \tat {PACKAGE}.Main.lambda$onClick${i}(Main.java:{len(name) + i})\n"
+                     f"// \tat android.view.View.performClick(View.java:7448)\n// crash end\n")
+    return result_dir
+
+
+class TestMerge(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_merge_in_workers(self):
+        result_dirs = [
+            make_result_dir(self.tmp, "1", tested=1, fail=1, crashes=2),
+            make_result_dir(self.tmp, "2", tested=3, fail=0),
+            make_result_dir(self.tmp, "3", tested=2, fail=1, crashes=1),
+        ]
+        # a line still being written at the end of coverage.log
+        with open(result_dirs[1] / "output_2" / "coverage.log", "a") as fp:
+            fp.write('{"stepsCount": 40, "testedAc')
+
+        merger = report_merger.TestReportMerger(workers=2)
+        aggregates = merger._collect_directories(result_dirs)
+        self.assertEqual([a.dir_name for a in aggregates], ["res_1", "res_2", "res_3"])
+        self.assertEqual(aggregates[1].coverage["stepsCount"], 30)
+
+        report = merger.merge_reports(result_dirs, self.tmp / "merged")
+        self.assertTrue(report.exists())
+        state = report_merger.MergeState.load(report.parent / report_merger.MERGE_STATE_FILE)
+        self.assertEqual(state.property_stats["Props.test_a"], {"precond_satisfied": 9, "executed": 6, "fail": 2, "error": 0})
+        mapping = state.property_source_mapping["Props.test_a"]
+        self.assertEqual([m["dir_name"] for m in mapping], ["res_1", "res_3"])
+        self.assertEqual(mapping[0]["report_path"], "../../res_1/bug_report.html")
+
+        coverage = state.coverage_data()
+        self.assertEqual((coverage["tested_activities_count"], coverage["total_steps"]), (3, 60))
+        self.assertEqual(coverage["activity_count_history"][ACTIVITIES[0]], 6)
+        # the union of the runs at each of their steps
+        self.assertEqual([(t["stepsCount"], t["testedActivitiesCount"], t["coverage"]) for t in coverage["coverage_trend"]],
+                         [(10, 1, 25.0), (20, 2, 50.0), (30, 3, 75.0)])
+
+        # the crash of res_3 is the first crash of res_1
+        crashes = state.crash_anr_data()
+        self.assertEqual(crashes["total_crash_count"], 2)
+        self.assertEqual([(c["count"], c["first_seen"], c["last_seen"]) for c in crashes["crash_events"]],
+                         [(2, "res_1", "res_3"), (1, "res_1", "res_1")])
+        self.assertEqual(crashes["crash_events"][0]["report_path"], "../../res_1/bug_report.html")
+
+    def test_merge_into(self):
+        result_dirs = [
+            make_result_dir(self.tmp, "1", tested=1, fail=1, crashes=2),
+            make_result_dir(self.tmp, "2", tested=3, fail=0),
+            make_result_dir(self.tmp, "3", tested=2, fail=1, crashes=3),
+        ]
+        expected = report_merger.TestReportMerger(workers=1).merge_reports(result_dirs, self.tmp / "full").parent
+        merged_dir = report_merger.TestReportMerger(workers=1).merge_reports(result_dirs[:2], self.tmp / "merged").parent
+
+        # the directories merged before are not read again
+        shutil.rmtree(result_dirs[0] / "output_1")
+        merger = report_merger.TestReportMerger(workers=1)
+        report = merger.merge_into(merged_dir, [result_dirs[2], result_dirs[1]])
+        self.assertEqual(report, merged_dir / "merged_report.html")
+        self.assertEqual(merger.get_merge_summary()["merged_directories"], 3)
+
+        def load(directory):
+            state = report_merger.MergeState.load(directory / report_merger.MERGE_STATE_FILE)
+            return state.property_stats, state.coverage_data(), state.crash_anr_data(), state.source_directories
+
+        self.assertEqual(load(merged_dir), load(expected))
+        self.assertIn("res_3", report.read_text(encoding="utf-8"))
+
+        other = make_result_dir(self.tmp, "4", tested=1, fail=0, package="com.other")
+        self.assertIsNone(report_merger.TestReportMerger(workers=1).merge_into(merged_dir, [other]))
+        self.assertEqual(len(load(merged_dir)[3]), 3)
+
+    def test_merge_different_packages(self):
+        result_dirs = [
+            make_result_dir(self.tmp, "1", tested=1, fail=0),
+            make_result_dir(self.tmp, "2", tested=1, fail=0, package="com.other"),
+        ]
+        self.assertIsNone(report_merger.TestReportMerger(workers=2).merge_reports(result_dirs, self.tmp / "merged"))
+        self.assertFalse((self.tmp / "merged").exists())
+
+    def test_coverage_trend(self):
+        path = self.tmp / "coverage.log"
+        with open(path, "w") as fp:
+            for steps, tested in ((5, 0), (10, 1), (15, 1), (20, 1), (25, 3)):
+                fp.write(json.dumps({"stepsCount": steps, "totalActivitiesCount": 4, "testedActivitiesCount": tested,
+                                     "totalActivities": ACTIVITIES, "testedActivities": ACTIVITIES[:tested]}) + "\n")
+            # being written
+            fp.write('{"stepsCount": 30')
+        changes = read_coverage_changes(path)
+        self.assertEqual([(c.stepsCount, c.tested, len(c.total)) for c in changes],
+                         [(5, [], 4), (10, ACTIVITIES[:1], 0), (25, ACTIVITIES[1:3], 0)])
+        # the final coverage comes from the same pass, without the line being written
+        self.assertEqual(read_coverage_log(path), (changes, {
+            "stepsCount": 25, "totalActivitiesCount": 4, "testedActivitiesCount": 3,
+            "totalActivities": ACTIVITIES, "testedActivities": ACTIVITIES[:3],
+        }))
+        # a last line with the counts of the line before is parsed too
+        with open(path, "a") as fp:
+            fp.write(', "totalActivitiesCount": 4, "testedActivitiesCount": 3}\n')
+        self.assertEqual(read_coverage_log(path)[1]["stepsCount"], 30)
+
+        other = [(10, [ACTIVITIES[3]], ACTIVITIES), (25, [ACTIVITIES[0]], [])]
+        merged = list(merge_coverage_changes([changes, other]))
+        self.assertEqual([(c.stepsCount, sorted(c.tested)) for c in merged],
+                         [(5, []), (10, sorted([ACTIVITIES[0], ACTIVITIES[3]])), (25, ACTIVITIES[1:3])])
+        # merging a merged trend with a new run extends it
+        self.assertEqual(list(merge_coverage_changes([merged[:2], [(25, ACTIVITIES[1:3], [])]])), merged)
+
+    def test_read_lines_reversed(self):
+        path = self.tmp / "lines.log"
+        lines = [f"line {i} " + "x" * (i % 7) for i in range(100)]
+        path.write_bytes("\n".join(lines).encode() + b"\n")
+        for block_size in (1, 5, 64, 1 << 16):
+            self.assertEqual(list(read_lines_reversed(path, block_size)),
+                             [b""] + [line.encode() for line in reversed(lines)])
+        path.write_bytes(b"")
+        self.assertEqual(list(read_lines_reversed(path)), [b""])
+
+
+if __name__ == "__main__":
+    unittest.main()
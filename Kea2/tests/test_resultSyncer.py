@@ -0,0 +1,170 @@
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from adbutils import FileInfo
+
+from kea2.kea_launcher import parse_args, _sanitize_args
+from kea2.resultSyncer import DeviceUsage, ResultSyncer, SyncScheduler
+
+
+class FakeTransport:
+    def __init__(self, root: Path):
+        self.root = root
+        self.data = b""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    @property
+    def conn(self):
+        return self
+
+    def makefile(self, mode):
+        return io.BytesIO(self.data)
+
+    def send_command(self, cmd: str):
+        args = cmd[len("exec:"):].split(" ")
+        if args[0] == "tail":
+            # tail -c +N <path>
+            with open(self.root / args[3].lstrip("/"), "rb") as fp:
+                fp.seek(int(args[2]) - 1)
+                self.data = fp.read()
+        elif args[0] == "tar":
+            # tar -c[z]f - -C <dir> <files>
+            buf = io.BytesIO()
+            with tarfile.open(fileobj=buf, mode="w:gz" if "z" in args[1] else "w") as tar:
+                for name in args[5:]:
+                    tar.add(self.root / args[4].lstrip("/") / name, arcname=name)
+            self.data = buf.getvalue()
+
+    def check_okay(self):
+        pass
+
+    def read(self, n):
+        chunk, self.data = self.data[:n], self.data[n:]
+        return chunk
+
+
+class FakeSync:
+    def __init__(self, root: Path):
+        self.root = root
+
+    def iter_directory(self, path):
+        for name in sorted(os.listdir(self.root / path.lstrip("/"))):
+            st = os.stat(self.root / path.lstrip("/") / name)
+            yield FileInfo(st.st_mode, st.st_size, None, name)
+
+    def pull_file(self, src, dst):
+        shutil.copyfile(self.root / src.lstrip("/"), dst)
+        return os.path.getsize(dst)
+
+
+class FakeDevice:
+    """Device whose sdcard is a local directory"""
+    def __init__(self, root: Path):
+        self.root = root
+        self.sync = FakeSync(root)
+
+    def open_transport(self):
+        return FakeTransport(self.root)
+
+    def shell(self, cmdargs):
+        assert cmdargs[:2] == ["rm", "-f"]
+        for p in cmdargs[2:]:
+            os.remove(self.root / p.lstrip("/"))
+
+
+class TestIncrementalSync(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.device_dir = self.tmp / "sdcard" / "output_1"
+        (self.device_dir / "screenshots").mkdir(parents=True)
+        options = SimpleNamespace(
+            output_dir=self.tmp / "res", sync_mode="incremental", sync_compress=False,
+            serial=None, transport_id=None, profile_period=25, sync_policy="period",
+            sync_threshold_mb=50, sync_threshold_files=500, sync_min_free_mb=500,
+        )
+        with mock.patch("kea2.resultSyncer.ADBDevice", return_value=FakeDevice(self.tmp)):
+            self.syncer = ResultSyncer("/sdcard/output_1", options)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _append(self, name, content: bytes):
+        with open(self.device_dir / name, "ab") as fp:
+            fp.write(content)
+
+    def test_only_new_bytes_and_screenshots_pulled(self):
+        self._append("steps.log", b'{"step": 1}\n')
+        self._append("screenshots/screenshot-1.png", b"png1")
+        stats = self.syncer._sync_device_data()
+        self.assertEqual(stats.files, 2)
+        self.assertFalse((self.device_dir / "screenshots" / "screenshot-1.png").exists())
+
+        self._append("steps.log", b'{"step": 2}\n')
+        self._append("screenshots/screenshot-2.png", b"png2")
+        stats = self.syncer._sync_device_data()
+        self.assertEqual(stats.bytes, len(b'{"step": 2}\n') + len(b"png2"))
+
+        local = self.syncer.output_dir
+        self.assertEqual((local / "steps.log").read_bytes(), b'{"step": 1}\n{"step": 2}\n')
+        self.assertTrue((local / "screenshots" / "screenshot-1.png").exists())
+        self.assertTrue((local / "screenshots" / "screenshot-2.png").exists())
+
+        stats = self.syncer._sync_device_data()
+        self.assertEqual((stats.files, stats.bytes), (0, 0))
+        self.assertEqual(self.syncer.sync_count, 3)
+
+    def test_archive_transport(self):
+        self.syncer.sync_mode = "archive"
+        self.syncer.sync_compress = True
+        for i in range(3):
+            self._append(f"screenshots/screenshot-{i}.png", b"png" * (i + 1))
+        stats = self.syncer._sync_device_data()
+        self.assertEqual(stats.files, 3)
+        for i in range(3):
+            local = self.syncer.output_dir / "screenshots" / f"screenshot-{i}.png"
+            self.assertEqual(local.read_bytes(), b"png" * (i + 1))
+        self.assertEqual(os.listdir(self.device_dir / "screenshots"), [])
+
+
+class TestSyncScheduler(unittest.TestCase):
+
+    def setUp(self):
+        options = SimpleNamespace(
+            sync_threshold_mb=1, sync_threshold_files=100, sync_min_free_mb=10, profile_period=25
+        )
+        self.scheduler = SyncScheduler(options)
+
+    def test_decide(self):
+        MB = 2**20
+        self.assertIsNone(self.scheduler.decide(25, DeviceUsage(size=MB // 2, files=10, free=100 * MB)))
+        self.assertIn("bytes", self.scheduler.decide(50, DeviceUsage(size=MB, files=10, free=100 * MB)))
+        self.assertIn("files", self.scheduler.decide(50, DeviceUsage(size=0, files=100, free=100 * MB)))
+        self.assertIn("free", self.scheduler.decide(50, DeviceUsage(size=0, files=0, free=MB)))
+        self.assertIn("max period", self.scheduler.decide(250, DeviceUsage(size=0, files=0, free=100 * MB)))
+
+        # the growth is measured from the last sync
+        self.scheduler.on_synced(250, DeviceUsage(size=MB, files=0, free=100 * MB))
+        self.assertIsNone(self.scheduler.decide(275, DeviceUsage(size=MB + MB // 2, files=0, free=100 * MB)))
+
+    def test_negative_thresholds(self):
+        for flag in ("--sync-threshold-mb", "--sync-threshold-files", "--sync-min-free-mb"):
+            args = parse_args(["run", "-p", "com.example", "--sync-policy", "adaptive", flag, "-1"])
+            with self.assertRaises(ValueError):
+                _sanitize_args(args)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import gzip
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from kea2 import precondition
+from kea2.sessionRecord import read_session, replay_session, session_file
+from kea2.simulator import BENCH_PACKAGE, run_bench, synthetic_screens
+from kea2.utils import setCustomProjectRoot
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import sim_props  # noqa: E402
+
+
+class TestSessionRecord(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        shutil.copytree(Path(__file__).resolve().parents[1] / "kea2" / "assets" / "fastbot_configs", self.tmp / "configs")
+        setCustomProjectRoot(self.tmp)
+
+    def tearDown(self):
+        setCustomProjectRoot(None)
+        shutil.rmtree(self.tmp)
+
+    def _suite(self):
+        return unittest.TestLoader().loadTestsFromTestCase(sim_props.BenchProps)
+
+    def test_record_and_replay(self):
+        result = run_bench(self._suite(), self.tmp / "output", synthetic_screens(BENCH_PACKAGE, 4), steps=10,
+                           log_stamp="rec", record=True)
+        archive = session_file(Path(result.result_dir), "rec")
+
+        header, steps = read_session(archive)
+        steps = list(steps)
+        self.assertEqual(header["driverName"], "d")
+        self.assertEqual(len(header["properties"]), 2)
+        # a step, then the dump after the property executed on the screens 1 and 3
+        self.assertEqual([s.source for s in steps[:2]], ["stepMonkey", "dumpHierarchy"])
+        self.assertEqual(len([s for s in steps if s.source == "stepMonkey"]), 10)
+        self.assertEqual(steps[0].satisfied, [f"{sim_props.__name__}.BenchProps.test_next"])
+        self.assertEqual(steps[0].selected, steps[0].satisfied[0])
+        self.assertEqual(steps[0].block, {"widgets": [], "trees": []})
+        self.assertIn("property", steps[0].timings)
+        self.assertEqual(len({s.hierarchy for s in steps}), 4)
+
+        report = replay_session(archive, self._suite())
+        self.assertEqual(report.steps, len(steps))
+        self.assertEqual(report.mismatches, [])
+        self.assertEqual(report.block_mismatches, [])
+        self.assertEqual(set(report.deltas), {"block", "parse", "occlusion", "preconds"})
+
+        # the same properties, the precondition of test_back changed
+        @precondition(lambda self: self.d(text="Screen 2").exists)
+        def test_back(self):
+            pass
+        changed = type("BenchProps", (sim_props.BenchProps,), {"test_back": test_back, "__module__": sim_props.__name__})
+        report = replay_session(archive, unittest.TestLoader().loadTestsFromTestCase(changed))
+        test_back = f"{sim_props.__name__}.BenchProps.test_back"
+        # satisfied on the screen 2 (after test_next), no longer on the screen 3
+        self.assertEqual(report.mismatches[0], {"step": 1, "source": "dumpHierarchy", "missing": [], "unexpected": [test_back]})
+        self.assertEqual(report.mismatches[1], {"step": 2, "source": "stepMonkey", "missing": [test_back], "unexpected": []})
+
+    def test_truncated_archive(self):
+        result = run_bench(self._suite(), self.tmp / "output", synthetic_screens(BENCH_PACKAGE, 4), steps=10,
+                           log_stamp="rec", record=True)
+        archive = session_file(Path(result.result_dir), "rec")
+        data = archive.read_bytes()
+        truncated = self.tmp / "truncated.jsonl.gz"
+        truncated.write_bytes(data[:len(data) * 2 // 3])
+        header, steps = read_session(truncated)
+        self.assertLess(len(list(steps)), 20)
+        with gzip.open(archive, "rt") as fp:
+            self.assertIn('"type":"header"', fp.readline())
+
+
+if __name__ == "__main__":
+    unittest.main()
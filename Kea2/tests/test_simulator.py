@@ -0,0 +1,68 @@
+import json
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from kea2.simulator import BENCH_PACKAGE, run_bench, synthetic_screens
+from kea2.utils import setCustomProjectRoot
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import sim_props  # noqa: E402
+
+
+class TestSimulator(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        shutil.copytree(Path(__file__).resolve().parents[1] / "kea2" / "assets" / "fastbot_configs", self.tmp / "configs")
+        setCustomProjectRoot(self.tmp)
+
+    def tearDown(self):
+        setCustomProjectRoot(None)
+        shutil.rmtree(self.tmp)
+
+    def test_run_offline(self):
+        suite = unittest.TestLoader().loadTestsFromTestCase(sim_props.BenchProps)
+        result = run_bench(suite, self.tmp / "output", synthetic_screens(BENCH_PACKAGE, 4), steps=20, profile_period=5,
+                           sync_mode="archive", take_screenshots=True, log_stamp="bench")
+
+        self.assertEqual(result.steps, 20)
+        self.assertGreater(result.steps_per_sec, 0)
+        self.assertEqual(set(result.phases), {"startup", "explore", "teardown"})
+        # the steps go to the screens 1 and 3, where a property moves to the screens 2 and 0
+        self.assertEqual(result.latency["agent /stepMonkey"]["count"], 20)
+        self.assertEqual(result.latency["property"]["count"], 20)
+
+        result_dir = Path(result.result_dir)
+        with open(result_dir / "result_bench.json") as fp:
+            stats = json.load(fp)
+        self.assertEqual(stats[f"{sim_props.BenchProps.__module__}.BenchProps.test_next"]["executed"], 10)
+        self.assertEqual(stats[f"{sim_props.BenchProps.__module__}.BenchProps.test_back"]["fail"], 10)
+
+        # the logs written on the simulated device were synced
+        output_dir = result_dir / "output_bench"
+        steps = [json.loads(line) for line in (output_dir / "steps.log").read_text().splitlines()]
+        self.assertEqual(len([s for s in steps if s["Type"] == "Monkey"]), 20)
+        self.assertEqual(len([s for s in steps if s["Type"] == "ScriptInfo"]), 40)
+        self.assertEqual(len(list((output_dir / "screenshots").glob("*.png"))), 20)
+        coverage = json.loads((output_dir / "coverage.log").read_text().splitlines()[-1])
+        self.assertEqual(coverage["testedActivitiesCount"], 4)
+        self.assertTrue((result_dir / "report_summary.json").exists())
+
+        # the time of the phases of the steps, in the report summary
+        with open(result_dir / "perf_bench.json") as fp:
+            perf = json.load(fp)
+        self.assertEqual(perf["steps_count"], 20)
+        # 20 stepMonkey and the dumps after the properties, but the last one
+        self.assertEqual(perf["phases"]["rpc"]["count"], 39)
+        self.assertEqual(perf["phases"]["property"]["count"], 20)
+        self.assertTrue({"block", "parse", "occlusion", "preconds", "logScript", "flush", "sync"} <= set(perf["phases"]))
+        with open(result_dir / "report_summary.json") as fp:
+            summary = json.load(fp)
+        self.assertEqual(summary["step_timing"]["phases"]["rpc"]["count"], 39)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from time import sleep
+
+from kea2.stepTimer import LatencyHistogram, StepTimer, phase
+
+
+class TestStepTimer(unittest.TestCase):
+
+    def test_histogram_percentiles(self):
+        histogram = LatencyHistogram()
+        # 1ms to 1000ms
+        for ms in range(1, 1001):
+            histogram.record(ms / 1000)
+        self.assertEqual(histogram.count, 1000)
+        self.assertAlmostEqual(histogram.total, 500.5, places=6)
+        for q, expected in ((0.5, 0.5), (0.9, 0.9), (0.99, 0.99)):
+            self.assertAlmostEqual(histogram.percentile(q), expected, delta=expected / LatencyHistogram.SUB_BUCKETS)
+        self.assertEqual(histogram.percentile(1), 1.0)
+        # the buckets are log-linear: a few hundreds for 3 orders of magnitude
+        self.assertLess(len(histogram.counts), 400)
+
+    def test_nested_phases(self):
+        timer = StepTimer(summary_period=float("inf"))
+        timer.activate()
+        for steps_count in range(3):
+            timer.start_step(steps_count)
+            with timer.phase("preconds"):
+                with phase("parse"):
+                    sleep(0.01)
+        timer.finish(3)
+
+        # the time of parse is not in preconds
+        self.assertEqual(timer.histograms["parse"].count, 3)
+        self.assertGreaterEqual(timer.histograms["parse"].percentile(0.5), 0.009)
+        self.assertLess(timer.histograms["preconds"].max, 0.005)
+        self.assertEqual(len(timer.timeline), 1)
+        self.assertEqual(list(timer.timeline[0]["phases"]), ["parse", "preconds"])
+
+        # no timer once finished
+        with phase("parse"):
+            pass
+        self.assertEqual(timer.histograms["parse"].count, 3)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(timer.save(Path(tmp) / "perf.json")) as fp:
+                perf = json.load(fp)
+        self.assertEqual(perf["steps"], 3)
+        self.assertEqual(perf["phases"]["parse"]["count"], 3)
+        self.assertIn("p99_ms", perf["phases"]["parse"])
+
+
+if __name__ == "__main__":
+    unittest.main()